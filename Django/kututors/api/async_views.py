@@ -0,0 +1,64 @@
+import functools
+
+from django.http import JsonResponse
+from rest_framework import exceptions, status
+from rest_framework.utils.encoders import JSONEncoder
+
+from .authentication import CachedTokenAuthentication
+
+
+def json_response(data, status=status.HTTP_200_OK, headers=None):
+    """JSON response encoded the way DRF's JSONRenderer encodes it"""
+    return JsonResponse(
+        data, status=status, headers=headers, encoder=JSONEncoder, safe=False,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+async def _authenticate(request):
+    """
+    The user of a request, authenticated like the DRF views: API token
+    first, then the session. None for anonymous requests.
+    """
+    # Set by DRF's APIClient.force_authenticate, which DRF's Request honours too
+    forced = getattr(request, '_force_auth_user', None)
+    if forced is not None:
+        return forced
+    authenticated = await CachedTokenAuthentication().aauthenticate(request)
+    if authenticated is not None:
+        return authenticated[0]
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def async_api_view(methods):
+    """
+    Async counterpart of @api_view + IsAuthenticated for read-only views.
+    The view is a coroutine returning a json_response; it runs on the event
+    loop under ASGI instead of on a thread through sync_to_async.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return json_response(
+                    {'detail': f'Method "{request.method}" not allowed.'},
+                    status=status.HTTP_405_METHOD_NOT_ALLOWED,
+                    headers={'Allow': ', '.join(methods)},
+                )
+            try:
+                user = await _authenticate(request)
+            except exceptions.AuthenticationFailed as e:
+                user, error = None, e.detail
+            else:
+                error = 'Authentication credentials were not provided.'
+            if user is None:
+                return json_response(
+                    {'detail': error}, status=status.HTTP_401_UNAUTHORIZED,
+                    headers={'WWW-Authenticate': CachedTokenAuthentication.keyword},
+                )
+            request.user = user
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
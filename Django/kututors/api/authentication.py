@@ -0,0 +1,117 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+
+class TokenUserCache:
+    """
+    In-process LRU of API token -> (user, token) snapshots.
+    Entries expire after ttl seconds; the least recently used entry is
+    dropped once max_size tokens are cached. api.signals invalidates a
+    user's entry when the user is saved or deleted or their token is
+    deleted, so logout, password resets and account deletion take effect
+    at once in this process and within ttl in the others.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Copies of the cached (user, token) for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, token, expires = entry
+            if time.monotonic() >= expires:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+        # Views may change request.user, so every request gets its own copy
+        user = copy.copy(user)
+        token = copy.copy(token)
+        token.user = user
+        return user, token
+
+    def set(self, key, user, token):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (copy.copy(user), copy.copy(token), time.monotonic() + self.ttl)
+            self._keys_by_user[user.pk] = key
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id):
+        """Forget the cached token of this user"""
+        with self._lock:
+            key = self._keys_by_user.get(user_id)
+            if key is not None:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and self._keys_by_user.get(entry[0].pk) == key:
+            del self._keys_by_user[entry[0].pk]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenUserCache(
+    max_size=getattr(settings, 'TOKEN_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_CACHE_TTL', 60),
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that skips the token/user query for recently seen tokens"""
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user, token)
+        return user, token
+
+    async def aauthenticate(self, request):
+        """
+        authenticate for async views: (user, token), or None without a
+        token header. A token missing from the cache is looked up with the
+        async ORM.
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token header. Token string should not contain invalid characters.')
+
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            token = await self.get_model().objects.select_related('user').aget(key=key)
+        except self.get_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        token_cache.set(key, token.user, token)
+        return token.user, token
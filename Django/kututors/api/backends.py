@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from .hashers import check_user_password, hash_password
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authenticate with email and password.
+    The user and their API token are fetched in one query through the
+    unique normalized_email column; the password is checked on the hasher pool.
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+
+        User = get_user_model()
+        try:
+            user = User.objects.select_related('auth_token').get(
+                normalized_email=User.normalize_email_address(email)
+            )
+        except User.DoesNotExist:
+            # Hash anyway so unknown emails take as long as wrong passwords
+            hash_password(password)
+            return None
+
+        if check_user_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,137 @@
+import hashlib
+import json
+from types import MappingProxyType
+
+
+# Subject and department catalog. Built once at import and never mutated,
+# so responses and their ETags can be precomputed.
+
+DEPARTMENTS = ('Computer Science', 'Computer Engineering')
+
+COMPUTER_SCIENCE_SUBJECTS = MappingProxyType({
+    'MATH 101': 'Calculus and Linear Algebra',
+    'PHYS 101': 'General Physics I',
+    'COMP 102': 'Computer Programming',
+    'ENGG 111': 'Elements of Engineering I',
+    'CHEM 101': 'General Chemistry',
+    'EDRG 101': 'Engineering Drawing I',
+    'MATH 104': 'Advanced Calculus',
+    'PHYS 102': 'General Physics II',
+    'COMP 116': 'Object-Oriented Programming',
+    'ENGG 112': 'Elements Of Engineering II',
+    'ENGT 105': 'Technical Communication',
+    'ENVE 101': 'Introduction to Environmental Engineering',
+    'EDRG 102': 'Engineering Drawing II',
+    'MATH 208': 'Statistics and Probability',
+    'MCSC 201': 'Discrete Mathematics/Structure',
+    'EEEG 202': 'Digital Logic',
+    'EEEG 211': 'Electronics Engineering I',
+    'COMP 202': 'Data Structures and Algorithms',
+    'MATH 207': 'Differential Equations and Complex Variables',
+    'MCSC 202': 'Numerical Methods',
+    'COMP 204': 'Communication and Networking',
+    'COMP 231': 'Microprocessor and Assembly Language',
+    'COMP 232': 'Database Management Systems',
+    'COMP 317': 'Computational Operations Research',
+    'MGTS 301': 'Engineering Economics',
+    'COMP 307': 'Operating Systems',
+    'COMP 315': 'Computer Architecture and Organization',
+    'COMP 316': 'Theory of Computation',
+    'COMP 342': 'Computer Graphics',
+    'COMP 343': 'Information System Ethics',
+    'COMP 302': 'System Analysis and Design',
+    'COMP 409': 'Compiler Design',
+    'COMP 314': 'Algorithms and Complexity',
+    'COMP 323': 'Graph Theory',
+    'COMP 341': 'Human Computer Interaction',
+    'MGTS 403': 'Engineering Management',
+    'COMP 401': 'Software Engineering',
+    'COMP 472': 'Artificial Intelligence',
+    'MGTS 402': 'Engineering Entrepreneurship',
+    'COMP 486': 'Software Dependability',
+})
+
+COMPUTER_ENGINEERING_SUBJECTS = MappingProxyType({
+    'MATH 101': 'Calculus and Linear Algebra',
+    'PHYS 101': 'General Physics I',
+    'COMP 102': 'Computer Programming',
+    'ENGG 111': 'Elements of Engineering I',
+    'CHEM 101': 'General Chemistry',
+    'EDRG 101': 'Engineering Drawing I',
+    'MATH 104': 'Advanced Calculus',
+    'PHYS 102': 'General Physics II',
+    'COMP 116': 'Object-Oriented Programming',
+    'ENGG 112': 'Elements Of Engineering II',
+    'ENGT 105': 'Technical Communication',
+    'ENVE 101': 'Introduction to Environmental Engineering',
+    'EDRG 102': 'Engineering Drawing II',
+    'MATH 208': 'Statistics and Probability',
+    'MCSC 201': 'Discrete Mathematics/Structure',
+    'EEEG 202': 'Digital Logic',
+    'EEEG 211': 'Electronics Engineering I',
+    'COMP 202': 'Data Structures and Algorithms',
+    'MATH 207': 'Differential Equations and Complex Variables',
+    'MCSC 202': 'Numerical Methods',
+    'COMP 204': 'Communication and Networking',
+    'COMP 231': 'Microprocessor and Assembly Language',
+    'COMP 232': 'Database Management Systems',
+    'MGTS 301': 'Engineering Economics',
+    'COMP 307': 'Operating Systems',
+    'COMP 315': 'Computer Architecture and Organization',
+    'COEG 304': 'Instrumentation and Control',
+    'COMP 310': 'Laboratory Work',
+    'COMP 301': 'Principles of Programming Languages',
+    'COMP 304': 'Operations Research',
+    'COMP 302': 'System Analysis and Design',
+    'COMP 342': 'Computer Graphics',
+    'COMP 314': 'Algorithms and Complexity',
+    'COMP 306': 'Embedded Systems',
+    'COMP 343': 'Information System Ethics',
+    'MGTS 403': 'Engineering Management',
+    'COMP 401': 'Software Engineering',
+    'COMP 472': 'Artificial Intelligence',
+    'COMP 409': 'Compiler Design',
+    'COMP 407': 'Digital Signal Processing',
+    'MGTS 402': 'Engineering Entrepreneurship',
+})
+
+SUBJECTS_BY_DEPARTMENT = MappingProxyType({
+    'Computer Science': COMPUTER_SCIENCE_SUBJECTS,
+    'Computer Engineering': COMPUTER_ENGINEERING_SUBJECTS,
+})
+
+
+def _etag(payload):
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _subjects_payload(subjects):
+    subject_list = [{'code': code, 'name': name} for code, name in subjects.items()]
+    return {'subjects': subject_list, 'count': len(subject_list)}
+
+
+DEPARTMENTS_PAYLOAD = {
+    'departments': [{'id': i, 'name': name} for i, name in enumerate(DEPARTMENTS, start=1)]
+}
+DEPARTMENTS_ETAG = _etag(DEPARTMENTS_PAYLOAD)
+
+# All subjects from both departments, for requests without a department
+ALL_SUBJECTS_PAYLOAD = _subjects_payload({**COMPUTER_SCIENCE_SUBJECTS, **COMPUTER_ENGINEERING_SUBJECTS})
+SUBJECTS_PAYLOADS = {
+    department: _subjects_payload(subjects)
+    for department, subjects in SUBJECTS_BY_DEPARTMENT.items()
+}
+SUBJECTS_ETAGS = {
+    department: _etag(payload)
+    for department, payload in SUBJECTS_PAYLOADS.items()
+}
+ALL_SUBJECTS_ETAG = _etag(ALL_SUBJECTS_PAYLOAD)
+
+
+def subjects_payload(department):
+    return SUBJECTS_PAYLOADS.get(department, ALL_SUBJECTS_PAYLOAD)
+
+
+def subjects_etag(department):
+    return SUBJECTS_ETAGS.get(department, ALL_SUBJECTS_ETAG)
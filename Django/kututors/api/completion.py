@@ -0,0 +1,79 @@
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Booking, TutorStats
+from .response_cache import bump_tutor_version_on_commit
+
+
+# Bookings that can still be completed (or expired by the sweeper)
+OPEN_STATUSES = Booking.OPEN_STATUSES
+
+
+def _past(now):
+    """Bookings whose slot has already ended"""
+    local = timezone.localtime(now)
+    today = local.date()
+    return Q(availability__date__lt=today) | Q(availability__date=today, availability__end_time__lte=local.time())
+
+
+def complete_bookings(tutor, booking_ids, now=None):
+    """
+    Mark the tutor's open bookings among booking_ids completed with a single
+    UPDATE. Returns the ids that were completed; ids of other tutors' bookings
+    or of bookings that are no longer open are left alone.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Booking.objects.select_for_update()
+            .filter(id__in=booking_ids, availability__tutor=tutor, status__in=OPEN_STATUSES)
+            .order_by('id').values_list('id', flat=True)
+        )
+        if ids:
+            Booking.objects.filter(id__in=ids).update(status='completed', completed_at=now, updated_at=now)
+            # Every id was open, so all of them move from upcoming to completed
+            TutorStats.record_transition(tutor.id, 'pending', 'completed', count=len(ids))
+    # update() sends no post_save signals
+    if ids:
+        bump_tutor_version_on_commit(tutor.id)
+    return ids
+
+
+def sweep_past_bookings(expire=False, now=None):
+    """
+    Close every open booking whose slot has ended in one set-based UPDATE:
+    completed (with completed_at) by default, or cancelled with expire=True.
+    Expired rows are kept as history and keep their slot, unlike API
+    cancellations, which delete the booking and free the slot; an ended
+    slot cannot be booked again anyway. Returns the number of bookings closed.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        past = Booking.objects.filter(_past(now), status__in=OPEN_STATUSES)
+        per_tutor = dict(
+            past.values('availability__tutor_id').annotate(count=Count('id')).order_by()
+            .values_list('availability__tutor_id', 'count')
+        )
+        if not per_tutor:
+            return 0
+        new_status = 'cancelled' if expire else 'completed'
+        if expire:
+            closed = past.update(status=new_status, updated_at=now)
+        else:
+            closed = past.update(status=new_status, completed_at=now, updated_at=now)
+        for tutor_id, count in per_tutor.items():
+            TutorStats.record_transition(tutor_id, 'pending', new_status, count=count)
+    for tutor_id in per_tutor:
+        bump_tutor_version_on_commit(tutor_id)
+    return closed
+
+
+def open_booking_stats(now=None):
+    """Open bookings still ahead and already past, for the sweeper's --stats"""
+    now = now or timezone.now()
+    open_bookings = Booking.objects.filter(status__in=OPEN_STATUSES)
+    return {
+        'upcoming': open_bookings.exclude(_past(now)).count(),
+        'past': open_bookings.filter(_past(now)).count(),
+    }
@@ -0,0 +1,61 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    ScryptPasswordHasher,
+    make_password,
+    verify_password,
+)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    Django's scrypt with parallelism 1 instead of 5. Each hash then costs a
+    fifth of the CPU (about 50 ms instead of 250 ms per login on one core
+    here, see benchmark_hashers) with the same 16 MiB memory cost, and the
+    hasher pool runs one hash per core anyway. Work factor and block size
+    stay at Django's defaults. Stored hashes record their own parameters,
+    so older ones are upgraded on the next login.
+    """
+
+    parallelism = getattr(settings, 'PASSWORD_SCRYPT_PARALLELISM', 1)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with its cost taken from settings; needs argon2-cffi.
+    Parallelism defaults to 1 instead of Django's 8: the hasher pool
+    already runs one hash per core.
+    """
+
+    time_cost = getattr(settings, 'PASSWORD_ARGON2_TIME_COST', 2)
+    memory_cost = getattr(settings, 'PASSWORD_ARGON2_MEMORY_COST', 64 * 1024)  # KiB
+    parallelism = getattr(settings, 'PASSWORD_ARGON2_PARALLELISM', 1)
+
+
+# Hashing is CPU bound and hashlib releases the GIL while it runs, so a
+# pool of one thread per core caps how many hashes run at once; a login
+# storm queues here instead of starving every other request of CPU
+HASHER_THREADS = getattr(settings, 'PASSWORD_HASHER_THREADS', None) or os.cpu_count() or 1
+_pool = ThreadPoolExecutor(max_workers=HASHER_THREADS, thread_name_prefix='password-hasher')
+
+
+def hash_password(password):
+    """make_password run on the hasher pool"""
+    return _pool.submit(make_password, password).result()
+
+
+def check_user_password(user, password):
+    """
+    Like user.check_password, with the hashing run on the hasher pool.
+    A correct password stored with an old hasher or cost is rehashed with
+    the preferred one and saved.
+    """
+    is_correct, must_update = _pool.submit(verify_password, password, user.password).result()
+    if is_correct and must_update:
+        user.password = hash_password(password)
+        user.save(update_fields=['password'])
+    return is_correct
+
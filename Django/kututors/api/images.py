@@ -0,0 +1,117 @@
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import TutorProfile, TuteeProfile
+
+
+# Square WebP thumbnails generated for every profile picture, in pixels
+THUMBNAIL_SIZES = tuple(getattr(settings, 'PROFILE_THUMBNAIL_SIZES', (64, 128, 512)))
+THUMBNAIL_QUALITY = getattr(settings, 'PROFILE_THUMBNAIL_QUALITY', 80)
+
+# Files are named after the hash of the uploaded bytes, so a name always
+# refers to the same content and can be cached forever
+IMAGE_DIR = 'profile_images'
+
+# Pillow releases the GIL while resizing and encoding, so thumbnails are
+# built in parallel; the pool also caps how many run at once
+IMAGE_THREADS = getattr(settings, 'PROFILE_IMAGE_THREADS', None) or os.cpu_count() or 1
+_pool = ThreadPoolExecutor(max_workers=IMAGE_THREADS, thread_name_prefix='profile-image')
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def _digest(upload):
+    """sha256 of the upload, read in chunks"""
+    sha = hashlib.sha256()
+    for chunk in upload.chunks():
+        sha.update(chunk)
+    upload.seek(0)
+    return sha.hexdigest()
+
+
+def _open(upload):
+    try:
+        image = Image.open(upload)
+        # JPEGs can decode straight at a reduced scale, which is much
+        # cheaper than decoding a full phone photo and shrinking it
+        largest = max(THUMBNAIL_SIZES)
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise InvalidImage('Uploaded file is not a valid image') from e
+    finally:
+        upload.seek(0)
+    return image.convert('RGBA' if image.has_transparency_data else 'RGB')
+
+
+def _save(name, content):
+    """Save content under name unless that content is already stored"""
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, content)
+
+
+def _store_thumbnail(image, size, name):
+    if default_storage.exists(name):
+        return name
+    thumb = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    thumb.save(buffer, 'WEBP', quality=THUMBNAIL_QUALITY, method=4)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def _extension(filename):
+    ext = os.path.splitext(filename or '')[1].lower()
+    return ext if ext[1:].isalnum() else ''
+
+
+def _delete_unreferenced(picture, thumbnails):
+    """Delete a replaced picture and its thumbnails unless another profile uses them"""
+    for model in (TutorProfile, TuteeProfile):
+        if model.objects.filter(profile_picture=picture).exists():
+            return
+    for name in (picture, *thumbnails):
+        default_storage.delete(name)
+
+
+def store_profile_image(profile, upload):
+    """
+    Store upload as the profile's picture with a WebP thumbnail per
+    THUMBNAIL_SIZES, all named after the upload's content hash.
+    The files the profile used before are deleted once this commits.
+    Raises InvalidImage if Pillow cannot read the upload.
+    """
+    digest = _digest(upload)
+    image = _open(upload)
+    futures = {
+        size: _pool.submit(_store_thumbnail, image, size, f'{IMAGE_DIR}/{digest}_{size}.webp')
+        for size in THUMBNAIL_SIZES
+    }
+    # The storage reads the upload in chunks, so it is never held in memory
+    picture = _save(f'{IMAGE_DIR}/{digest}{_extension(upload.name)}', upload)
+    thumbnails = {str(size): future.result() for size, future in futures.items()}
+
+    old_picture = profile.profile_picture.name
+    old_thumbnails = list(profile.profile_thumbnails.values())
+    profile.profile_picture = picture
+    profile.profile_thumbnails = thumbnails
+    profile.save(update_fields=['profile_picture', 'profile_thumbnails'])
+    if old_picture and old_picture != picture:
+        transaction.on_commit(lambda: _delete_unreferenced(old_picture, old_thumbnails))
+    return profile
+
+
+def thumbnail_urls(profile):
+    """{size: url} of the profile's thumbnails; empty for pictures not yet processed"""
+    return {size: default_storage.url(name) for size, name in profile.profile_thumbnails.items()}
@@ -0,0 +1,54 @@
+from bisect import bisect_left, bisect_right
+
+
+class IntervalIndex:
+    """
+    Per-key sorted list of disjoint half-open [start, end) intervals.
+    Overlap checks are a single bisect, so checking a slot against a tutor's
+    existing slots on the same day costs O(log n).
+    """
+
+    def __init__(self):
+        self._starts = {}
+        self._ends = {}
+
+    @classmethod
+    def from_intervals(cls, intervals):
+        """
+        Build an index from (key, start, end) tuples.
+        Intervals that already overlap (legacy data) are merged so that the
+        stored intervals stay disjoint and the bisect check stays exact.
+        """
+        index = cls()
+        by_key = {}
+        for key, start, end in intervals:
+            by_key.setdefault(key, []).append((start, end))
+
+        for key, items in by_key.items():
+            starts, ends = [], []
+            for start, end in sorted(items):
+                if ends and start < ends[-1]:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            index._starts[key] = starts
+            index._ends[key] = ends
+        return index
+
+    def overlaps(self, key, start, end):
+        """True if [start, end) overlaps any interval stored under key"""
+        starts = self._starts.get(key)
+        if not starts:
+            return False
+        # Last interval starting before end is the only candidate
+        i = bisect_left(starts, end) - 1
+        return i >= 0 and self._ends[key][i] > start
+
+    def add(self, key, start, end):
+        """Store [start, end) under key; the caller checks overlaps() first"""
+        starts = self._starts.setdefault(key, [])
+        ends = self._ends.setdefault(key, [])
+        i = bisect_right(starts, start)
+        starts.insert(i, start)
+        ends.insert(i, end)
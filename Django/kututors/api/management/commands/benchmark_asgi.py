@@ -0,0 +1,117 @@
+import asyncio
+import statistics
+import threading
+import time as timer
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client
+from rest_framework.authtoken.models import Token
+
+from api.models import Availability, Booking, TutorProfile, TuteeProfile
+
+User = get_user_model()
+
+PREFIX = 'bench_asgi_'
+
+
+class Command(BaseCommand):
+    help = (
+        'Latency and throughput of the async read endpoints served through the ASGI handler '
+        'vs the WSGI handler, at several client concurrencies (in process, no network)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50])
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and run')
+        parser.add_argument('--tutors', type=int, default=50)
+
+    def handle(self, *args, **options):
+        self.cleanup()
+        try:
+            key, endpoints = self.seed(options['tutors'])
+            self.stdout.write(f"{'endpoint':<32} {'clients':>7} {'wsgi req/s':>11} {'p95 ms':>7} {'asgi req/s':>11} {'p95 ms':>7}")
+            for url in endpoints:
+                for clients in options['concurrency']:
+                    wsgi = self.run_wsgi(url, key, clients, options['requests'])
+                    asgi = asyncio.run(self.run_asgi(url, key, clients, options['requests']))
+                    self.stdout.write(f'{url:<32} {clients:>7} {self.format(*wsgi)} {self.format(*asgi)}')
+        finally:
+            self.cleanup()
+
+    def seed(self, count):
+        tutors = []
+        for i in range(count):
+            user = User.objects.create_user(
+                username=f'{PREFIX}tutor_{i}', email=f'{PREFIX}tutor_{i}@example.com', password='!',
+                role='Tutor', first_name='Bench', last_name=f'Tutor {i}',
+            )
+            tutors.append(TutorProfile.objects.create(user=user, subject='COMP 202 Data Structures'))
+        tutee_user = User.objects.create_user(
+            username=f'{PREFIX}tutee', email=f'{PREFIX}tutee@example.com', password='!', role='Tutee'
+        )
+        tutee = TuteeProfile.objects.create(user=tutee_user)
+        tomorrow = date.today() + timedelta(days=1)
+        for tutor in tutors:
+            for hour in range(8, 18):
+                slot = Availability.objects.create(
+                    tutor=tutor, date=tomorrow, start_time=time(hour), end_time=time(hour + 1)
+                )
+                if hour == 8:
+                    Booking.book_slot(slot, tutee)
+        endpoints = [
+            '/api/list-tutors/', '/api/demo-sessions/', '/api/booked-classes/',
+            f'/api/tutor/{tutors[0].id}/availability/',
+        ]
+        return Token.objects.create(user=tutee_user).key, endpoints
+
+    def run_wsgi(self, url, key, clients, requests):
+        latencies = []
+        lock = threading.Lock()
+        per_client = max(1, requests // clients)
+
+        def worker():
+            client = Client(HTTP_AUTHORIZATION=f'Token {key}')
+            waits = []
+            try:
+                for _ in range(per_client):
+                    started = timer.perf_counter()
+                    client.get(url)
+                    waits.append(timer.perf_counter() - started)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(waits)
+
+        started = timer.perf_counter()
+        workers = [threading.Thread(target=worker) for _ in range(clients)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return len(latencies) / (timer.perf_counter() - started), latencies
+
+    async def run_asgi(self, url, key, clients, requests):
+        latencies = []
+        per_client = max(1, requests // clients)
+        headers = {'Authorization': f'Token {key}'}
+
+        async def worker():
+            client = AsyncClient()
+            for _ in range(per_client):
+                started = timer.perf_counter()
+                await client.get(url, headers=headers)
+                latencies.append(timer.perf_counter() - started)
+
+        started = timer.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        return len(latencies) / (timer.perf_counter() - started), latencies
+
+    def format(self, throughput, latencies):
+        p95 = statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else 0
+        return f'{throughput:>11.0f} {p95:>7.2f}'
+
+    def cleanup(self):
+        User.objects.filter(username__startswith=PREFIX).delete()
@@ -0,0 +1,70 @@
+import time as timer
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from api.models import Availability, Booking, TutorProfile, TuteeProfile
+
+User = get_user_model()
+
+ENDPOINTS = ['/api/profile/', '/api/booked-classes/', '/api/my-sessions/', '/api/demo-sessions/', '/api/departments/']
+
+
+class Command(BaseCommand):
+    help = 'Per-request queries and latency with an uncached vs cached API token (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and mode')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            key = self.seed()
+            client = Client(HTTP_AUTHORIZATION=f'Token {key}')
+            self.stdout.write(f"{'endpoint':<22} {'uncached':>22} {'cached':>22}")
+            for url in ENDPOINTS:
+                uncached = self.measure(client, url, options['requests'], clear=True)
+                cached = self.measure(client, url, options['requests'], clear=False)
+                self.stdout.write(f"{url:<22} {uncached:>22} {cached:>22}")
+            transaction.set_rollback(True)
+        token_cache.clear()
+
+    def seed(self):
+        tutor = User.objects.create_user(
+            username='bench_auth_tutor', email='bench_auth_tutor@example.com', password='!', role='Tutor'
+        )
+        tutee = User.objects.create_user(
+            username='bench_auth_tutee', email='bench_auth_tutee@example.com', password='!', role='Tutee'
+        )
+        tutor_profile = TutorProfile.objects.create(user=tutor, subject='COMP 202')
+        TuteeProfile.objects.create(user=tutee)
+        tomorrow = date.today() + timedelta(days=1)
+        for hour in range(8, 18):
+            slot = Availability.objects.create(
+                tutor=tutor_profile, date=tomorrow, start_time=time(hour), end_time=time(hour + 1)
+            )
+            if hour % 2:
+                Booking.book_slot(slot, tutee.tutee_profile)
+        return Token.objects.create(user=tutee).key
+
+    def measure(self, client, url, requests, clear):
+        token_cache.clear()
+        client.get(url)
+        queries = 0
+        started = timer.perf_counter()
+        for _ in range(requests):
+            if clear:
+                token_cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(url)
+            queries += len(ctx.captured_queries)
+            if response.status_code != 200:
+                self.stderr.write(f"{url} returned {response.status_code}")
+                break
+        elapsed = timer.perf_counter() - started
+        return f"{queries / requests:.1f} q, {elapsed / requests * 1000:.2f} ms"
@@ -0,0 +1,144 @@
+import random
+import statistics
+import threading
+import time as timer
+from datetime import date, time, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.utils import timezone
+
+from api.models import Availability, Booking, SlotUnavailable, TemporarySignup, TutorProfile, TuteeProfile
+
+User = get_user_model()
+
+PREFIX = 'bench_db_'
+
+# Django's SQLite defaults, for --baseline
+BASELINE_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Concurrent write load (bookings, last-seen updates, signups, slot reads) against the '
+        'configured database. Run it once per profile (KUTUTORS_DB=sqlite / postgresql) to compare; '
+        'with --baseline SQLite runs with Django defaults instead of the tuned pragmas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+        parser.add_argument('--tutees', type=int, default=200)
+        parser.add_argument('--baseline', action='store_true', help='SQLite only: skip the WAL/pragma tuning')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        profile = connection.vendor
+        if options['baseline'] and connection.vendor == 'sqlite':
+            self.use_sqlite_defaults()
+            profile += ' (baseline)'
+        elif connection.vendor == 'sqlite':
+            profile += ' (tuned)'
+
+        self.cleanup()
+        try:
+            tutor, tutees = self.seed(options['tutees'])
+            self.stdout.write(
+                f"{profile}: {'threads':>7} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'locked':>7}"
+            )
+            for threads in options['threads']:
+                ops, latencies, locked = self.run(tutor, tutees, threads, options['seconds'], options['seed'])
+                latencies.sort()
+                p50 = statistics.median(latencies) * 1000 if latencies else 0
+                p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+                self.stdout.write(
+                    f"{'':{len(profile) + 1}} {threads:>7} {ops / options['seconds']:>9.0f} "
+                    f"{p50:>8.2f} {p95:>8.2f} {locked:>7}"
+                )
+        finally:
+            self.cleanup()
+
+    def use_sqlite_defaults(self):
+        connection.close()
+        settings.SQLITE_PRAGMAS = BASELINE_PRAGMAS
+        connections.settings['default'].get('OPTIONS', {}).pop('transaction_mode', None)
+
+    def seed(self, count):
+        tutor_user = User.objects.create_user(
+            username=f'{PREFIX}tutor', email=f'{PREFIX}tutor@example.com', password='!', role='Tutor'
+        )
+        tutor = TutorProfile.objects.create(user=tutor_user, subject='COMP 202')
+        users = User.objects.bulk_create([
+            User(username=f'{PREFIX}tutee_{i}', email=f'{PREFIX}tutee_{i}@example.com', password='!', role='Tutee')
+            for i in range(count)
+        ])
+        tutees = TuteeProfile.objects.bulk_create([TuteeProfile(user=user) for user in users])
+        return tutor, tutees
+
+    def run(self, tutor, tutees, threads, seconds, seed):
+        # Fresh slots for every run so bookings keep succeeding
+        start = date.today() + timedelta(days=1)
+        Availability.objects.filter(tutor=tutor).delete()
+        Availability.objects.bulk_create([
+            Availability(tutor=tutor, date=start + timedelta(days=day), start_time=time(hour), end_time=time(hour, 30))
+            for day in range(365) for hour in range(24)
+        ], batch_size=1000)
+        slot_ids = list(Availability.objects.filter(tutor=tutor).values_list('id', flat=True))
+        slots = iter(slot_ids)
+        slots_lock = threading.Lock()
+
+        ops = 0
+        locked = 0
+        latencies = []
+        results_lock = threading.Lock()
+        deadline = timer.perf_counter() + seconds
+
+        def worker(index):
+            nonlocal ops, locked
+            rng = random.Random(seed + index)
+            done, waits, errors = 0, [], 0
+            try:
+                while timer.perf_counter() < deadline:
+                    tutee = rng.choice(tutees)
+                    kind = rng.random()
+                    started = timer.perf_counter()
+                    try:
+                        if kind < 0.25:
+                            with slots_lock:
+                                slot_id = next(slots, None)
+                            if slot_id is not None:
+                                try:
+                                    Booking.book_slot(Availability(id=slot_id, tutor=tutor), tutee)
+                                except SlotUnavailable:
+                                    pass
+                        elif kind < 0.5:
+                            User.objects.filter(id=tutee.user_id).update(last_seen=timezone.now())
+                        elif kind < 0.6:
+                            email = f'{PREFIX}{threads}_{index}_{done}@example.com'
+                            TemporarySignup.objects.create(email=email, username=email.split('@')[0])
+                        else:
+                            list(Availability.objects.filter(tutor=tutor, status='Available')[:20])
+                    except OperationalError:
+                        errors += 1
+                        continue
+                    waits.append(timer.perf_counter() - started)
+                    done += 1
+            finally:
+                connection.close()
+            with results_lock:
+                ops += done
+                locked += errors
+                latencies.extend(waits)
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return ops, latencies, locked
+
+    def cleanup(self):
+        TemporarySignup.objects.filter(username__startswith=PREFIX).delete()
+        User.objects.filter(username__startswith=PREFIX).delete()
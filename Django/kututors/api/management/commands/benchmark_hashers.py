@@ -0,0 +1,56 @@
+import os
+import time as timer
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, verify_password
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from api.hashers import HASHER_THREADS
+
+
+class Command(BaseCommand):
+    help = 'Benchmark password verification (one login) for every configured hasher'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=50, help='Password checks per hasher')
+        parser.add_argument('--threads', type=int, default=HASHER_THREADS, help='Parallel checks')
+
+    def handle(self, *args, **options):
+        logins = options['logins']
+        threads = options['threads']
+        cores = os.cpu_count() or 1
+        self.stdout.write(f"{cores} cores, {threads} threads, {logins} logins per hasher")
+
+        for path in settings.PASSWORD_HASHERS:
+            hasher = import_string(path)()
+            try:
+                encoded = hasher.encode('correct horse battery', hasher.salt())
+            except ValueError as e:
+                # Hasher library not installed (e.g. argon2-cffi)
+                self.stdout.write(f"{hasher.algorithm:>14}: skipped ({e})")
+                continue
+            preferred = 'default' if hasher.algorithm == get_hasher().algorithm else hasher.algorithm
+
+            def login(_):
+                return verify_password('correct horse battery', encoded, preferred)[0]
+
+            started = timer.perf_counter()
+            for i in range(logins):
+                login(i)
+            serial = logins / (timer.perf_counter() - started)
+
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                started = timer.perf_counter()
+                results = list(pool.map(login, range(logins)))
+                parallel = logins / (timer.perf_counter() - started)
+            if not all(results):
+                self.stderr.write(f"{hasher.algorithm}: password did not verify")
+
+            self.stdout.write(
+                f"{hasher.algorithm:>14}: {1000 / serial:6.1f} ms/login, "
+                f"{serial:7.1f} logins/s on one core, "
+                f"{parallel:7.1f} logins/s with {threads} threads "
+                f"({parallel / min(threads, cores):.1f} per core)"
+            )
@@ -0,0 +1,68 @@
+import random
+import time as timer
+from datetime import date, time, timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.intervals import IntervalIndex
+
+
+class Command(BaseCommand):
+    help = 'Benchmark availability overlap checks: linear scan vs IntervalIndex'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tutors', type=int, default=200)
+        parser.add_argument('--slots', type=int, default=3000, help='Existing slots per tutor')
+        parser.add_argument('--checks', type=int, default=100000)
+        parser.add_argument('--days', type=int, default=120, help='Days the slots are spread over')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        first_day = date.today()
+
+        def random_slot():
+            minute = rng.randrange(0, 24 * 60 - 30, 15)
+            length = rng.choice([30, 60, 90, 120])
+            start = time(minute // 60, minute % 60)
+            end_minute = min(minute + length, 24 * 60 - 1)
+            end = time(end_minute // 60, end_minute % 60)
+            day = first_day + timedelta(days=rng.randrange(options['days']))
+            return day, start, end
+
+        intervals = [
+            ((tutor, day), start, end)
+            for tutor in range(options['tutors'])
+            for day, start, end in (random_slot() for _ in range(options['slots']))
+        ]
+        checks = [
+            ((rng.randrange(options['tutors']), day), start, end)
+            for day, start, end in (random_slot() for _ in range(options['checks']))
+        ]
+
+        started = timer.perf_counter()
+        index = IntervalIndex.from_intervals(intervals)
+        build_time = timer.perf_counter() - started
+
+        by_key = {}
+        for key, start, end in intervals:
+            by_key.setdefault(key, []).append((start, end))
+
+        started = timer.perf_counter()
+        linear_hits = sum(
+            any(start < other_end and other_start < end for other_start, other_end in by_key.get(key, []))
+            for key, start, end in checks
+        )
+        linear_time = timer.perf_counter() - started
+
+        started = timer.perf_counter()
+        index_hits = sum(index.overlaps(key, start, end) for key, start, end in checks)
+        index_time = timer.perf_counter() - started
+
+        if linear_hits != index_hits:
+            self.stderr.write(f'Mismatch: linear found {linear_hits} overlaps, index found {index_hits}')
+
+        self.stdout.write(f"{len(intervals)} slots, {len(checks)} checks, {linear_hits} overlaps")
+        self.stdout.write(f"IntervalIndex build: {build_time * 1000:.1f} ms")
+        self.stdout.write(f"Linear scan:   {linear_time * 1000:.1f} ms ({len(checks) / linear_time:,.0f} checks/s)")
+        self.stdout.write(f"IntervalIndex: {index_time * 1000:.1f} ms ({len(checks) / index_time:,.0f} checks/s)")
@@ -0,0 +1,90 @@
+import random
+import time as timer
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from api.models import TutorProfile
+from api.search import index_tutors, ranked_tutor_ids
+
+User = get_user_model()
+
+FIRST_NAMES = ['Ram', 'Sita', 'Hari', 'Gita', 'Apil', 'Amrita', 'Alisha', 'James', 'Deni', 'Bikash', 'Sujan', 'Anita']
+LAST_NAMES = ['Thapa', 'Paudel', 'Tiwari', 'Tyler', 'Waiba', 'Shrestha', 'Karki', 'Gurung', 'Rai', 'Adhikari']
+SUBJECTS = [
+    'COMP 102 Computer Programming', 'COMP 116 Object-Oriented Programming', 'COMP 202 Data Structures',
+    'COMP 232 Database Management Systems', 'COMP 307 Operating Systems', 'COMP 342 Computer Graphics',
+    'MATH 101 Calculus', 'MATH 208 Statistics and Probability', 'PHYS 101 General Physics',
+    'EEEG 202 Digital Logic', 'MCSC 201 Discrete Mathematics',
+]
+QUERIES = ['COMP 2', 'comp', 'thapa', 'data struct', 'math 208', 'gurung comp 3', 'physics']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark tutor search: icontains scan vs the token search index (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tutors', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        for count in options['tutors']:
+            with transaction.atomic():
+                self.seed(count, random.Random(options['seed']))
+                self.run(count, options['repeat'], options['page_size'])
+                transaction.set_rollback(True)
+
+    def seed(self, count, rng):
+        started = timer.perf_counter()
+        users = User.objects.bulk_create([
+            User(
+                username=f'bench_tutor_{i}', email=f'bench_tutor_{i}@example.com', password='!',
+                first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES), role='Tutor',
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        tutors = TutorProfile.objects.bulk_create([
+            TutorProfile(user=user, subject=rng.choice(SUBJECTS), semester=str(rng.randint(1, 8)))
+            for user in users
+        ], batch_size=1000)
+        for i in range(0, len(tutors), 5000):
+            index_tutors(tutors[i:i + 5000])
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+        self.stdout.write(f'\n{count} tutors seeded in {timer.perf_counter() - started:.1f}s')
+
+    def run(self, count, repeat, page_size):
+        tutors = TutorProfile.objects.select_related('user').filter(available=True)
+        self.stdout.write(f"{'query':<16}{'icontains ms':>14}{'index ms':>12}{'matches':>10}")
+        for query in QUERIES:
+            # The previous list_tutors path: every match, unranked
+            def icontains():
+                return list(tutors.filter(
+                    Q(user__first_name__icontains=query) |
+                    Q(user__last_name__icontains=query) |
+                    Q(subject__icontains=query) |
+                    Q(semester__icontains=query)
+                ))
+
+            def indexed():
+                tutor_ids = list(ranked_tutor_ids(query, available=True)[:page_size])
+                return list(tutors.in_bulk(tutor_ids).values())
+
+            scan_ms = self.time(icontains, repeat)
+            index_ms = self.time(indexed, repeat)
+            matches = ranked_tutor_ids(query, available=True).count()
+            self.stdout.write(f'{query:<16}{scan_ms:>14.1f}{index_ms:>12.1f}{matches:>10}')
+
+    def time(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            started = timer.perf_counter()
+            func()
+            elapsed = (timer.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
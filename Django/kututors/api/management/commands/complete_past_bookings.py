@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.completion import open_booking_stats, sweep_past_bookings
+
+
+class Command(BaseCommand):
+    help = (
+        'Complete (or with --expire, cancel) open bookings whose slot has ended (run with --loop as a sweeper). '
+        'Unlike cancelling through the API, which deletes the booking and frees its slot, expired bookings are '
+        'kept as cancelled history and their slots stay Booked: the slots have ended and cannot be booked again.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--expire', action='store_true', help='Mark past bookings cancelled instead of completing them')
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping periodically')
+        parser.add_argument('--interval', type=float, default=300.0, help='Seconds between sweeps')
+        parser.add_argument('--stats', action='store_true', help='Print open booking counts and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for key, value in open_booking_stats().items():
+                self.stdout.write(f'{key}: {value}')
+            return
+
+        action = 'Cancelled' if options['expire'] else 'Completed'
+        total = 0
+        while True:
+            closed = sweep_past_bookings(expire=options['expire'])
+            total += closed
+            if closed or not options['loop']:
+                self.stdout.write(f'{action} {closed} past bookings ({total} total)')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api.images import InvalidImage, store_profile_image
+from api.models import TutorProfile, TuteeProfile
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails for profile pictures uploaded before the image pipeline'
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        for model in (TutorProfile, TuteeProfile):
+            profiles = model.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+            for profile in profiles.filter(profile_thumbnails={}).iterator():
+                try:
+                    with profile.profile_picture.open('rb') as picture:
+                        store_profile_image(profile, picture)
+                except (InvalidImage, OSError) as e:
+                    failed += 1
+                    self.stderr.write(f'{model.__name__} {profile.pk}: {e}')
+                    continue
+                done += 1
+        self.stdout.write(f'Generated thumbnails for {done} profiles ({failed} failed)')
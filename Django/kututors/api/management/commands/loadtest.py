@@ -0,0 +1,212 @@
+import http.client
+import json
+import random
+import statistics
+import subprocess
+import threading
+import time as timer
+from collections import defaultdict
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Client:
+    """Keep-alive HTTP client for one virtual user; records latency per endpoint name"""
+
+    def __init__(self, base_url, token, results):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.token = token
+        self.results = results
+        self.connection = None
+
+    def request(self, name, method, path, body=None, token=None):
+        headers = {'Authorization': f'Token {token or self.token}'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        started = timer.perf_counter()
+        for attempt in range(2):
+            try:
+                if self.connection is None:
+                    self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+                self.connection.request(method, self.prefix + path, payload, headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # The server closed the keep-alive connection; retry once on a new one
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    self.results.record(name, timer.perf_counter() - started, None)
+                    return None, None
+        self.results.record(name, timer.perf_counter() - started, response.status)
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+class Results:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name, seconds, status):
+        with self._lock:
+            self.latencies[name].append(seconds)
+            if status is None or status >= 500:
+                self.errors[name] += 1
+
+    def summary(self, elapsed):
+        summary = {}
+        for name, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            summary[name] = {
+                'requests': len(latencies),
+                'errors': self.errors[name],
+                'rps': len(latencies) / elapsed,
+                'p50_ms': _percentile(latencies, 50) * 1000,
+                'p95_ms': _percentile(latencies, 95) * 1000,
+                'p99_ms': _percentile(latencies, 99) * 1000,
+            }
+        return summary
+
+
+def _percentile(values, percent):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
+
+
+def run_scenario(client, manifest, rng):
+    """browse tutors -> view a tutor and their availability -> book -> cancel or complete"""
+    status, data = client.request('list_tutors', 'GET', f'/api/list-tutors/?page={rng.randint(1, 5)}')
+    tutors = (data or {}).get('tutors') or []
+    if status != 200 or not tutors:
+        return
+    tutor_id = rng.choice(tutors)['id']
+    client.request('get_tutor_profile', 'GET', f'/api/tutor/{tutor_id}/')
+    status, data = client.request('get_tutor_availability_by_id', 'GET', f'/api/tutor/{tutor_id}/availability/')
+    open_slots = [slot for slot in (data or {}).get('availabilities', []) if slot['status'] == 'Available']
+    if status != 200 or not open_slots:
+        return
+    status, data = client.request(
+        'book_demo_session', 'POST', '/api/book-demo-session/', {'availability_id': rng.choice(open_slots)['id']}
+    )
+    if status != 201:
+        return
+    booking_id = data['booking_id']
+    client.request('booked_classes', 'GET', '/api/booked-classes/')
+    tutor_token = manifest['tutors'].get(str(tutor_id))
+    if rng.random() < 0.5 or tutor_token is None:
+        client.request('cancel_booking', 'DELETE', f'/api/cancel-booking/{booking_id}/')
+    else:
+        client.request('mark_session_complete', 'POST', f'/api/mark-complete/{booking_id}/', token=tutor_token)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the booking flow over HTTP against a running server (runserver, gunicorn or uvicorn) '
+        'using the dataset from `seed_dataset`; reports p50/p95/p99 and requests/sec per endpoint'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--manifest', default='loadtest_manifest.json')
+        parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Save the results as JSON to this file')
+        parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='Compare two saved results and exit')
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self.compare(*options['compare'])
+
+        try:
+            with open(options['manifest']) as f:
+                manifest = json.load(f)
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["manifest"]}; run seed_dataset first ({e})')
+
+        results = Results()
+        deadline = timer.perf_counter() + options['duration']
+
+        def virtual_user(index):
+            rng = random.Random(options['seed'] + index)
+            client = Client(options['base_url'], manifest['tutees'][index % len(manifest['tutees'])], results)
+            try:
+                while timer.perf_counter() < deadline:
+                    run_scenario(client, manifest, rng)
+            finally:
+                client.close()
+
+        started = timer.perf_counter()
+        users = [threading.Thread(target=virtual_user, args=(i,)) for i in range(options['users'])]
+        for thread in users:
+            thread.start()
+        for thread in users:
+            thread.join()
+        summary = results.summary(timer.perf_counter() - started)
+
+        self.print_summary(summary)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'commit': _git_commit(),
+                    'started_at': datetime.now(timezone.utc).isoformat(),
+                    'base_url': options['base_url'],
+                    'users': options['users'],
+                    'duration': options['duration'],
+                    'seed': options['seed'],
+                    'endpoints': summary,
+                }, f, indent=2)
+            self.stdout.write(f"Saved results to {options['output']}")
+
+    def print_summary(self, summary):
+        self.stdout.write(
+            f"{'endpoint':<30} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for name, row in summary.items():
+            self.stdout.write(
+                f"{name:<30} {row['requests']:>8} {row['errors']:>6} {row['rps']:>8.1f} "
+                f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}"
+            )
+
+    def compare(self, before_path, after_path):
+        with open(before_path) as f:
+            before = json.load(f)
+        with open(after_path) as f:
+            after = json.load(f)
+        self.stdout.write(f"{before.get('commit')} -> {after.get('commit')}")
+        self.stdout.write(f"{'endpoint':<30} {'req/s':>16} {'p95 ms':>18}")
+        for name in sorted(set(before['endpoints']) | set(after['endpoints'])):
+            old = before['endpoints'].get(name)
+            new = after['endpoints'].get(name)
+            if not old or not new:
+                self.stdout.write(f'{name:<30} only in {"after" if new else "before"}')
+                continue
+            self.stdout.write(
+                f"{name:<30} {old['rps']:>7.1f} -> {new['rps']:<7.1f} {old['p95_ms']:>8.1f} -> {new['p95_ms']:<8.1f}"
+            )
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.signups import purge_expired_signups, signup_stats
+
+
+class Command(BaseCommand):
+    help = 'Delete expired temporary signups in batches (run with --loop as a sweeper)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--loop', action='store_true', help='Keep purging periodically')
+        parser.add_argument('--interval', type=float, default=300.0, help='Seconds between purges')
+        parser.add_argument('--stats', action='store_true', help='Print signup counts and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for key, value in signup_stats().items():
+                self.stdout.write(f'{key}: {value}')
+            return
+
+        total = 0
+        while True:
+            purged = purge_expired_signups(options['batch_size'])
+            total += purged
+            if purged or not options['loop']:
+                self.stdout.write(f'Purged {purged} expired signups ({total} total)')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import TutorStats
+
+
+class Command(BaseCommand):
+    help = 'Recount every tutor\'s booking stats from the bookings and fix rows that have drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the rows that differ')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Lock the rows first so transitions committing meanwhile are not counted twice or lost
+            existing = {stats.tutor_id: stats for stats in TutorStats.objects.select_for_update()}
+            counted = TutorStats.counted()
+
+            drifted, missing = [], []
+            for tutor_id in existing.keys() | counted.keys():
+                expected = counted.get(tutor_id, dict.fromkeys(TutorStats.COUNTERS, 0))
+                stats = existing.get(tutor_id)
+                if stats is None:
+                    missing.append(TutorStats(tutor_id=tutor_id, **expected))
+                    continue
+                actual = {name: getattr(stats, name) for name in TutorStats.COUNTERS}
+                if actual != expected:
+                    self.stdout.write(f'tutor {tutor_id}: {actual} -> {expected}')
+                    for name, value in expected.items():
+                        setattr(stats, name, value)
+                    drifted.append(stats)
+
+            if not options['dry_run']:
+                TutorStats.objects.bulk_update(drifted, TutorStats.COUNTERS, batch_size=1000)
+                TutorStats.objects.bulk_create(missing, batch_size=1000)
+
+        verb = 'Would fix' if options['dry_run'] else 'Fixed'
+        self.stdout.write(f'{verb} {len(drifted)} drifted and {len(missing)} missing rows ({len(existing)} checked)')
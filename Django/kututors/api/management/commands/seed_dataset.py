@@ -0,0 +1,113 @@
+import json
+import random
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from api.models import Availability, Booking, TutorProfile, TutorStats, TuteeProfile
+from api.search import index_tutors
+
+User = get_user_model()
+
+PREFIX = 'load_'
+
+FIRST_NAMES = ['Ram', 'Sita', 'Hari', 'Gita', 'Apil', 'Amrita', 'Alisha', 'James', 'Deni', 'Bikash', 'Sujan', 'Anita']
+LAST_NAMES = ['Thapa', 'Paudel', 'Tiwari', 'Tyler', 'Waiba', 'Shrestha', 'Karki', 'Gurung', 'Rai', 'Adhikari']
+SUBJECTS = [
+    'COMP 102 Computer Programming', 'COMP 116 Object-Oriented Programming', 'COMP 202 Data Structures',
+    'COMP 232 Database Management Systems', 'COMP 307 Operating Systems', 'COMP 342 Computer Graphics',
+    'MATH 101 Calculus', 'MATH 208 Statistics and Probability', 'PHYS 101 General Physics',
+]
+DEPARTMENTS = ['Computer Science', 'Computer Engineering']
+
+
+class Command(BaseCommand):
+    help = (
+        'Create a synthetic dataset of tutors, tutees, availability and bookings for load tests. '
+        'The same --seed gives the same dataset; API tokens are written to --manifest for `loadtest`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tutors', type=int, default=1000)
+        parser.add_argument('--tutees', type=int, default=2000)
+        parser.add_argument('--days', type=int, default=14, help='Days of availability per tutor, from tomorrow')
+        parser.add_argument('--slots-per-day', type=int, default=4)
+        parser.add_argument('--booked', type=float, default=0.3, help='Fraction of slots already booked')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--manifest', default='loadtest_manifest.json')
+        parser.add_argument('--clear', action='store_true', help='Only delete a previously seeded dataset')
+
+    def handle(self, *args, **options):
+        deleted, _ = User.objects.filter(username__startswith=PREFIX).delete()
+        if deleted:
+            self.stdout.write(f'Deleted the previous dataset ({deleted} rows)')
+        if options['clear']:
+            return
+
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            manifest = self.seed(rng, options)
+        with open(options['manifest'], 'w') as f:
+            json.dump(manifest, f, indent=2)
+        self.stdout.write(
+            f"Seeded {options['tutors']} tutors, {options['tutees']} tutees, {manifest['slots']} slots and "
+            f"{manifest['bookings']} bookings; tokens in {options['manifest']}"
+        )
+
+    def seed(self, rng, options):
+        # bulk_create skips CustomUser.save(), which fills normalized_email for the email login
+        users = User.objects.bulk_create([
+            User(
+                username=f'{PREFIX}{role.lower()}_{i}', email=f'{PREFIX}{role.lower()}_{i}@example.com',
+                normalized_email=User.normalize_email_address(f'{PREFIX}{role.lower()}_{i}@example.com'),
+                password='!', role=role, first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                is_verified=True,
+            )
+            for role, count in (('Tutor', options['tutors']), ('Tutee', options['tutees']))
+            for i in range(count)
+        ], batch_size=1000)
+        tutor_users, tutee_users = users[:options['tutors']], users[options['tutors']:]
+
+        tutors = TutorProfile.objects.bulk_create([
+            TutorProfile(
+                user=user, subject=rng.choice(SUBJECTS), department=rng.choice(DEPARTMENTS),
+                semester=str(rng.randint(1, 8)), rate=str(rng.randrange(300, 1500, 100)),
+            )
+            for user in tutor_users
+        ], batch_size=1000)
+        tutees = TuteeProfile.objects.bulk_create([TuteeProfile(user=user) for user in tutee_users], batch_size=1000)
+        index_tutors(tutors)
+
+        tomorrow = date.today() + timedelta(days=1)
+        slots = []
+        for tutor in tutors:
+            for day in range(options['days']):
+                for hour in rng.sample(range(8, 20), options['slots_per_day']):
+                    booked = rng.random() < options['booked']
+                    slots.append(Availability(
+                        tutor=tutor, date=tomorrow + timedelta(days=day), start_time=time(hour),
+                        end_time=time(hour + 1), status='Booked' if booked else 'Available',
+                    ))
+        slots = Availability.objects.bulk_create(slots, batch_size=1000)
+        bookings = Booking.objects.bulk_create([
+            Booking(availability=slot, tutee=rng.choice(tutees), status=rng.choice(['pending', 'pending', 'ongoing']))
+            for slot in slots if slot.status == 'Booked'
+        ], batch_size=1000)
+        # bulk_create skips the booking transitions that keep these counters
+        TutorStats.objects.bulk_create([
+            TutorStats(tutor_id=tutor_id, **counts)
+            for tutor_id, counts in TutorStats.counted([tutor.id for tutor in tutors]).items()
+        ], batch_size=1000)
+
+        tokens = Token.objects.bulk_create([Token(key=Token.generate_key(), user=user) for user in users], batch_size=1000)
+        token_by_user = {token.user_id: token.key for token in tokens}
+        return {
+            'seed': options['seed'],
+            'slots': len(slots),
+            'bookings': len(bookings),
+            'tutors': {str(tutor.id): token_by_user[tutor.user_id] for tutor in tutors},
+            'tutees': [token_by_user[user.id] for user in tutee_users],
+        }
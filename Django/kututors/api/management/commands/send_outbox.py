@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.outbox import queue_stats, send_pending
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbound emails (run with --loop as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls when idle')
+        parser.add_argument('--stats', action='store_true', help='Print queue depth and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for key, value in queue_stats().items():
+                self.stdout.write(f'{key}: {value}')
+            return
+
+        while True:
+            sent, failed = send_pending(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f'Sent {sent}, failed {failed}')
+            if not options['loop']:
+                break
+            # Drain full batches back to back, sleep only when idle
+            if sent + failed < options['batch_size']:
+                time.sleep(options['interval'])
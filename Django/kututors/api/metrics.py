@@ -0,0 +1,179 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from .ratelimit import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Stats of the request being handled; sync_to_async copies the context,
+# so queries the async ORM runs on other threads are counted too
+request_stats = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'query_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+def count_queries(execute, sql, params, many, context):
+    """Database execute wrapper adding each query to the current request's stats"""
+    stats = request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - started
+
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class RouteMetrics:
+    """Per-route request counts, latency and query histograms, DB time and response bytes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._requests = {}
+            self._routes = {}
+
+    def observe(self, route, method, status, seconds, stats, response_bytes):
+        """Record one request; returns True if it went over its query budget"""
+        budget = query_budget(route, method)
+        over_budget = budget is not None and stats.queries > budget
+        with self._lock:
+            key = (route, method, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            entry = self._routes.get((route, method))
+            if entry is None:
+                entry = self._routes[(route, method)] = {
+                    'latency': Histogram(LATENCY_BUCKETS),
+                    'queries': Histogram(QUERY_BUCKETS),
+                    'query_seconds': 0.0,
+                    'response_bytes': 0,
+                    'over_budget': 0,
+                }
+            entry['latency'].observe(seconds)
+            entry['queries'].observe(stats.queries)
+            entry['query_seconds'] += stats.query_seconds
+            entry['response_bytes'] += response_bytes
+            entry['over_budget'] += over_budget
+        if over_budget:
+            logger.warning(
+                '%s %s ran %d queries (budget %d) in %.1f ms',
+                method, route, stats.queries, budget, seconds * 1000,
+            )
+        return over_budget
+
+    def snapshot(self, route, method):
+        """Copy of one route's counters, for tests and ad hoc inspection"""
+        with self._lock:
+            entry = self._routes.get((route, method))
+            if entry is None:
+                return None
+            return {
+                'requests': entry['latency'].count,
+                'seconds': entry['latency'].total,
+                'queries': entry['queries'].total,
+                'query_seconds': entry['query_seconds'],
+                'response_bytes': entry['response_bytes'],
+                'over_budget': entry['over_budget'],
+            }
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines += _header('kututors_http_requests_total', 'counter', 'Requests per route, method and status')
+            for (route, method, status), count in sorted(self._requests.items()):
+                lines.append(f'kututors_http_requests_total{_labels(route=route, method=method, status=status)} {count}')
+
+            routes = sorted(self._routes.items())
+            lines += _header('kututors_http_request_duration_seconds', 'histogram', 'Request latency')
+            for (route, method), entry in routes:
+                lines += _histogram('kututors_http_request_duration_seconds', entry['latency'], route=route, method=method)
+            lines += _header('kututors_db_queries', 'histogram', 'Database queries per request')
+            for (route, method), entry in routes:
+                lines += _histogram('kututors_db_queries', entry['queries'], route=route, method=method)
+            for name, field, kind, help_text in (
+                ('kututors_db_query_seconds_total', 'query_seconds', 'counter', 'Time spent in database queries'),
+                ('kututors_http_response_bytes_total', 'response_bytes', 'counter', 'Response body bytes'),
+                ('kututors_query_budget_exceeded_total', 'over_budget', 'counter', 'Requests over their query budget'),
+            ):
+                lines += _header(name, kind, help_text)
+                for (route, method), entry in routes:
+                    lines.append(f'{name}{_labels(route=route, method=method)} {_number(entry[field])}')
+
+        lines += _header('kututors_rate_limited_total', 'counter', 'Requests rejected by the rate limiter')
+        for rule, count in sorted(rate_limiter.stats().items()):
+            lines.append(f'kututors_rate_limited_total{_labels(rule=rule)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def query_budget(route, method):
+    """Most queries a method request to route may run before a warning is logged"""
+    default = getattr(settings, 'DEFAULT_QUERY_BUDGET', None)
+    budget = getattr(settings, 'QUERY_BUDGETS', {}).get(route, default)
+    if isinstance(budget, dict):
+        return budget.get(method, default)
+    return budget
+
+
+def _header(name, kind, help_text):
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+
+
+def _labels(**labels):
+    escaped = (
+        f'{key}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for key, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram(name, histogram, **labels):
+    lines = []
+    cumulative = 0
+    for bound, count in zip((*histogram.bounds, '+Inf'), histogram.counts):
+        cumulative += count
+        le = bound if bound == '+Inf' else _number(float(bound))
+        lines.append(f'{name}_bucket{_labels(**labels, le=le)} {cumulative}')
+    lines.append(f'{name}_sum{_labels(**labels)} {_number(float(histogram.total))}')
+    lines.append(f'{name}_count{_labels(**labels)} {histogram.count}')
+    return lines
+
+
+route_metrics = RouteMetrics()
@@ -0,0 +1,88 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+from .metrics import RequestStats, request_stats, route_metrics
+from .presence import presence
+
+
+class UpdateLastSeenMiddleware:
+    """
+    Record authenticated users as seen.
+    Runs after the view so token-authenticated DRF requests are included;
+    the timestamp is buffered by api.presence rather than written per request.
+    Supports async requests too, so async views stay on the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            presence.touch(user)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        user = getattr(request, 'user', None)
+        if isinstance(user, SimpleLazyObject):
+            # Not authenticated by a view; resolving it here must not block
+            user = await request.auser()
+        if user is not None and user.is_authenticated:
+            await presence.atouch(user)
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, query count and time, and response size per route in
+    api.metrics, logging requests that go over their query budget.
+    Place it first so the time spent in other middleware is included.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_stats.reset(token)
+        self.observe(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_stats.reset(token)
+        self.observe(request, response, time.perf_counter() - started, stats)
+        return response
+
+    def observe(self, request, response, seconds, stats):
+        match = request.resolver_match
+        # The URL pattern rather than the path, so ids do not split a route
+        route = '/' + match.route if match else 'unmatched'
+        size = 0 if response.streaming else len(response.content)
+        route_metrics.observe(route, request.method, response.status_code, seconds, stats, size)
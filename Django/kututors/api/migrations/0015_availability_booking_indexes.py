@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_delete_session'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='availability',
+            name='tutor',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='availabilities', to='api.tutorprofile'),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='tutee',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='api.tuteeprofile'),
+        ),
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(fields=['tutor', 'date', 'status'], name='avail_tutor_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='availability',
+            index=models.Index(condition=models.Q(('status', 'Available')), fields=['date', 'start_time', 'id'], name='avail_open_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['tutee', 'status'], name='booking_tutee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['availability', 'status'], name='booking_avail_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'completed')), fields=['tutee', '-completed_at'], name='booking_tutee_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'completed')), fields=['availability', '-completed_at'], name='booking_avail_completed_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:10
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of api.search as of this migration; the live module may change
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+MAX_TOKEN_LENGTH = 50
+FIELD_WEIGHTS = {'subject': 4, 'name': 3, 'department': 1, 'semester': 1}
+
+
+def tokenize(text):
+    tokens = TOKEN_RE.findall((text or '').lower())
+    tokens += [
+        word + number
+        for word, number in zip(tokens, tokens[1:])
+        if word.isalpha() and number.isdigit()
+    ]
+    return [token[:MAX_TOKEN_LENGTH] for token in tokens]
+
+
+def tutor_tokens(tutor):
+    values = {
+        'subject': tutor.subject,
+        'name': f"{tutor.user.first_name} {tutor.user.last_name}",
+        'department': tutor.department,
+        'semester': tutor.semester,
+    }
+    return {(field, token) for field, text in values.items() for token in tokenize(text)}
+
+
+def index_existing_tutors(apps, schema_editor):
+    TutorProfile = apps.get_model('api', 'TutorProfile')
+    TutorSearchToken = apps.get_model('api', 'TutorSearchToken')
+    TutorSearchToken.objects.bulk_create([
+        TutorSearchToken(tutor=tutor, field=field, token=token, weight=FIELD_WEIGHTS[field])
+        for tutor in TutorProfile.objects.select_related('user')
+        for field, token in tutor_tokens(tutor)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_availability_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TutorSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=20)),
+                ('token', models.CharField(max_length=50)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('tutor', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='api.tutorprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'tutor', 'weight'], name='search_token_tutor_idx')],
+                'unique_together': {('tutor', 'field', 'token')},
+            },
+        ),
+        migrations.RunPython(index_existing_tutors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:19
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower, Trim
+
+
+def normalize_existing_emails(apps, schema_editor):
+    CustomUser = apps.get_model('api', 'CustomUser')
+    CustomUser.objects.exclude(email='').update(normalized_email=Lower(Trim('email')))
+    CustomUser.objects.filter(normalized_email='').update(normalized_email=None)
+
+    # Signup used to compare emails case-sensitively, so two accounts can
+    # share an address; which one keeps it is for an admin to decide
+    duplicates = list(
+        CustomUser.objects.exclude(normalized_email=None).values('normalized_email')
+        .annotate(accounts=Count('id')).filter(accounts__gt=1)
+        .values_list('normalized_email', flat=True)
+    )
+    if duplicates:
+        users = CustomUser.objects.filter(normalized_email__in=duplicates).order_by('normalized_email', 'id')
+        listing = '\n'.join(f'  {user.normalized_email}: user {user.id} ({user.username}, {user.email})' for user in users)
+        raise RuntimeError(
+            'Cannot make emails unique: these accounts share an email when case and surrounding '
+            f'spaces are ignored. Change or clear the emails of all but one and migrate again.\n{listing}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_outboundemail'),
+    ]
+
+    operations = [
+        # Added without the unique constraint so existing clashes can be reported
+        migrations.AddField(
+            model_name='customuser',
+            name='normalized_email',
+            field=models.CharField(editable=False, max_length=254, null=True),
+        ),
+        migrations.RunPython(normalize_existing_emails, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='customuser',
+            name='normalized_email',
+            field=models.CharField(editable=False, max_length=254, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_customuser_normalized_email'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='temporarysignup',
+            name='username',
+            field=models.CharField(db_index=True, max_length=150),
+        ),
+        migrations.AddIndex(
+            model_name='temporarysignup',
+            index=models.Index(fields=['expires_at'], name='tempsignup_expires_idx'),
+        ),
+    ]
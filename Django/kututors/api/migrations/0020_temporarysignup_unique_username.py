@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_temporarysignup_expiry_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='temporarysignup',
+            name='username',
+            field=models.CharField(max_length=150, unique=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_temporarysignup_unique_username'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tuteeprofile',
+            name='profile_thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='tutorprofile',
+            name='profile_thumbnails',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
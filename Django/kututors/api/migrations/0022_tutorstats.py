@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_existing_bookings(apps, schema_editor):
+    Booking = apps.get_model('api', 'Booking')
+    TutorStats = apps.get_model('api', 'TutorStats')
+    rows = Booking.objects.values('availability__tutor_id').annotate(
+        completed_sessions=Count('id', filter=Q(status='completed')),
+        upcoming_sessions=Count('id', filter=Q(status__in=['pending', 'ongoing'])),
+        distinct_tutees=Count('tutee', distinct=True),
+    ).order_by()
+    TutorStats.objects.bulk_create([
+        TutorStats(tutor_id=row.pop('availability__tutor_id'), **row) for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_profile_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TutorStats',
+            fields=[
+                ('tutor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='api.tutorprofile')),
+                ('completed_sessions', models.IntegerField(default=0)),
+                ('upcoming_sessions', models.IntegerField(default=0)),
+                ('distinct_tutees', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(count_existing_bookings, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser
 from datetime import timedelta
 from django.utils import timezone
@@ -8,7 +10,7 @@ class TemporarySignup(models.Model):
     Temporary storage for user signups pending email verification
     """
     email = models.EmailField(unique=True)
-    username = models.CharField(max_length=150)
+    username = models.CharField(max_length=150, unique=True)
     first_name = models.CharField(max_length=150)
     last_name = models.CharField(max_length=150, blank=True)
     password = models.CharField(max_length=128)  # Stores hashed password with salt
@@ -30,10 +32,75 @@ class TemporarySignup(models.Model):
     class Meta:
         verbose_name = 'Temporary Signup'
         verbose_name_plural = 'Temporary Signups'
+        indexes = [
+            # Expired signups are purged by `python manage.py purge_signups`
+            models.Index(fields=['expires_at'], name='tempsignup_expires_idx'),
+        ]
     
     def __str__(self):
         return f"{self.email} - {self.verification_code}"
 
+class MaintenanceCounter(models.Model):
+    """
+    Running total kept by a maintenance job (e.g. signups purged), stored
+    so it survives restarts and is shared by every process
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    SIGNUPS_PURGED = 'signups_purged'
+
+    @classmethod
+    def increment(cls, name, amount):
+        if cls.objects.filter(name=name).update(value=F('value') + amount, updated_at=timezone.now()):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, value=amount)
+        except IntegrityError:
+            # Created concurrently
+            cls.objects.filter(name=name).update(value=F('value') + amount, updated_at=timezone.now())
+
+    @classmethod
+    def value_of(cls, name):
+        return cls.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+class OutboundEmail(models.Model):
+    """
+    Email waiting to be sent by the outbox worker (see api.outbox)
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipient = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            # Worker polling for due emails
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.recipient} - {self.subject} ({self.status})"
+
 class CustomUser(AbstractUser):
     ROLE_CHOICES = [
         ('Tutor', 'Tutor'),
@@ -44,9 +111,23 @@ class CustomUser(AbstractUser):
     contact = models.CharField(max_length=10, null=True, blank=True)
     is_verified = models.BooleanField(default=False)
     verification_code = models.CharField(max_length=6, blank=True, null=True)
-    is_online = models.BooleanField(default=False)  
+    is_online = models.BooleanField(default=False)
     last_seen = models.DateTimeField(null=True, blank=True)
-    
+    # Lower-cased email kept in sync by save(); login looks users up by it
+    normalized_email = models.CharField(max_length=254, unique=True, null=True, editable=False)
+
+    @staticmethod
+    def normalize_email_address(email):
+        """Key used to match emails case-insensitively; None for a blank email"""
+        return (email or '').strip().lower() or None
+
+    def save(self, *args, **kwargs):
+        self.normalized_email = self.normalize_email_address(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_email'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.username} ({self.role})"
 
@@ -65,10 +146,30 @@ class TutorProfile(models.Model):
     rate = models.CharField(max_length=20, default="Not Provided")  # Hourly rate
     account_number = models.CharField(max_length=20, default="Not Provided") 
     profile_picture = models.ImageField(upload_to='tutor_profiles/pictures/', null=True, blank=True)
+    profile_thumbnails = models.JSONField(default=dict, blank=True)  # size -> file name, see api.images
     
     def __str__(self):
         return f"{self.user.username} - {self.subject}"
 
+class TutorSearchToken(models.Model):
+    """
+    Normalized search token of a tutor profile field.
+    Kept in sync by api.signals; see api.search for tokenizing and ranking.
+    """
+    tutor = models.ForeignKey(TutorProfile, on_delete=models.CASCADE, related_name='search_tokens', db_index=False)
+    field = models.CharField(max_length=20)
+    token = models.CharField(max_length=50)
+    weight = models.PositiveSmallIntegerField(default=1)
+    
+    class Meta:
+        unique_together = ['tutor', 'field', 'token']
+        indexes = [
+            models.Index(fields=['token', 'tutor', 'weight'], name='search_token_tutor_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.tutor_id} {self.field}:{self.token}"
+
 class TuteeProfile(models.Model):
     DEPARTMENT_CHOICES = [
         ('Computer Science', 'Computer Science'),
@@ -80,6 +181,7 @@ class TuteeProfile(models.Model):
     semester = models.CharField(max_length=20, default="Unknown")
     department = models.CharField(max_length=50, choices=DEPARTMENT_CHOICES, default="Computer Science")
     profile_picture = models.ImageField(upload_to='tutor_profiles/pictures/', null=True, blank=True)
+    profile_thumbnails = models.JSONField(default=dict, blank=True)  # size -> file name, see api.images
     
     def __str__(self):
         return f"{self.user.username} - {self.semester}"
@@ -94,7 +196,8 @@ class Availability(models.Model):
         ('Unavailable', 'Unavailable'),
     ]
     
-    tutor = models.ForeignKey(TutorProfile, on_delete=models.CASCADE, related_name='availabilities', null=True, blank=True)
+    # Lookups by tutor are served by the composite indexes below
+    tutor = models.ForeignKey(TutorProfile, on_delete=models.CASCADE, related_name='availabilities', null=True, blank=True, db_index=False)
     date = models.DateField()
     start_time = models.TimeField()
     end_time = models.TimeField()
@@ -105,10 +208,33 @@ class Availability(models.Model):
     class Meta:
         ordering = ['date', 'start_time']
         unique_together = ['tutor', 'date', 'start_time']
+        indexes = [
+            # Tutor's own upcoming slots, filtered by status
+            models.Index(fields=['tutor', 'date', 'status'], name='avail_tutor_date_status_idx'),
+            # Open slots feed (demo_sessions), in keyset order
+            models.Index(
+                fields=['date', 'start_time', 'id'],
+                condition=models.Q(status='Available'),
+                name='avail_open_date_time_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.tutor.user.username} - {self.date} {self.start_time}-{self.end_time} ({self.status})"
     
+    @classmethod
+    def overlapping(cls, tutor, date, start_time, end_time):
+        """
+        Tutor's slots on date that overlap [start_time, end_time).
+        Served by the (tutor, date, start_time) unique index.
+        """
+        return cls.objects.filter(
+            tutor=tutor,
+            date=date,
+            start_time__lt=end_time,
+            end_time__gt=start_time
+        )
+    
     def formatted_time(self):
         """Returns formatted time string like '2 PM - 3 PM'"""
         return f"{self.start_time.strftime('%I:%M %p')} - {self.end_time.strftime('%I:%M %p')}"
@@ -121,6 +247,10 @@ class Availability(models.Model):
         """Returns day name like 'Monday'"""
         return self.date.strftime('%A')
 
+class SlotUnavailable(Exception):
+    """Raised when an availability slot has already been booked"""
+
+
 class Booking(models.Model):
     """
     Represents a booking/session between a tutor and tutee
@@ -131,6 +261,8 @@ class Booking(models.Model):
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
     ]
+    # Booked sessions that have not happened yet
+    OPEN_STATUSES = ('pending', 'ongoing')
     
     availability = models.OneToOneField(
         Availability, 
@@ -140,7 +272,8 @@ class Booking(models.Model):
     tutee = models.ForeignKey(
         TuteeProfile, 
         on_delete=models.CASCADE, 
-        related_name='bookings'
+        related_name='bookings',
+        db_index=False  # Covered by booking_tutee_status_idx
     )
     is_demo = models.BooleanField(default=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -151,6 +284,23 @@ class Booking(models.Model):
     
     class Meta:
         ordering = ['-booked_at']
+        indexes = [
+            # Tutee's bookings by status
+            models.Index(fields=['tutee', 'status'], name='booking_tutee_status_idx'),
+            # Tutor's bookings by status (joined through availability)
+            models.Index(fields=['availability', 'status'], name='booking_avail_status_idx'),
+            # Completed sessions, newest first
+            models.Index(
+                fields=['tutee', '-completed_at'],
+                condition=models.Q(status='completed'),
+                name='booking_tutee_completed_idx',
+            ),
+            models.Index(
+                fields=['availability', '-completed_at'],
+                condition=models.Q(status='completed'),
+                name='booking_avail_completed_idx',
+            ),
+        ]
     
     def __str__(self):
         tutor_name = self.availability.tutor.user.username
@@ -165,18 +315,162 @@ class Booking(models.Model):
     def subject(self):
         return self.availability.tutor.subject
     
+    @classmethod
+    def book_slot(cls, availability, tutee, is_demo=True):
+        """
+        Atomically claim an available slot and create its booking.
+        The slot is claimed with a conditional UPDATE, so only one of several
+        concurrent callers can win; the others get SlotUnavailable.
+        """
+        with transaction.atomic():
+            claimed = Availability.objects.filter(
+                id=availability.id,
+                status='Available'
+            ).update(status='Booked', updated_at=timezone.now())
+            if not claimed:
+                raise SlotUnavailable()
+            
+            try:
+                booking = cls.objects.create(
+                    availability=availability,
+                    tutee=tutee,
+                    is_demo=is_demo,
+                    status='pending'
+                )
+            except IntegrityError:
+                # A stale booking row still points at this slot
+                raise SlotUnavailable()
+            
+            TutorStats.record_booked(booking)
+        
+        availability.status = 'Booked'
+        return booking
+    
     def mark_completed(self):
         """Mark booking as completed"""
-        self.status = 'completed'
-        self.completed_at = timezone.now()
-        self.save()
-
-class UpdateLastSeenMiddleware:
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
-        if request.user.is_authenticated:
-            request.user.last_seen = timezone.now()
-            request.user.save(update_fields=['last_seen'])
-        return self.get_response(request)
\ No newline at end of file
+        with transaction.atomic():
+            # The stored status, not this instance's: a bulk complete or the
+            # sweeper may have closed the booking since it was loaded
+            previous = Booking.objects.select_for_update().values_list('status', flat=True).get(id=self.id)
+            self.status = 'completed'
+            self.completed_at = timezone.now()
+            self.save(update_fields=['status', 'completed_at', 'updated_at'])
+            TutorStats.record_transition(self.availability.tutor_id, previous, 'completed')
+
+
+class TutorStats(models.Model):
+    """
+    Per-tutor booking counters for dashboards and tutor lists.
+    Booking transitions update them in the same transaction, so reading them
+    never scans bookings; `rebuild_tutor_stats` reconciles any drift.
+    """
+    tutor = models.OneToOneField(TutorProfile, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    completed_sessions = models.IntegerField(default=0)
+    upcoming_sessions = models.IntegerField(default=0)  # Booking.OPEN_STATUSES
+    distinct_tutees = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    COUNTERS = ('completed_sessions', 'upcoming_sessions', 'distinct_tutees')
+    
+    def __str__(self):
+        return f"Stats for {self.tutor_id}"
+    
+    @staticmethod
+    def _counter(status):
+        if status in Booking.OPEN_STATUSES:
+            return 'upcoming_sessions'
+        if status == 'completed':
+            return 'completed_sessions'
+        return None
+    
+    @classmethod
+    def counted(cls, tutor_ids=None):
+        """Counters computed from the bookings, {tutor_id: {counter: value}}"""
+        bookings = Booking.objects.all()
+        if tutor_ids is not None:
+            bookings = bookings.filter(availability__tutor_id__in=tutor_ids)
+        rows = bookings.values('availability__tutor_id').annotate(
+            completed_sessions=Count('id', filter=Q(status='completed')),
+            upcoming_sessions=Count('id', filter=Q(status__in=Booking.OPEN_STATUSES)),
+            distinct_tutees=Count('tutee', distinct=True),
+        ).order_by()
+        return {row.pop('availability__tutor_id'): row for row in rows}
+    
+    @classmethod
+    def adjust(cls, tutor_id, **deltas):
+        """
+        Add deltas to the tutor's counters with one UPDATE. A tutor without a
+        row yet gets one counted from the bookings, which already include
+        the change being recorded.
+        """
+        changes = {name: F(name) + delta for name, delta in deltas.items() if delta}
+        if not changes:
+            return
+        if cls.objects.filter(tutor_id=tutor_id).update(updated_at=timezone.now(), **changes):
+            return
+        counts = cls.counted([tutor_id]).get(tutor_id, {})
+        try:
+            with transaction.atomic():
+                cls.objects.create(tutor_id=tutor_id, **counts)
+        except IntegrityError:
+            # Created concurrently; that row did not see this change yet
+            cls.objects.filter(tutor_id=tutor_id).update(updated_at=timezone.now(), **changes)
+    
+    @classmethod
+    def record_booked(cls, booking):
+        first = not Booking.objects.filter(
+            availability__tutor_id=booking.availability.tutor_id, tutee_id=booking.tutee_id
+        ).exclude(id=booking.id).exists()
+        cls.adjust(booking.availability.tutor_id, upcoming_sessions=1, distinct_tutees=int(first))
+    
+    @classmethod
+    def record_transition(cls, tutor_id, old_status, new_status, count=1):
+        """count bookings of the tutor moved from old_status to new_status"""
+        old, new = cls._counter(old_status), cls._counter(new_status)
+        if old == new:
+            return
+        deltas = {}
+        if old:
+            deltas[old] = -count
+        if new:
+            deltas[new] = count
+        cls.adjust(tutor_id, **deltas)
+    
+    @classmethod
+    def record_deleted(cls, tutor_id, status):
+        """
+        A booking of the tutor was deleted. distinct_tutees is recounted in
+        the same UPDATE: a cascade can delete several of one tutee's bookings
+        before any of these run.
+        """
+        tutees = Booking.objects.filter(availability__tutor_id=tutor_id).order_by().values(
+            'availability__tutor_id'
+        ).annotate(count=Count('tutee', distinct=True)).values('count')
+        changes = {'updated_at': timezone.now(), 'distinct_tutees': Coalesce(Subquery(tutees), 0)}
+        counter = cls._counter(status)
+        if counter:
+            changes[counter] = F(counter) - 1
+        # No row means nothing to take away; deleting the tutor deletes it too
+        cls.objects.filter(tutor_id=tutor_id).update(**changes)
+
+    @classmethod
+    def recount(cls, tutor_ids):
+        """
+        Recount the tutors' counters from their bookings with one UPDATE,
+        for deletions that remove many bookings at once
+        """
+        bookings = Booking.objects.filter(availability__tutor_id=OuterRef('tutor_id')).order_by().values(
+            'availability__tutor_id'
+        )
+        cls.objects.filter(tutor_id__in=tutor_ids).update(
+            updated_at=timezone.now(),
+            completed_sessions=Coalesce(Subquery(
+                bookings.annotate(count=Count('id', filter=Q(status='completed'))).values('count')
+            ), 0),
+            upcoming_sessions=Coalesce(Subquery(
+                bookings.annotate(count=Count('id', filter=Q(status__in=Booking.OPEN_STATUSES))).values('count')
+            ), 0),
+            distinct_tutees=Coalesce(Subquery(
+                bookings.annotate(count=Count('tutee', distinct=True)).values('count')
+            ), 0),
+        )
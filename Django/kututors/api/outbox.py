@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+MAX_ATTEMPTS = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+RETRY_BASE_DELAY = timedelta(seconds=getattr(settings, 'OUTBOX_RETRY_BASE_DELAY', 30))
+# A worker that dies mid-batch leaves rows in 'sending'; retry them after this
+SENDING_TIMEOUT = timedelta(minutes=10)
+
+
+def enqueue_email(subject, message, recipient_list, from_email=None):
+    """
+    Queue an email instead of sending it inside the request.
+    Same arguments as django.core.mail.send_mail; returns the queued rows.
+    """
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            subject=subject,
+            body=message,
+            from_email=from_email or '',
+            recipient=recipient,
+        )
+        for recipient in recipient_list
+    ])
+
+
+def _claim_batch(batch_size):
+    """Mark up to batch_size due emails as 'sending' and return them"""
+    now = timezone.now()
+    OutboundEmail.objects.filter(
+        status='sending',
+        next_attempt_at__lte=now - SENDING_TIMEOUT
+    ).update(status='pending')
+
+    with transaction.atomic():
+        due = OutboundEmail.objects.filter(status='pending', next_attempt_at__lte=now)
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        batch = list(due.order_by('next_attempt_at')[:batch_size])
+        OutboundEmail.objects.filter(id__in=[email.id for email in batch]).update(
+            status='sending',
+            next_attempt_at=now
+        )
+    return batch
+
+
+def send_pending(batch_size=50):
+    """
+    Send one batch of due emails over a single mail connection.
+    Failed sends are retried with exponential backoff and marked failed
+    after MAX_ATTEMPTS. Returns (sent, failed) counts for the batch.
+    """
+    batch = _claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    sent, failed = [], []
+    mail_connection = get_connection()
+    try:
+        mail_connection.open()
+        for email in batch:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email or None,
+                to=[email.recipient],
+                connection=mail_connection,
+            )
+            try:
+                message.send()
+                sent.append(email.id)
+            except Exception as e:
+                failed.append((email, str(e)))
+    except Exception as e:
+        # Could not reach the mail server at all: retry the whole batch
+        failed = [(email, str(e)) for email in batch if email.id not in sent]
+    finally:
+        mail_connection.close()
+
+    now = timezone.now()
+    OutboundEmail.objects.filter(id__in=sent).update(status='sent', sent_at=now, last_error='')
+    for email, error in failed:
+        attempts = email.attempts + 1
+        OutboundEmail.objects.filter(id=email.id).update(
+            attempts=attempts,
+            last_error=error,
+            status='failed' if attempts >= MAX_ATTEMPTS else 'pending',
+            next_attempt_at=now + RETRY_BASE_DELAY * 2 ** (attempts - 1),
+        )
+    return len(sent), len(failed)
+
+
+def queue_stats():
+    """Number of outbox rows per status, plus the age of the oldest pending email"""
+    stats = {status: 0 for status, _ in OutboundEmail.STATUS_CHOICES}
+    for row in OutboundEmail.objects.values('status').annotate(total=Count('id')):
+        stats[row['status']] = row['total']
+
+    oldest = OutboundEmail.objects.filter(status='pending').order_by('created_at').values_list(
+        'created_at', flat=True
+    ).first()
+    stats['oldest_pending_seconds'] = (timezone.now() - oldest).total_seconds() if oldest else 0
+    return stats
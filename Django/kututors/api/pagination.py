@@ -0,0 +1,63 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+
+
+def encode_slot_cursor(slot):
+    """
+    Encode the (date, start_time, id) position of an availability slot
+    into an opaque, URL-safe cursor string
+    """
+    raw = f"{slot.date.isoformat()}|{slot.start_time.strftime('%H:%M:%S')}|{slot.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_slot_cursor(cursor):
+    """
+    Decode a cursor produced by encode_slot_cursor back into
+    a (date, start_time, id) tuple
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date_str, time_str, id_str = raw.split('|')
+        return (
+            datetime.strptime(date_str, '%Y-%m-%d').date(),
+            datetime.strptime(time_str, '%H:%M:%S').time(),
+            int(id_str),
+        )
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def after_slot_cursor(cursor):
+    """
+    Q filter selecting availability slots strictly after the cursor position
+    in (date, start_time, id) order
+    """
+    slot_date, start_time, slot_id = decode_slot_cursor(cursor)
+    return (
+        Q(date__gt=slot_date) |
+        Q(date=slot_date, start_time__gt=start_time) |
+        Q(date=slot_date, start_time=start_time, id__gt=slot_id)
+    )
+
+
+def parse_page_size(value):
+    """Clamp the requested page size to [1, MAX_PAGE_SIZE]"""
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('page_size must be an integer')
+    return max(1, min(size, MAX_PAGE_SIZE))
@@ -0,0 +1,131 @@
+import logging
+import threading
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Case, When, Value, DateTimeField
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+# A user seen within this window is shown as online
+ONLINE_WINDOW = timedelta(minutes=5)
+
+
+class LastSeenBuffer:
+    """
+    In-process buffer of last-seen timestamps.
+    Requests only touch memory; the buffered timestamps are written to
+    CustomUser.last_seen in one UPDATE once flush_interval has passed or
+    max_pending users are waiting. Timestamps still buffered when the
+    process stops are dropped; presence only needs to be roughly right.
+    """
+
+    def __init__(self, flush_interval, max_pending, granularity):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.granularity = granularity
+        self._pending = {}
+        # Latest sighting per user, kept after flushing until it is too old
+        # to make anyone online, so readers with a stale copy of the user
+        # row still get the fresh value
+        self._recent = {}
+        self._lock = threading.Lock()
+        self._last_flush = timezone.now()
+
+    def touch(self, user, now=None):
+        """Record that user was seen now, skipping updates finer than granularity"""
+        if self._record(user, now or timezone.now()):
+            self._flush_quietly()
+
+    async def atouch(self, user, now=None):
+        """touch for async code; only a due flush leaves the event loop"""
+        if self._record(user, now or timezone.now()):
+            await sync_to_async(self._flush_quietly)()
+
+    def _flush_quietly(self):
+        # Runs after the view has responded: a failed write (e.g. a locked
+        # SQLite database) must not turn the response into a 500
+        try:
+            self.flush()
+        except DatabaseError:
+            logger.warning('Could not flush last-seen timestamps; retrying later', exc_info=True)
+
+    def _record(self, user, now):
+        """Buffer the sighting; True if a flush is due"""
+        with self._lock:
+            latest = self._latest(user.id, user.last_seen)
+            if latest and now - latest < self.granularity:
+                return False
+            self._pending[user.id] = now
+            self._recent[user.id] = now
+            return (
+                len(self._pending) >= self.max_pending or
+                now - self._last_flush >= self.flush_interval
+            )
+
+    def last_seen(self, user):
+        """Freshest known last-seen time for user, including unflushed ones"""
+        return self.last_seen_for(user.id, user.last_seen)
+
+    def last_seen_for(self, user_id, stored_last_seen):
+        """Like last_seen, for callers holding only the id and stored value"""
+        with self._lock:
+            return self._latest(user_id, stored_last_seen)
+
+    def _latest(self, user_id, stored_last_seen):
+        recent = self._recent.get(user_id)
+        if recent and stored_last_seen:
+            return max(recent, stored_last_seen)
+        return recent or stored_last_seen
+
+    def flush(self):
+        """
+        Write all buffered timestamps with a single UPDATE. If it fails they
+        stay buffered and the error is raised.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = now = timezone.now()
+            self._recent = {
+                user_id: seen for user_id, seen in self._recent.items()
+                if now - seen <= ONLINE_WINDOW
+            }
+        if not pending:
+            return 0
+
+        from .models import CustomUser
+        try:
+            return CustomUser.objects.filter(id__in=pending).update(
+                last_seen=Case(
+                    *[When(id=user_id, then=Value(seen)) for user_id, seen in pending.items()],
+                    output_field=DateTimeField(),
+                )
+            )
+        except DatabaseError:
+            # Keep the timestamps for the next flush; sightings since then are newer
+            with self._lock:
+                self._pending = {**pending, **self._pending}
+            raise
+
+
+def is_online(user):
+    return is_online_for(user.id, user.last_seen)
+
+
+def is_online_for(user_id, stored_last_seen):
+    last_seen = presence.last_seen_for(user_id, stored_last_seen)
+    if not last_seen:
+        return False
+    return timezone.now() - last_seen <= ONLINE_WINDOW
+
+
+presence = LastSeenBuffer(
+    flush_interval=timedelta(seconds=getattr(settings, 'PRESENCE_FLUSH_INTERVAL', 30)),
+    max_pending=getattr(settings, 'PRESENCE_MAX_PENDING', 500),
+    granularity=timedelta(seconds=getattr(settings, 'PRESENCE_GRANULARITY', 60)),
+)
+
@@ -0,0 +1,241 @@
+import functools
+import json
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from rest_framework import status
+
+from .models import CustomUser
+
+
+def _estimate(previous, current, window, now):
+    """
+    Sliding-window count: the current fixed window plus the share of the
+    previous one that still overlaps the last window seconds
+    """
+    elapsed = now % window
+    return previous * (window - elapsed) / window + current
+
+
+def _retry_after(previous, current, limit, window, now):
+    """Seconds until the estimate drops below limit again"""
+    elapsed = now % window
+    if current >= limit or not previous:
+        return math.ceil(window - elapsed)
+    # The previous window's share shrinks linearly until it makes room
+    room = (limit - current) * window / previous
+    return max(1, math.ceil(window - elapsed - room))
+
+
+class MemoryRateStore:
+    """
+    In-process sliding-window counters, two integers per key.
+    The least recently used keys are dropped once max_keys are tracked,
+    so a flood of distinct IPs cannot grow the store without bound.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _window(self, key, window, now):
+        """(bucket, previous, current) for key, rolled forward to now; call with the lock held"""
+        bucket = int(now // window)
+        start, previous, current = self._windows.get(key, (bucket, 0, 0))
+        if start != bucket:
+            previous = current if start == bucket - 1 else 0
+            current = 0
+        return bucket, previous, current
+
+    def _store(self, key, counts):
+        self._windows[key] = counts
+        self._windows.move_to_end(key)
+        while len(self._windows) > self.max_keys:
+            self._windows.popitem(last=False)
+
+    def peek(self, key, limit, window, now=None):
+        """Seconds to wait if key is over limit, else 0; nothing is counted"""
+        now = time.time() if now is None else now
+        with self._lock:
+            bucket, previous, current = self._window(key, window, now)
+            self._store(key, (bucket, previous, current))
+        if _estimate(previous, current, window, now) >= limit:
+            return _retry_after(previous, current, limit, window, now)
+        return 0
+
+    def add(self, key, window, now=None):
+        """Count a request for key"""
+        now = time.time() if now is None else now
+        with self._lock:
+            bucket, previous, current = self._window(key, window, now)
+            self._store(key, (bucket, previous, current + 1))
+
+    def hit(self, key, limit, window, now=None):
+        """Count a request for key; (allowed, retry_after) without counting if over limit"""
+        now = time.time() if now is None else now
+        with self._lock:
+            bucket, previous, current = self._window(key, window, now)
+            if _estimate(previous, current, window, now) >= limit:
+                self._store(key, (bucket, previous, current))
+                return False, _retry_after(previous, current, limit, window, now)
+            self._store(key, (bucket, previous, current + 1))
+        return True, 0
+
+    def clear(self):
+        with self._lock:
+            self._windows.clear()
+
+
+class CacheRateStore:
+    """
+    Sliding-window counters kept in a Django cache, so every process
+    behind the same cache shares one limit. Each check is one get_many
+    and, when allowed, one add and one incr.
+    """
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+        self._generation = 0
+
+    def _keys(self, key, window, now):
+        bucket = int(now // window)
+        return (
+            f'ratelimit:{self._generation}:{key}:{bucket - 1}',
+            f'ratelimit:{self._generation}:{key}:{bucket}',
+        )
+
+    def peek(self, key, limit, window, now=None):
+        now = time.time() if now is None else now
+        previous_key, current_key = self._keys(key, window, now)
+        counts = caches[self.alias].get_many([previous_key, current_key])
+        previous = counts.get(previous_key, 0)
+        current = counts.get(current_key, 0)
+        if _estimate(previous, current, window, now) >= limit:
+            return _retry_after(previous, current, limit, window, now)
+        return 0
+
+    def add(self, key, window, now=None):
+        now = time.time() if now is None else now
+        cache = caches[self.alias]
+        _, current_key = self._keys(key, window, now)
+        # A window's counter is still read while it is the previous window
+        cache.add(current_key, 0, timeout=2 * window)
+        try:
+            cache.incr(current_key)
+        except ValueError:
+            cache.set(current_key, 1, timeout=2 * window)
+
+    def hit(self, key, limit, window, now=None):
+        now = time.time() if now is None else now
+        retry_after = self.peek(key, limit, window, now)
+        if retry_after:
+            return False, retry_after
+        self.add(key, window, now)
+        return True, 0
+
+    def clear(self):
+        """Count afresh in this process; other entries in the cache are left alone"""
+        self._generation += 1
+
+
+class RateLimiter:
+    """
+    Applies the RATE_LIMITS rules for a scope and counts rejections.
+    Each rule is keyed by client IP or by normalized email and allows
+    at most limit requests in any window seconds.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._rejected = Counter()
+        self._lock = threading.Lock()
+
+    def check(self, scope, idents, now=None):
+        """
+        Count a request to scope from idents ({'ip': ..., 'email': ...}).
+        Returns 0 if allowed, otherwise the seconds to wait. Every rule is
+        checked before any is counted, so a request rejected by one rule
+        does not use up the others.
+        """
+        now = time.time() if now is None else now
+        rules = getattr(settings, 'RATE_LIMITS', {}).get(scope, {})
+        admitted = []
+        for kind, (limit, window) in rules.items():
+            ident = idents.get(kind)
+            if not ident:
+                continue
+            key = f'{scope}:{kind}:{ident}'
+            retry_after = self.store.peek(key, limit, window, now)
+            if retry_after:
+                with self._lock:
+                    self._rejected[f'{scope}:{kind}'] += 1
+                return retry_after
+            admitted.append((key, window))
+        for key, window in admitted:
+            self.store.add(key, window, now)
+        return 0
+
+    def stats(self):
+        """Requests rejected by this process, per scope and rule"""
+        with self._lock:
+            return dict(self._rejected)
+
+    def clear(self):
+        self.store.clear()
+        with self._lock:
+            self._rejected.clear()
+
+
+def _build_store():
+    if getattr(settings, 'RATE_LIMIT_STORE', 'memory') == 'cache':
+        return CacheRateStore(getattr(settings, 'RATE_LIMIT_CACHE_ALIAS', 'default'))
+    return MemoryRateStore(getattr(settings, 'RATE_LIMIT_MAX_KEYS', 100000))
+
+
+rate_limiter = RateLimiter(_build_store())
+
+
+def _request_email(request):
+    """The email field of a JSON or form body, read without DRF's parsers"""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        email = data.get('email') if isinstance(data, dict) else None
+    else:
+        email = request.POST.get('email')
+    return email if isinstance(email, str) else None
+
+
+def rate_limited(scope):
+    """
+    Reject requests over the scope's limits with 429 before the view runs.
+    Apply it outside @api_view: rejected requests then cost no queries and
+    no password hashing, not even DRF's token lookup for whatever
+    Authorization header they carry.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            email = _request_email(request)
+            retry_after = rate_limiter.check(scope, {
+                'ip': request.META.get('REMOTE_ADDR'),
+                'email': CustomUser.normalize_email_address(email) if email else None,
+            })
+            if retry_after:
+                response = JsonResponse(
+                    {'error': 'Too many attempts. Please try again later.'},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                )
+                response['Retry-After'] = str(retry_after)
+                return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
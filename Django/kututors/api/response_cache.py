@@ -0,0 +1,90 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+# Cached payloads are dropped after a day even if never invalidated
+PAYLOAD_TIMEOUT = 60 * 60 * 24
+
+
+def _cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _version_key(tutor_id):
+    return f'tutor:{tutor_id}:version'
+
+
+def tutor_version(tutor_id):
+    """
+    Current cache version of a tutor's data.
+    A lost version key restarts from the clock rather than from 1, so
+    payloads cached under an older version can never be picked up again.
+    """
+    cache = _cache()
+    key = _version_key(tutor_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_tutor_version(tutor_id):
+    """Invalidate every cached response about this tutor"""
+    cache = _cache()
+    key = _version_key(tutor_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_tutor_version_on_commit(tutor_id):
+    """
+    bump_tutor_version once the current transaction commits (at once outside
+    one). Bumping earlier lets a concurrent read rebuild the payload from
+    pre-commit rows and cache it under the new version.
+    """
+    transaction.on_commit(lambda: bump_tutor_version(tutor_id))
+
+
+def cached_for_tutor(tutor_id, name, build):
+    """
+    Return the cached payload called name for this tutor, building and
+    caching it on a miss. build returns None when there is nothing to
+    cache (e.g. the tutor does not exist).
+    """
+    cache = _cache()
+    key = f'tutor:{tutor_id}:{name}:{tutor_version(tutor_id)}'
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        if payload is not None:
+            cache.set(key, payload, timeout=PAYLOAD_TIMEOUT)
+    return payload
+
+
+async def atutor_version(tutor_id):
+    """tutor_version for async code"""
+    cache = _cache()
+    key = _version_key(tutor_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+async def acached_for_tutor(tutor_id, name, build):
+    """cached_for_tutor for async code; build is a coroutine function"""
+    cache = _cache()
+    key = f'tutor:{tutor_id}:{name}:{await atutor_version(tutor_id)}'
+    payload = await cache.aget(key)
+    if payload is None:
+        payload = await build()
+        if payload is not None:
+            await cache.aset(key, payload, timeout=PAYLOAD_TIMEOUT)
+    return payload
@@ -0,0 +1,102 @@
+import re
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Sum, When
+
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+MAX_TOKEN_LENGTH = 50
+
+# How much a match in each tutor field counts towards the ranking
+FIELD_WEIGHTS = {
+    'subject': 4,
+    'name': 3,
+    'department': 1,
+    'semester': 1,
+}
+
+
+def tokenize(text, join_codes=True):
+    """
+    Lower-case alphanumeric tokens of text.
+    With join_codes, subject codes also get a joined token, so 'COMP 202'
+    yields 'comp', '202' and 'comp202' and a search for 'comp2' finds it.
+    """
+    tokens = TOKEN_RE.findall((text or '').lower())
+    if join_codes:
+        tokens += [
+            word + number
+            for word, number in zip(tokens, tokens[1:])
+            if word.isalpha() and number.isdigit()
+        ]
+    return [token[:MAX_TOKEN_LENGTH] for token in tokens]
+
+
+def tutor_tokens(tutor):
+    """(field, token) pairs to index for a tutor profile"""
+    user = tutor.user
+    values = {
+        'subject': tutor.subject,
+        'name': f"{user.first_name} {user.last_name}",
+        'department': tutor.department,
+        'semester': tutor.semester,
+    }
+    pairs = set()
+    for field, text in values.items():
+        for token in tokenize(text):
+            pairs.add((field, token))
+    return pairs
+
+
+def index_tutors(tutors):
+    """Replace the search tokens of the given tutor profiles"""
+    from .models import TutorSearchToken
+
+    tutors = list(tutors)
+    rows = [
+        TutorSearchToken(tutor=tutor, field=field, token=token, weight=FIELD_WEIGHTS[field])
+        for tutor in tutors
+        for field, token in tutor_tokens(tutor)
+    ]
+    with transaction.atomic():
+        TutorSearchToken.objects.filter(tutor__in=[tutor.id for tutor in tutors]).delete()
+        TutorSearchToken.objects.bulk_create(rows, batch_size=1000)
+
+
+def _prefix(token):
+    """Prefix match as a range, so the (token, ...) index is used on every backend"""
+    return Q(token__gte=token, token__lt=token + '\uffff')
+
+
+def ranked_tutor_ids(query, fields=None, **tutor_filters):
+    """
+    Ids of tutors matching query, best first.
+    Every query term must prefix-match a token of the tutor; tutors are
+    ranked by the summed weight of their matching tokens. tutor_filters are
+    TutorProfile lookups (e.g. available=True) applied through a join, so
+    the token index stays the driving side of the query.
+    """
+    from .models import TutorSearchToken
+
+    terms = list(dict.fromkeys(tokenize(query, join_codes=False)))
+    if not terms:
+        return TutorSearchToken.objects.none().values_list('tutor_id', flat=True)
+
+    matches = Q()
+    for term in terms:
+        matches |= _prefix(term)
+    tokens = TutorSearchToken.objects.filter(matches).filter(
+        **{f'tutor__{lookup}': value for lookup, value in tutor_filters.items()}
+    )
+    if fields:
+        tokens = tokens.filter(field__in=fields)
+
+    matched_terms = None
+    for term in terms:
+        term_matched = Max(Case(When(_prefix(term), then=1), default=0, output_field=IntegerField()))
+        matched_terms = term_matched if matched_terms is None else matched_terms + term_matched
+
+    return tokens.values('tutor_id').annotate(
+        rank=Sum('weight'),
+        matched_terms=matched_terms,
+    ).filter(matched_terms=len(terms)).order_by('-rank', 'tutor_id').values_list('tutor_id', flat=True)
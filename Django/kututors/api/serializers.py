@@ -1,15 +1,19 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import TutorProfile, TuteeProfile, TemporarySignup, Availability, Booking
-from django.contrib.auth.hashers import make_password
-from django.core.mail import send_mail
-from datetime import timedelta
-from django.utils import timezone
+from django.db import IntegrityError, transaction
+from .models import TutorProfile, TutorStats, TuteeProfile, TemporarySignup, Availability, Booking
+from .hashers import hash_password
+from .images import thumbnail_urls
+from .outbox import enqueue_email
+from .presence import is_online
+from .signups import next_free_username
 import random
-import secrets
 
 User = get_user_model()
 
+# Signups racing for the same username retry this many times
+USERNAME_ATTEMPTS = 5
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -29,7 +33,7 @@ class SignupSerializer(serializers.Serializer):
             raise serializers.ValidationError({"password": "Passwords do not match"})
         
         # Check if email already exists in User
-        if User.objects.filter(email=data['email']).exists():
+        if User.objects.filter(normalized_email=User.normalize_email_address(data['email'])).exists():
             raise serializers.ValidationError({"email": "Email already registered"})
         
         return data
@@ -38,45 +42,41 @@ class SignupSerializer(serializers.Serializer):
         validated_data.pop('confirm_password')
         name = validated_data.pop('name')
         
-        # Generate username from email
-        username = validated_data['email'].split('@')[0]
-        base_username = username
-        counter = 1
-        while User.objects.filter(username=username).exists() or TemporarySignup.objects.filter(username=username).exists():
-            username = f"{base_username}{counter}"
-            counter += 1
-        
         # Generate 6-digit verification code
         code = str(random.randint(100000, 999999))
         
-        # Generate cryptographically secure random salt (22 characters)
-        salt = secrets.token_urlsafe(16)[:22]
-        
-        # Hash password with the generated salt
-        hashed_password = make_password(validated_data['password'], salt=salt)
+        # Hash password with the configured hasher (it generates its own salt)
+        hashed_password = hash_password(validated_data['password'])
         
-        # Delete any existing temporary signup with this email
-        TemporarySignup.objects.filter(email=validated_data['email']).delete()
+        # Generate username from email; a concurrent signup may take the
+        # same one first, in which case the unique index rejects ours
+        base_username = validated_data['email'].split('@')[0]
+        for attempt in range(USERNAME_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    # Delete any existing temporary signup with this email
+                    TemporarySignup.objects.filter(email=validated_data['email']).delete()
+                    
+                    # Create temporary signup
+                    temp_signup = TemporarySignup.objects.create(
+                        email=validated_data['email'],
+                        username=next_free_username(base_username),
+                        first_name=name.split()[0] if name else '',
+                        last_name=' '.join(name.split()[1:]) if len(name.split()) > 1 else '',
+                        password=hashed_password,
+                        role=validated_data['role'],
+                        contact=validated_data.get('contact', ''),
+                        verification_code=code,
+                    )
+                break
+            except IntegrityError:
+                if attempt == USERNAME_ATTEMPTS - 1:
+                    raise
         
-        # Create temporary signup
-        temp_signup = TemporarySignup.objects.create(
-            email=validated_data['email'],
-            username=username,
-            first_name=name.split()[0] if name else '',
-            last_name=' '.join(name.split()[1:]) if len(name.split()) > 1 else '',
-            password=hashed_password,
-            role=validated_data['role'],
-            contact=validated_data.get('contact', ''),
-            verification_code=code,
-        )
-        
-        # Send verification email
-        try:
-            subject = 'KU-Tutors Email Verification'
-            message = f'Hello {name},\n\nYour verification code is: {code}\n\nThis code will expire in 15 minutes.\n\nThank you!'
-            send_mail(subject, message, None, [temp_signup.email], fail_silently=True)
-        except Exception as e:
-            print(f"Failed to send email: {e}")
+        # Queue verification email; the outbox worker sends it
+        subject = 'KU-Tutors Email Verification'
+        message = f'Hello {name},\n\nYour verification code is: {code}\n\nThis code will expire in 15 minutes.\n\nThank you!'
+        enqueue_email(subject, message, [temp_signup.email])
         
         return temp_signup
 
@@ -87,28 +87,41 @@ class LoginSerializer(serializers.Serializer):
 class TutorProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     profile_picture_url = serializers.SerializerMethodField()
+    profile_thumbnails = serializers.SerializerMethodField()
     is_online = serializers.SerializerMethodField()
+    stats = serializers.SerializerMethodField()
     
     class Meta:
         model = TutorProfile
         fields = ['id', 'user', 'subject', 'semester', 'department', 'available', 
-                  'account_number', 'rate', 'year', 'account_number','profile_picture_url', 'is_online']
+                  'account_number', 'rate', 'year', 'account_number','profile_picture_url', 'profile_thumbnails', 'is_online',
+                  'stats']
     
     def get_profile_picture_url(self, obj):
         if obj.profile_picture:
             return obj.profile_picture.url
         return None
     
+    def get_profile_thumbnails(self, obj):
+        # Avatars should use these instead of the full-size picture
+        return thumbnail_urls(obj)
+    
     def get_is_online(self, obj):
-        user = obj.user
-        if not user.last_seen:
-            return False
-        # if user was seen in the last 5 mins → online
-        return timezone.now() - user.last_seen <= timedelta(minutes=5)
+        # Includes timestamps still buffered in memory
+        return is_online(obj.user)
+    
+    def get_stats(self, obj):
+        # Load with select_related('stats'); tutors never booked have no row yet
+        return tutor_stats_data(getattr(obj, 'stats', None))
+
+
+def tutor_stats_data(stats):
+    return {name: getattr(stats, name) if stats else 0 for name in TutorStats.COUNTERS}
 
 class TuteeProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     profile_picture_url = serializers.SerializerMethodField()
+    profile_thumbnails = serializers.SerializerMethodField()
     
     class Meta:
         model = TuteeProfile
@@ -118,6 +131,10 @@ class TuteeProfileSerializer(serializers.ModelSerializer):
         if obj.profile_picture:
             return obj.profile_picture.url
         return None
+    
+    def get_profile_thumbnails(self, obj):
+        # Avatars should use these instead of the full-size picture
+        return thumbnail_urls(obj)
 
 class VerifyEmailSerializer(serializers.Serializer):
     email = serializers.EmailField()
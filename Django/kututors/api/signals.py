@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .models import TutorProfile, TutorStats, Availability, Booking
+from .response_cache import bump_tutor_version_on_commit
+from .search import index_tutors
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=TutorProfile)
+def index_tutor_profile(sender, instance, raw=False, **kwargs):
+    """Re-index a tutor whenever their profile is saved"""
+    if raw:
+        return
+    index_tutors([instance])
+    bump_tutor_version_on_commit(instance.id)
+
+
+@receiver(post_save, sender=User)
+def index_tutor_user(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """Names live on the user, so re-index tutors when their user is saved"""
+    if raw or created or instance.role != 'Tutor':
+        return
+    if update_fields is not None and not {'first_name', 'last_name'} & set(update_fields):
+        return
+    try:
+        tutor = instance.tutor_profile
+    except TutorProfile.DoesNotExist:
+        return
+    index_tutors([tutor])
+    bump_tutor_version_on_commit(tutor.id)
+
+
+@receiver(post_delete, sender=TutorProfile)
+def invalidate_deleted_tutor(sender, instance, **kwargs):
+    bump_tutor_version_on_commit(instance.id)
+
+
+@receiver(post_save, sender=Availability)
+@receiver(post_delete, sender=Availability)
+def invalidate_tutor_availability(sender, instance, **kwargs):
+    """Cached tutor responses include their slots"""
+    if instance.tutor_id:
+        bump_tutor_version_on_commit(instance.tutor_id)
+
+
+def _booking_tutor_id(booking):
+    if Booking.availability.is_cached(booking):
+        return booking.availability.tutor_id
+    return Availability.objects.filter(id=booking.availability_id).values_list('tutor_id', flat=True).first()
+
+
+@receiver(post_save, sender=Booking)
+def invalidate_booked_tutor(sender, instance, **kwargs):
+    """Booking a slot changes its status without saving the Availability"""
+    tutor_id = _booking_tutor_id(instance)
+    if tutor_id:
+        bump_tutor_version_on_commit(tutor_id)
+
+
+@receiver(post_delete, sender=Booking)
+def forget_deleted_booking(sender, instance, origin=None, **kwargs):
+    """Cancelling deletes the booking, as do account and slot deletions through cascades"""
+    if hasattr(origin, '_booked_tutor_ids'):
+        # Deleted with its user's account; recounted once in forget_deleted_user_bookings
+        return
+    tutor_id = _booking_tutor_id(instance)
+    if tutor_id:
+        TutorStats.record_deleted(tutor_id, instance.status)
+        bump_tutor_version_on_commit(tutor_id)
+
+
+@receiver(pre_delete, sender=User)
+def collect_booked_tutors(sender, instance, origin=None, **kwargs):
+    """
+    Deleting an account cascades to all of its bookings. Note their tutors in
+    one query here, so the stats are recounted once per tutor afterwards
+    instead of once per booking.
+    """
+    if origin is not instance:
+        return
+    instance._booked_tutor_ids = set(
+        Booking.objects.filter(Q(tutee__user=instance) | Q(availability__tutor__user=instance))
+        .values_list('availability__tutor_id', flat=True).distinct()
+    )
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user_bookings(sender, instance, **kwargs):
+    tutor_ids = getattr(instance, '_booked_tutor_ids', None)
+    if not tutor_ids:
+        return
+    TutorStats.recount(tutor_ids)
+    for tutor_id in tutor_ids:
+        bump_tutor_version_on_commit(tutor_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_token_user(sender, instance, **kwargs):
+    """Password resets, deactivation and profile edits must not be served from the token cache"""
+    token_cache.invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Logout deletes the token; account deletion cascades to it"""
+    token_cache.invalidate_user(instance.user_id)
@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import MaintenanceCounter, TemporarySignup
+
+
+# Legacy rows without expires_at are treated as expiring this long after creation
+SIGNUP_LIFETIME = timedelta(minutes=15)
+
+
+def _expired(now):
+    return Q(expires_at__lte=now) | Q(expires_at__isnull=True, created_at__lte=now - SIGNUP_LIFETIME)
+
+
+def next_free_username(base):
+    """
+    First of base, base1, base2, ... not taken by a user or pending signup.
+    All usernames starting with base are fetched in one query, so many
+    colliding emails do not cost one query per collision.
+    """
+    prefix = Q(username__gte=base, username__lt=base + '\uffff')
+    taken = get_user_model().objects.filter(prefix).values_list('username', flat=True).union(
+        TemporarySignup.objects.filter(prefix).values_list('username', flat=True)
+    )
+    suffixes = set()
+    for username in taken:
+        suffix = username[len(base):]
+        if suffix == '':
+            suffixes.add(0)
+        elif suffix.isascii() and suffix.isdigit() and not suffix.startswith('0'):
+            suffixes.add(int(suffix))
+
+    counter = 0
+    while counter in suffixes:
+        counter += 1
+    return f"{base}{counter}" if counter else base
+
+
+def purge_expired_signups(batch_size=1000):
+    """
+    Delete expired signups in batches of batch_size.
+    Each batch is its own short DELETE, so signups keep going while a
+    large backlog is purged. Returns the number of rows deleted and adds
+    it to the stored purge counter.
+    """
+    now = timezone.now()
+    purged = 0
+    while True:
+        ids = list(TemporarySignup.objects.filter(_expired(now)).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        deleted, _ = TemporarySignup.objects.filter(id__in=ids).delete()
+        purged += deleted
+        if len(ids) < batch_size:
+            break
+    if purged:
+        MaintenanceCounter.increment(MaintenanceCounter.SIGNUPS_PURGED, purged)
+    return purged
+
+
+def signup_stats():
+    """Signups still pending verification, expired ones awaiting a purge and all ever purged"""
+    now = timezone.now()
+    return {
+        'pending': TemporarySignup.objects.exclude(_expired(now)).count(),
+        'expired': TemporarySignup.objects.filter(_expired(now)).count(),
+        'purged_total': MaintenanceCounter.value_of(MaintenanceCounter.SIGNUPS_PURGED),
+    }
@@ -1,3 +1,1444 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import backends
+from .authentication import token_cache
+from .completion import complete_bookings, sweep_past_bookings
+from .intervals import IntervalIndex
+from .models import CustomUser, TutorProfile, TutorStats, TuteeProfile, Availability, Booking, TemporarySignup
+from .outbox import enqueue_email, queue_stats, send_pending
+from .metrics import query_budget, route_metrics
+from .presence import LastSeenBuffer, presence
+from .search import index_tutors, ranked_tutor_ids, tokenize
+from .ratelimit import MemoryRateStore, rate_limiter
+from .signups import next_free_username, purge_expired_signups, signup_stats
+
+
+def create_tutor(username, **profile_fields):
+    user = CustomUser.objects.create_user(
+        username=username, email=f'{username}@ku.edu.np', password='password123',
+        role='Tutor', first_name=username.title(), is_verified=True,
+    )
+    return TutorProfile.objects.create(user=user, **profile_fields)
+
+
+def create_tutee(username, **profile_fields):
+    user = CustomUser.objects.create_user(
+        username=username, email=f'{username}@ku.edu.np', password='password123',
+        role='Tutee', first_name=username.title(), is_verified=True,
+    )
+    return TuteeProfile.objects.create(user=user, **profile_fields)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class QueryPlanTests(TestCase):
+    """
+    Make sure the hot booking queries keep using the composite indexes
+    declared on Availability and Booking
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tutor = create_tutor('tutor', subject='COMP 202')
+        cls.tutee = create_tutee('tutee')
+        tomorrow = date.today() + timedelta(days=1)
+        for hour in range(9, 13):
+            slot = Availability.objects.create(
+                tutor=cls.tutor, date=tomorrow, start_time=time(hour), end_time=time(hour + 1)
+            )
+            if hour % 2:
+                Booking.objects.create(availability=slot, tutee=cls.tutee)
+
+    def query_plans(self, user, url):
+        """Call url as user and return the query plan of every booking/slot query it ran"""
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if 'FROM "api_availability"' in sql or 'FROM "api_booking"' in sql:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                    plans.append(' '.join(str(row[-1]) for row in cursor.fetchall()))
+        self.assertTrue(plans)
+        return ' | '.join(plans)
+
+    def test_demo_sessions_uses_open_slot_index(self):
+        plan = self.query_plans(self.tutee.user, '/api/demo-sessions/')
+        self.assertIn('avail_open_date_time_idx', plan)
+
+    def test_booked_classes_uses_tutee_status_index(self):
+        plan = self.query_plans(self.tutee.user, '/api/booked-classes/')
+        self.assertIn('booking_tutee_status_idx', plan)
+
+    def test_completed_classes_uses_completed_index(self):
+        plan = self.query_plans(self.tutee.user, '/api/completed-classes/')
+        self.assertIn('booking_tutee_completed_idx', plan)
+
+        plan = self.query_plans(self.tutor.user, '/api/completed-classes/')
+        self.assertRegex(plan, 'booking_avail_(status|completed)_idx')
+
+    def test_my_classes_uses_availability_status_index(self):
+        plan = self.query_plans(self.tutor.user, '/api/tutor/my-classes/')
+        self.assertIn('booking_avail_status_idx', plan)
+
+
+class DemoSessionsTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(create_tutee('tutee').user)
+        self.tomorrow = date.today() + timedelta(days=1)
+        self.science = create_tutor('science', subject='COMP 202', department='Computer Science')
+        self.engineering = create_tutor('engineering', subject='MATH 101', department='Computer Engineering')
+
+    def slot(self, tutor, day, hour):
+        return Availability.objects.create(
+            tutor=tutor, date=date.today() + timedelta(days=day), start_time=time(hour), end_time=time(hour + 1)
+        )
+
+    def get(self, **params):
+        response = self.client.get('/api/demo-sessions/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def ids(self, **params):
+        return [session['id'] for session in self.get(**params)['demo_sessions']]
+
+    def test_pages_walk_every_slot_once(self):
+        # Both tutors share each (date, start_time), so only the id breaks ties
+        expected = [
+            self.slot(tutor, day, hour).id
+            for day in (1, 2) for hour in (9, 10, 11) for tutor in (self.science, self.engineering)
+        ]
+        seen, cursor, pages = [], None, 0
+        while True:
+            data = self.get(page_size=5, **({'cursor': cursor} if cursor else {}))
+            pages += 1
+            seen += [session['id'] for session in data['demo_sessions']]
+            if not data['has_more']:
+                break
+            cursor = data['next_cursor']
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 3)
+        self.assertEqual((data['count'], data['next_cursor']), (2, None))
+
+        # A last page that is exactly full still says there is nothing more
+        data = self.get(page_size=12)
+        self.assertEqual((data['count'], data['has_more'], data['next_cursor']), (12, False, None))
+
+    def test_malformed_cursor_is_rejected(self):
+        for cursor in ('not-a-cursor', 'MjAyNi0wMS0wMXwxMDowMDowMA', '%%%'):
+            response = self.client.get('/api/demo-sessions/', {'cursor': cursor})
+            self.assertEqual((response.status_code, response.json()), (400, {'error': 'Invalid cursor'}), cursor)
+        self.assertEqual(self.client.get('/api/demo-sessions/', {'page_size': 'ten'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/demo-sessions/', {'from_date': '17/10/2026'}).status_code, 400)
+
+    def test_filters(self):
+        science = self.slot(self.science, 1, 9).id
+        engineering = self.slot(self.engineering, 1, 9).id
+        later = self.slot(self.science, 5, 9).id
+        booked = self.slot(self.science, 2, 9)
+        Booking.book_slot(booked, TuteeProfile.objects.get())
+
+        self.assertEqual(self.ids(), [science, engineering, later])
+        self.assertEqual(self.ids(department='Computer Engineering'), [engineering])
+        # Like list_tutors, department is matched case-insensitively on any part
+        self.assertEqual(self.ids(department='science'), [science, later])
+        self.assertEqual(self.ids(subject='comp'), [science, later])
+        in_range = {'from_date': (date.today() + timedelta(days=2)).isoformat(),
+                    'to_date': (date.today() + timedelta(days=5)).isoformat()}
+        self.assertEqual(self.ids(**in_range), [later])
+        self.assertEqual(self.ids(to_date=self.tomorrow.isoformat(), subject='math'), [engineering])
+
+    def test_past_slots_are_never_listed(self):
+        self.slot(self.science, -1, 9)
+        today = self.slot(self.science, 0, 9).id
+        week_ago = (date.today() - timedelta(days=7)).isoformat()
+        self.assertEqual(self.ids(from_date=week_ago), [today])
+        self.assertEqual(self.ids(from_date=week_ago, to_date=(date.today() - timedelta(days=1)).isoformat()), [])
+
+class BookDemoSessionConcurrencyTests(TransactionTestCase):
+    """Parallel bookings of one slot must produce exactly one winner"""
+
+    PARALLEL_BOOKINGS = 8
+
+    def setUp(self):
+        tutor = create_tutor('tutor')
+        self.slot = Availability.objects.create(
+            tutor=tutor, date=date.today() + timedelta(days=1),
+            start_time=time(10), end_time=time(11),
+        )
+        self.tutees = [create_tutee(f'tutee{i}') for i in range(self.PARALLEL_BOOKINGS)]
+
+    def book(self, tutee, barrier):
+        client = APIClient()
+        client.force_authenticate(tutee.user)
+        barrier.wait()
+        try:
+            return client.post('/api/book-demo-session/', {'availability_id': self.slot.id}).status_code
+        finally:
+            connection.close()
+
+    def test_exactly_one_booking_wins(self):
+        barrier = threading.Barrier(self.PARALLEL_BOOKINGS)
+        with ThreadPoolExecutor(max_workers=self.PARALLEL_BOOKINGS) as pool:
+            codes = list(pool.map(lambda tutee: self.book(tutee, barrier), self.tutees))
+
+        self.assertEqual(codes.count(201), 1, codes)
+        self.assertEqual(codes.count(409), self.PARALLEL_BOOKINGS - 1, codes)
+        self.assertEqual(Booking.objects.filter(availability=self.slot).count(), 1)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.status, 'Booked')
+
+    def test_booking_taken_slot_returns_conflict(self):
+        client = APIClient()
+        client.force_authenticate(self.tutees[0].user)
+        response = client.post('/api/book-demo-session/', {'availability_id': self.slot.id})
+        self.assertEqual(response.status_code, 201)
+
+        client.force_authenticate(self.tutees[1].user)
+        response = client.post('/api/book-demo-session/', {'availability_id': self.slot.id})
+        self.assertEqual(response.status_code, 409)
+
+
+class IntervalIndexTests(SimpleTestCase):
+
+    def test_overlap_checks_are_half_open(self):
+        index = IntervalIndex.from_intervals([('day', time(14), time(16))])
+        self.assertTrue(index.overlaps('day', time(15), time(17)))
+        self.assertTrue(index.overlaps('day', time(13), time(14, 30)))
+        self.assertFalse(index.overlaps('day', time(16), time(17)))
+        self.assertFalse(index.overlaps('day', time(12), time(14)))
+        self.assertFalse(index.overlaps('other day', time(15), time(17)))
+
+    def test_legacy_overlapping_slots_are_merged(self):
+        index = IntervalIndex.from_intervals([
+            ('day', time(9), time(17)),
+            ('day', time(10), time(11)),
+        ])
+        self.assertTrue(index.overlaps('day', time(12), time(13)))
+
+        index.add('day', time(18), time(19))
+        self.assertTrue(index.overlaps('day', time(18, 30), time(20)))
+        self.assertFalse(index.overlaps('day', time(17), time(18)))
+
+
+class AvailabilityOverlapTests(TestCase):
+
+    def setUp(self):
+        self.tutor = create_tutor('tutor')
+        self.client = APIClient()
+        self.client.force_authenticate(self.tutor.user)
+        self.day = (date.today() + timedelta(days=1)).isoformat()
+
+    def add(self, start, end):
+        return self.client.post('/api/tutor/availability/add/', {'date': self.day, 'start_time': start, 'end_time': end})
+
+    def update(self, slot_id, **fields):
+        return self.client.patch(f'/api/tutor/availability/{slot_id}/update/', fields)
+
+    def test_overlapping_add_is_rejected(self):
+        self.assertEqual(self.add('14:00', '16:00').status_code, 201)
+        response = self.add('15:00', '17:00')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'This time slot overlaps an existing slot on this date')
+        self.assertEqual(self.add('13:00', '18:00').status_code, 400)
+        self.assertEqual(Availability.objects.filter(tutor=self.tutor).count(), 1)
+
+    def test_adjacent_slots_are_accepted(self):
+        self.assertEqual(self.add('14:00', '16:00').status_code, 201)
+        self.assertEqual(self.add('16:00', '17:00').status_code, 201)
+        self.assertEqual(self.add('13:00', '14:00').status_code, 201)
+        # Another tutor's slot at the same time does not count
+        other = create_tutor('other')
+        self.client.force_authenticate(other.user)
+        self.assertEqual(self.add('14:00', '16:00').status_code, 201)
+
+    def test_update_into_an_overlap_is_rejected(self):
+        first = self.add('14:00', '16:00').data['availability']['id']
+        second = self.add('16:00', '17:00').data['availability']['id']
+
+        response = self.update(second, start_time='15:30')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'This time slot overlaps an existing slot on this date')
+        self.assertEqual(Availability.objects.get(id=second).start_time, time(16))
+
+        # Resizing a slot over its own old range is not an overlap
+        response = self.update(first, start_time='13:00', end_time='15:30')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.update(first, status='Unavailable').status_code, 200)
+        self.assertEqual(
+            list(Availability.objects.filter(tutor=self.tutor).values_list('start_time', 'end_time')),
+            [(time(13), time(15, 30)), (time(16), time(17))],
+        )
+
+class OutboxTests(TestCase):
+
+    def test_signup_queues_email_and_worker_sends_batch(self):
+        response = APIClient().post('/api/signup/', {
+            'name': 'New Tutee', 'email': 'new@ku.edu.np', 'phone_number': '9800000000',
+            'role': 'Tutee', 'password': 'password123', 'confirm_password': 'password123',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+        enqueue_email('Second', 'Body', ['other@ku.edu.np'])
+
+        self.assertEqual(send_pending(), (2, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(queue_stats()['sent'], 2)
+        self.assertEqual(send_pending(), (0, 0))
+
+    def test_failed_send_is_retried_with_backoff(self):
+        email, = enqueue_email('Subject', 'Body', ['user@ku.edu.np'])
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=OSError('relay down')):
+            self.assertEqual(send_pending(), (0, 1))
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'pending')
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(send_pending(), (0, 0))
+
+
+class LoginTests(TestCase):
+
+    def setUp(self):
+        rate_limiter.clear()
+
+    def test_login_upgrades_legacy_hash(self):
+        tutee = create_tutee('tutee')
+        user = tutee.user
+        user.password = make_password('password123', hasher='pbkdf2_sha256')
+        user.save()
+
+        response = APIClient().post('/api/login/', {'email': user.email, 'password': 'password123'})
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+        _, work_factor, _, block_size, parallelism, _ = user.password.split('$')
+        self.assertEqual((work_factor, block_size, parallelism), ('16384', '8', '1'))
+
+        response = APIClient().post('/api/login/', {'email': user.email, 'password': 'wrong'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_login_is_case_insensitive_and_takes_one_query(self):
+        user = create_tutee('tutee').user
+        client = APIClient()
+        response = client.post('/api/login/', {'email': 'Tutee@KU.edu.np', 'password': 'password123'})
+        self.assertEqual(response.status_code, 200)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post('/api/login/', {'email': user.email, 'password': 'password123'})
+        queries = [q['sql'] for q in ctx.captured_queries]
+        self.assertEqual(len(queries), 1, queries)
+        self.assertEqual(response.data['token'], user.auth_token.key)
+
+
+class LoginTransactionTests(TransactionTestCase):
+
+    def test_password_is_checked_outside_a_transaction(self):
+        rate_limiter.clear()
+        user = create_tutee('tutee').user
+        in_transaction = []
+        check_user_password = backends.check_user_password
+
+        def spy(user, password):
+            # Under BEGIN IMMEDIATE this would hold the SQLite write lock for the whole hash
+            in_transaction.append(connection.in_atomic_block)
+            return check_user_password(user, password)
+
+        with mock.patch.object(backends, 'check_user_password', spy):
+            response = APIClient().post('/api/login/', {'email': user.email, 'password': 'password123'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(in_transaction, [False])
+
+
+class NormalizedEmailMigrationTests(TransactionTestCase):
+
+    before = [('api', '0017_outboundemail')]
+    after = [('api', '0018_customuser_normalized_email')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_emails_differing_by_case_abort_the_migration(self):
+        User = self.migrate(self.before).get_model('api', 'CustomUser')
+        first = User.objects.create(username='first', email='Same@ku.edu.np', role='Tutee')
+        second = User.objects.create(username='second', email=' same@ku.edu.np', role='Tutee')
+        User.objects.create(username='blank', email='', role='Tutee')
+
+        with self.assertRaisesMessage(RuntimeError, f'same@ku.edu.np: user {second.id} (second,  same@ku.edu.np)'):
+            self.migrate(self.after)
+
+        User.objects.filter(id=second.id).update(email='other@ku.edu.np')
+        User = self.migrate(self.after).get_model('api', 'CustomUser')
+        self.assertEqual(
+            dict(User.objects.values_list('username', 'normalized_email')),
+            {'first': 'same@ku.edu.np', 'second': 'other@ku.edu.np', 'blank': None},
+        )
+        self.assertEqual(User.objects.get(id=first.id).email, 'Same@ku.edu.np')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = create_tutee('tutee').user
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_token_skips_auth_query(self):
+        self.assertEqual(self.client.get('/api/departments/').status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/departments/').status_code, 200)
+
+    def test_logout_and_password_reset_invalidate_token(self):
+        self.client.get('/api/departments/')
+        self.user.set_password('new-password123')
+        self.user.save()
+        self.assertEqual(len(token_cache), 0)
+
+        self.client.get('/api/departments/')
+        self.assertEqual(self.client.post('/api/logout/').status_code, 200)
+        self.assertEqual(self.client.get('/api/departments/').status_code, 401)
+
+
+class SignupPurgeTests(TestCase):
+
+    def test_expired_signups_are_purged_in_batches(self):
+        expired = timezone.now() - timedelta(minutes=1)
+        for i in range(5):
+            TemporarySignup.objects.create(email=f'old{i}@ku.edu.np', username=f'old{i}', expires_at=expired)
+        TemporarySignup.objects.create(email='new@ku.edu.np', username='new')
+
+        with self.assertNumQueries(6 + 4):  # Plus creating the purge counter
+            self.assertEqual(purge_expired_signups(batch_size=2), 5)
+        self.assertEqual(list(TemporarySignup.objects.values_list('username', flat=True)), ['new'])
+        self.assertEqual(signup_stats(), {'pending': 1, 'expired': 0, 'purged_total': 5})
+
+        TemporarySignup.objects.create(email='old@ku.edu.np', username='old', expires_at=expired)
+        self.assertEqual(purge_expired_signups(), 1)
+        self.assertEqual(purge_expired_signups(), 0)
+        out = io.StringIO()
+        call_command('purge_signups', stats=True, stdout=out)
+        self.assertEqual(out.getvalue().splitlines(), ['pending: 1', 'expired: 0', 'purged_total: 6'])
+
+
+class UsernameAllocationTests(TestCase):
+
+    def signup(self, email):
+        with CaptureQueriesContext(connection) as ctx:
+            response = APIClient().post('/api/signup/', {
+                'name': 'John Doe', 'email': email, 'phone_number': '9800000000',
+                'role': 'Tutee', 'password': 'password123', 'confirm_password': 'password123',
+            })
+        self.assertEqual(response.status_code, 201)
+        return TemporarySignup.objects.get(email=email).username, len(ctx.captured_queries)
+
+    def test_thousands_of_collisions_cost_no_extra_queries(self):
+        _, fresh_queries = self.signup('unique@ku.edu.np')
+
+        CustomUser.objects.create_user(username='john', email='john@gmail.com', password='password123')
+        TemporarySignup.objects.bulk_create([
+            TemporarySignup(email=f'john{i}@ku.edu.np', username=f'john{i}', expires_at=timezone.now())
+            for i in range(1, 3000)
+        ])
+        TemporarySignup.objects.filter(username='john1500').delete()
+
+        username, queries = self.signup('john@ku.edu.np')
+        self.assertEqual(username, 'john1500')
+        self.assertEqual(queries, fresh_queries)
+        username, queries = self.signup('john@hotmail.com')
+        self.assertEqual(username, 'john3000')
+        self.assertEqual(queries, fresh_queries)
+
+    def test_unrelated_usernames_sharing_the_prefix_are_ignored(self):
+        TemporarySignup.objects.create(email='a@ku.edu.np', username='johnny')
+        TemporarySignup.objects.create(email='b@ku.edu.np', username='john01')
+        self.assertEqual(next_free_username('john'), 'john')
+
+    def test_username_taken_concurrently_is_retried(self):
+        TemporarySignup.objects.create(email='other@ku.edu.np', username='john')
+        with mock.patch('api.serializers.next_free_username', side_effect=['john', 'john1']):
+            username, _ = self.signup('john@ku.edu.np')
+        self.assertEqual(username, 'john1')
+
+
+class RateLimitTests(TestCase):
+
+    def setUp(self):
+        rate_limiter.clear()
+
+    def test_sliding_window_counts_part_of_the_previous_window(self):
+        store = MemoryRateStore()
+        for _ in range(10):
+            self.assertEqual(store.hit('ip', 10, 60, now=90), (True, 0))
+        self.assertEqual(store.hit('ip', 10, 60, now=110), (False, 10))
+        # Halfway through the next window half of the old hits still count
+        self.assertEqual(store.hit('ip', 10, 60, now=150), (True, 0))
+        self.assertEqual(store.hit('ip', 10, 60, now=300), (True, 0))
+
+    def test_memory_store_drops_least_recently_used_keys(self):
+        store = MemoryRateStore(max_keys=2)
+        for key in ('a', 'b', 'c'):
+            store.hit(key, 1, 60, now=0)
+        self.assertTrue(store.hit('a', 1, 60, now=1)[0])
+        self.assertFalse(store.hit('c', 1, 60, now=1)[0])
+
+    def test_code_guesses_are_rejected_before_any_query(self):
+        create_tutee('tutee')
+        client = APIClient()
+        data = {'email': 'tutee@ku.edu.np', 'verification_code': '000000', 'new_password': 'password123'}
+        for _ in range(5):
+            self.assertEqual(client.post('/api/reset-password/', data).status_code, 400)
+
+        with self.assertNumQueries(0):
+            response = client.post('/api/reset-password/', {**data, 'email': 'TUTEE@ku.edu.np'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(rate_limiter.stats(), {'reset_password:email': 1})
+
+        # Other accounts are still limited only per IP
+        other = {**data, 'email': 'other@ku.edu.np'}
+        self.assertEqual(client.post('/api/reset-password/', other).status_code, 400)
+
+    def test_login_is_limited_per_ip(self):
+        client = APIClient()
+        with self.settings(RATE_LIMITS={'login': {'ip': (2, 60)}}):
+            for i in range(2):
+                client.post('/api/login/', {'email': f'user{i}@ku.edu.np', 'password': 'x'})
+            with mock.patch('api.views.auth_views.authenticate') as authenticate:
+                response = client.post('/api/login/', {'email': 'user9@ku.edu.np', 'password': 'x'})
+        self.assertEqual(response.status_code, 429)
+        authenticate.assert_not_called()
+        self.assertEqual(rate_limiter.stats(), {'login:ip': 1})
+
+    def test_rejected_requests_skip_token_authentication(self):
+        token_cache.clear()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token bogus')
+        with self.settings(RATE_LIMITS={'login': {'ip': (1, 60)}}):
+            client.post('/api/login/', {'email': 'user@ku.edu.np', 'password': 'x'}, format='json')
+            with self.assertNumQueries(0):
+                response = client.post('/api/login/', {'email': 'user@ku.edu.np', 'password': 'x'}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json(), {'error': 'Too many attempts. Please try again later.'})
+
+    def test_requests_rejected_by_one_rule_do_not_count_against_the_others(self):
+        client = APIClient()
+        with self.settings(RATE_LIMITS={'login': {'ip': (3, 60), 'email': (1, 60)}}):
+            self.assertEqual(client.post('/api/login/', {'email': 'a@ku.edu.np', 'password': 'x'}).status_code, 401)
+            for _ in range(3):
+                response = client.post('/api/login/', {'email': 'A@ku.edu.np', 'password': 'x'}, format='json')
+                self.assertEqual(response.status_code, 429)
+            # Only the first request used up the IP budget
+            self.assertEqual(client.post('/api/login/', {'email': 'b@ku.edu.np', 'password': 'x'}).status_code, 401)
+            self.assertEqual(client.post('/api/login/', {'email': 'c@ku.edu.np', 'password': 'x'}).status_code, 401)
+            self.assertEqual(client.post('/api/login/', {'email': 'd@ku.edu.np', 'password': 'x'}).status_code, 429)
+        self.assertEqual(rate_limiter.stats(), {'login:email': 3, 'login:ip': 1})
+
+
+def jpeg(color, size=(1200, 900)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class ProfileImageTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media.name))
+        self.tutor = create_tutor('tutor')
+        self.client = APIClient()
+        self.client.force_authenticate(self.tutor.user)
+
+    def upload(self, content, client=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return (client or self.client).post(
+                '/api/upload-image/', {'image': SimpleUploadedFile('photo.JPG', content)}, format='multipart'
+            )
+
+    def test_upload_stores_content_addressed_thumbnails(self):
+        response = self.upload(jpeg('red'))
+        self.assertEqual(response.status_code, 200)
+        self.tutor.refresh_from_db()
+        digest = os.path.basename(self.tutor.profile_picture.name).split('.')[0]
+        self.assertEqual(self.tutor.profile_picture.name, f'profile_images/{digest}.jpg')
+        self.assertEqual(self.tutor.profile_thumbnails, {
+            str(size): f'profile_images/{digest}_{size}.webp' for size in (64, 128, 512)
+        })
+        with default_storage.open(self.tutor.profile_thumbnails['128']) as f:
+            thumb = Image.open(f)
+            self.assertEqual((thumb.format, thumb.size), ('WEBP', (128, 128)))
+
+        tutor = self.client.get(f'/api/tutor/{self.tutor.id}/').data['tutor']
+        self.assertEqual(tutor['profile_thumbnails']['64'], f'/media/profile_images/{digest}_64.webp')
+        self.assertEqual(response.data['thumbnails'], tutor['profile_thumbnails'])
+
+    def test_superseded_files_are_deleted_unless_shared(self):
+        self.upload(jpeg('red'))
+        self.tutor.refresh_from_db()
+        red = [self.tutor.profile_picture.name, *self.tutor.profile_thumbnails.values()]
+
+        other = APIClient()
+        other.force_authenticate(create_tutee('tutee').user)
+        self.upload(jpeg('red'), client=other)
+        self.upload(jpeg('blue'))
+        self.assertTrue(all(default_storage.exists(name) for name in red))
+
+        self.upload(jpeg('green'), client=other)
+        self.assertFalse(any(default_storage.exists(name) for name in red))
+
+    def test_invalid_image_is_rejected(self):
+        response = self.upload(b'not an image')
+        self.assertEqual(response.status_code, 400)
+        self.tutor.refresh_from_db()
+        self.assertFalse(self.tutor.profile_picture)
+        self.assertEqual(os.listdir(default_storage.location), [])
+
+    def test_legacy_pictures_are_backfilled(self):
+        self.tutor.profile_picture = default_storage.save('tutor_profiles/pictures/old.jpg', io.BytesIO(jpeg('red')))
+        self.tutor.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('generate_thumbnails', stdout=io.StringIO())
+        self.tutor.refresh_from_db()
+        self.assertTrue(self.tutor.profile_picture.name.startswith('profile_images/'))
+        self.assertEqual(len(self.tutor.profile_thumbnails), 3)
+        self.assertFalse(default_storage.exists('tutor_profiles/pictures/old.jpg'))
+
+
+class DatabaseProfileTests(TestCase):
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite pragmas')
+    def test_sqlite_connections_are_tuned(self):
+        with connection.cursor() as cursor:
+            pragmas = {}
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'foreign_keys'):
+                cursor.execute(f'PRAGMA {pragma}')
+                pragmas[pragma] = cursor.fetchone()[0]
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000, 'foreign_keys': 1})
+
+    def test_my_tutees_lists_each_tutee_once(self):
+        tutor = create_tutor('tutor')
+        tutees = [create_tutee('tutee0'), create_tutee('tutee1')]
+        tomorrow = date.today() + timedelta(days=1)
+        for hour, tutee in zip(range(9, 13), tutees * 2):
+            slot = Availability.objects.create(tutor=tutor, date=tomorrow, start_time=time(hour), end_time=time(hour + 1))
+            Booking.book_slot(slot, tutee)
+
+        client = APIClient()
+        client.force_authenticate(tutor.user)
+        response = client.get('/api/tutor/my-tutees/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t['id'] for t in response.data['tutees']], [tutee.id for tutee in tutees])
+
+
+class AsyncViewTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.tutor = create_tutor('tutor')
+        tutee = create_tutee('tutee')
+        slot = Availability.objects.create(
+            tutor=self.tutor, date=date.today() + timedelta(days=1), start_time=time(10), end_time=time(11)
+        )
+        Booking.book_slot(slot, tutee)
+        self.token = Token.objects.create(user=tutee.user)
+
+    async def test_read_endpoints_run_under_asgi(self):
+        client = AsyncClient()
+        auth = {'Authorization': f'Token {self.token.key}'}
+        for url in ('/api/list-tutors/', '/api/demo-sessions/', '/api/booked-classes/',
+                    f'/api/tutor/{self.tutor.id}/availability/'):
+            response = await client.get(url, headers=auth)
+            self.assertEqual(response.status_code, 200, url)
+        response = await client.get('/api/booked-classes/', headers=auth)
+        self.assertEqual(response.json()['booked_classes'][0]['tutor_name'], 'Tutor')
+
+        seen = await CustomUser.objects.aget(id=self.token.user_id)
+        self.assertIsNotNone(presence.last_seen(seen))
+
+    async def test_authentication_and_methods_match_drf(self):
+        response = await AsyncClient().get('/api/demo-sessions/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+        response = await AsyncClient().get('/api/demo-sessions/', headers={'Authorization': 'Token nope'})
+        self.assertEqual(response.json(), {'detail': 'Invalid token.'})
+        response = await AsyncClient().post('/api/demo-sessions/', headers={'Authorization': f'Token {self.token.key}'})
+        self.assertEqual(response.status_code, 405)
+
+
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        route_metrics.clear()
+        self.tutee = create_tutee('tutee')
+        self.client = APIClient()
+        self.client.force_authenticate(self.tutee.user)
+
+    def test_routes_record_queries_latency_and_size(self):
+        tutor = create_tutor('tutor')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/tutor/{tutor.id}/')
+        stats = route_metrics.snapshot('/api/tutor/<int:tutor_id>/', 'GET')
+        self.assertEqual(stats['requests'], 1)
+        self.assertEqual(stats['queries'], len(ctx.captured_queries))
+        self.assertEqual(stats['response_bytes'], len(response.content))
+
+        self.client.get('/api/demo-sessions/')
+        self.assertEqual(route_metrics.snapshot('/api/demo-sessions/', 'GET')['queries'], 1)
+
+    def test_metrics_endpoint_serves_prometheus_text(self):
+        self.client.get('/api/demo-sessions/')
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('kututors_http_requests_total{route="/api/demo-sessions/",method="GET",status="200"} 1', body)
+        self.assertIn('kututors_db_queries_bucket{route="/api/demo-sessions/",method="GET",le="1.0"} 1', body)
+        self.assertIn('kututors_http_request_duration_seconds_count{route="/api/demo-sessions/",method="GET"} 1', body)
+
+        response = self.client.get('/api/metrics/', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 403)
+
+    def test_route_over_query_budget_logs_a_warning(self):
+        with self.settings(QUERY_BUDGETS={'/api/demo-sessions/': 0}):
+            with self.assertLogs('api.metrics', 'WARNING') as logs:
+                self.client.get('/api/demo-sessions/')
+        self.assertIn('GET /api/demo-sessions/ ran 1 queries (budget 0)', logs.output[0])
+        self.assertEqual(route_metrics.snapshot('/api/demo-sessions/', 'GET')['over_budget'], 1)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Call every route in api/urls.py as its usual role against a seeded
+    dataset and fail if it runs more queries than its budget. Budgets do
+    not depend on the number of rows, so an N+1 in a view or serializer
+    shows up as a failure here.
+    """
+
+    TUTORS = 2000
+    SLOTS_PER_TUTOR = 5
+    TUTEES = 300
+
+    # Routes that cannot succeed today, so they have no meaningful budget
+    KNOWN_BROKEN = {
+        'get_tutor_subjects': 'reads TutorProfile.subjectcode, removed in migration 0009',
+        'add_tutor_subjects': 'reads TutorProfile.subjectcode, removed in migration 0009',
+        'remove_tutor_subject': 'not implemented (501)',
+        'add_tutee_subjects': 'reads TuteeProfile.subjectreqd, removed in migration 0008',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        tomorrow = date.today() + timedelta(days=1)
+        users = CustomUser.objects.bulk_create([
+            CustomUser(
+                username=f'tutor{i}', email=f'tutor{i}@ku.edu.np', password='!', role='Tutor',
+                first_name='Tutor', last_name=str(i), is_verified=True,
+            )
+            for i in range(cls.TUTORS)
+        ] + [
+            CustomUser(username=f'tutee{i}', email=f'tutee{i}@ku.edu.np', password='!', role='Tutee', is_verified=True)
+            for i in range(cls.TUTEES)
+        ])
+        tutors = TutorProfile.objects.bulk_create([
+            TutorProfile(user=user, subject=f'COMP {200 + i % 50} Data Structures', department='Computer Science')
+            for i, user in enumerate(users[:cls.TUTORS])
+        ])
+        tutees = TuteeProfile.objects.bulk_create([TuteeProfile(user=user) for user in users[cls.TUTORS:]])
+        index_tutors(tutors)
+        slots = Availability.objects.bulk_create([
+            Availability(tutor=tutor, date=tomorrow + timedelta(days=day), start_time=time(10), end_time=time(11))
+            for tutor in tutors for day in range(cls.SLOTS_PER_TUTOR)
+        ])
+        booked = slots[::4]
+        Availability.objects.filter(id__in=[slot.id for slot in booked]).update(status='Booked')
+        Booking.objects.bulk_create([
+            Booking(availability=slot, tutee=tutees[i % cls.TUTEES], status='completed' if i % 3 == 0 else 'pending')
+            for i, slot in enumerate(booked)
+        ])
+
+        # The acting users have several bookings each, so per-row queries show
+        cls.tutor = create_tutor('actor_tutor', subject='COMP 202')
+        cls.tutee = create_tutee('actor_tutee')
+        cls.tutee.user.set_password('password123')
+        cls.tutee.user.verification_code = '000000'  # A pending password reset
+        cls.tutee.user.save()
+        Token.objects.create(user=cls.tutee.user)
+        cls.tutor_bookings = []
+        for hour in range(8, 20):
+            slot = Availability.objects.create(
+                tutor=cls.tutor, date=tomorrow, start_time=time(hour), end_time=time(hour + 1)
+            )
+            if hour < 16:
+                booking = Booking.book_slot(slot, tutees[hour] if hour % 2 else cls.tutee)
+                if hour < 11:
+                    booking.mark_completed()
+                cls.tutor_bookings.append(booking)
+        cls.open_slot = slot
+        cls.other_tutor = tutors[0]
+        TemporarySignup.objects.create(
+            email='pending@ku.edu.np', username='pending', first_name='Pending', role='Tutee',
+            password=make_password('password123'), verification_code='123456',
+        )
+
+    def routes(self):
+        """(url name, role, method, path, data, expected status); budgets are in settings.QUERY_BUDGETS"""
+        tutor_booking = self.tutor_bookings[-1]
+        tutee_booking = self.tutor_bookings[0]
+        next_week = (date.today() + timedelta(days=7)).isoformat()
+        return [
+            ('signup', None, 'post', '/api/signup/', {
+                'name': 'New User', 'email': 'new@ku.edu.np', 'phone_number': '9800000000', 'role': 'Tutee',
+                'password': 'password123', 'confirm_password': 'password123',
+            }, 201),
+            ('verify_email', None, 'post', '/api/verify-email/', {'email': 'pending@ku.edu.np', 'verification_code': '123456'}, 200),
+            ('login', None, 'post', '/api/login/', {'email': 'actor_tutee@ku.edu.np', 'password': 'password123'}, 200),
+            ('logout', 'tutee', 'post', '/api/logout/', None, 200),
+            ('profile', 'tutor', 'get', '/api/profile/', None, 200),
+            ('update_profile', 'tutor', 'get', '/api/update-profile/', None, 200),
+            ('update_profile', 'tutor', 'patch', '/api/update-profile/', {'name': 'New Name', 'rate': '500'}, 200),
+            ('upload_image', 'tutee', 'post', '/api/upload-image/', {'image': SimpleUploadedFile('a.jpg', jpeg('red', (64, 64)))}, 200),
+            ('upload_image', 'tutor', 'post', '/api/upload-image/', {'image': SimpleUploadedFile('a.jpg', jpeg('red', (64, 64)))}, 200),
+            ('forgot_password', None, 'post', '/api/forgot-password/', {'email': 'actor_tutee@ku.edu.np'}, 200),
+            ('reset_password', None, 'post', '/api/reset-password/', {
+                'email': 'actor_tutee@ku.edu.np', 'verification_code': '000000', 'new_password': 'password123',
+            }, 200),
+            ('delete_account', 'tutee', 'delete', '/api/delete-account/', None, 200),
+            ('list_tutors', 'tutee', 'get', '/api/list-tutors/', None, 200),
+            ('list_tutors', 'tutee', 'get', '/api/list-tutors/?search=comp%202&page=2', None, 200),
+            ('search_tutors', 'tutee', 'get', '/api/search-tutors/?query=data', None, 200),
+            ('get_tutor_profile', 'tutee', 'get', f'/api/tutor/{self.tutor.id}/', None, 200),
+            ('list_departments', 'tutee', 'get', '/api/departments/', None, 200),
+            ('list_subjects', 'tutee', 'get', '/api/subjects/', None, 200),
+            ('get_tutor_availability', 'tutor', 'get', '/api/tutor/availability/', None, 200),
+            ('add_availability', 'tutor', 'post', '/api/tutor/availability/add/', {
+                'date': next_week, 'start_time': '10:00', 'end_time': '11:00',
+            }, 201),
+            ('bulk_add_availability', 'tutor', 'post', '/api/tutor/availability/bulk-add/', {'recurrence': {
+                'days': ['Monday', 'Wednesday'], 'times': [{'start_time': '14:00', 'end_time': '15:00'}],
+                'start_date': next_week, 'end_date': (date.today() + timedelta(days=60)).isoformat(),
+            }}, 201),
+            ('update_availability', 'tutor', 'patch', f'/api/tutor/availability/{self.open_slot.id}/update/', {
+                'end_time': '20:30',
+            }, 200),
+            ('delete_availability', 'tutor', 'delete', f'/api/tutor/availability/{self.open_slot.id}/delete/', None, 200),
+            ('get_tutor_availability_by_id', 'tutee', 'get', f'/api/tutor/{self.tutor.id}/availability/', None, 200),
+            ('demo_sessions', 'tutee', 'get', '/api/demo-sessions/', None, 200),
+            ('booked_classes', 'tutee', 'get', '/api/booked-classes/', None, 200),
+            ('booked_classes', 'tutor', 'get', '/api/booked-classes/', None, 200),
+            ('completed_classes', 'tutee', 'get', '/api/completed-classes/', None, 200),
+            ('completed_classes', 'tutor', 'get', '/api/completed-classes/', None, 200),
+            ('book_demo_session', 'tutee', 'post', '/api/book-demo-session/', {'availability_id': self.open_slot.id}, 201),
+            ('cancel_booking', 'tutee', 'delete', f'/api/cancel-booking/{tutee_booking.id}/', None, 200),
+            ('mark_session_complete', 'tutor', 'post', f'/api/mark-complete/{tutor_booking.id}/', None, 200),
+            ('mark_sessions_complete', 'tutor', 'post', '/api/mark-complete/', {
+                'booking_ids': [booking.id for booking in self.tutor_bookings],
+            }, 200),
+            ('my_sessions', 'tutee', 'get', '/api/my-sessions/', None, 200),
+            ('my_sessions', 'tutor', 'get', '/api/my-sessions/', None, 200),
+            ('my_classes', 'tutor', 'get', '/api/tutor/my-classes/', None, 200),
+            ('my_tutees', 'tutor', 'get', '/api/tutor/my-tutees/', None, 200),
+            ('my_completed_sessions', 'tutor', 'get', '/api/tutor/completed-sessions/', None, 200),
+            ('my_stats', 'tutor', 'get', '/api/tutor/stats/', None, 200),
+            ('metrics', None, 'get', '/api/metrics/', None, 200),
+        ]
+
+    def assertMaxQueries(self, budget, call):
+        """Run call and fail if it ran more than budget queries; returns its response"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = call()
+        queries = [q['sql'] for q in ctx.captured_queries]
+        self.assertLessEqual(len(queries), budget, '\n'.join(queries))
+        return response
+
+    def test_every_route_has_a_budget(self):
+        from .urls import urlpatterns
+        covered = {name for name, *_ in self.routes()}
+        self.assertEqual({pattern.name for pattern in urlpatterns} - covered - self.KNOWN_BROKEN.keys(), set())
+        self.assertEqual(covered & self.KNOWN_BROKEN.keys(), set())
+
+        for name, role, method, path, *_ in self.routes():
+            route = self.route(path)
+            with self.subTest(route=route, method=method):
+                self.assertIn(route, settings.QUERY_BUDGETS)
+                if isinstance(settings.QUERY_BUDGETS[route], dict):
+                    self.assertIn(method.upper(), settings.QUERY_BUDGETS[route])
+
+    def route(self, path):
+        return '/' + resolve(path.split('?')[0]).route
+
+    def test_routes_stay_within_query_budget(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media.name))
+        users = {'tutor': self.tutor.user_id, 'tutee': self.tutee.user_id}
+        for name, role, method, path, data, expected in self.routes():
+            budget = query_budget(self.route(path), method.upper())
+            if role:
+                # force_authenticate skips the token lookup and presence is flushed up front
+                budget -= settings.QUERY_BUDGET_AUTH_OVERHEAD
+            with self.subTest(route=name, role=role, path=path):
+                # Measure cold: nothing cached or buffered from an earlier call
+                cache.clear()
+                token_cache.clear()
+                rate_limiter.clear()
+                presence.flush()
+                client = APIClient()
+                if role:
+                    client.force_authenticate(CustomUser.objects.get(pk=users[role]))
+                with transaction.atomic():
+                    request = getattr(client, method)
+                    response = self.assertMaxQueries(
+                        budget, lambda: request(path, data, format='multipart' if name == 'upload_image' else 'json')
+                    )
+                    self.assertEqual(response.status_code, expected, getattr(response, 'data', response.content))
+                    transaction.set_rollback(True)
+
+
+class SeedDatasetTests(TestCase):
+
+    def seed(self, manifest):
+        call_command(
+            'seed_dataset', tutors=5, tutees=4, days=2, slots_per_day=3, seed=7, manifest=manifest,
+            stdout=io.StringIO(),
+        )
+        return list(Availability.objects.order_by('date', 'start_time', 'tutor__user__username').values_list(
+            'tutor__user__username', 'date', 'start_time', 'status',
+        ))
+
+    def test_same_seed_gives_same_dataset(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        manifest = os.path.join(directory.name, 'manifest.json')
+
+        first = self.seed(manifest)
+        self.assertEqual(self.seed(manifest), first)
+        self.assertEqual(len(first), 5 * 2 * 3)
+        self.assertEqual(CustomUser.objects.filter(username__startswith='load_').count(), 9)
+        self.assertFalse(CustomUser.objects.filter(username__startswith='load_', normalized_email__isnull=True).exists())
+
+        with open(manifest) as f:
+            tokens = json.load(f)
+        self.assertEqual(len(tokens['tutors']), 5)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {tokens['tutees'][0]}")
+        tutor_id = next(iter(tokens['tutors']))
+        self.assertEqual(client.get(f'/api/tutor/{tutor_id}/availability/').status_code, 200)
+
+
+class SessionCompletionTests(TestCase):
+
+    def setUp(self):
+        self.tutor = create_tutor('tutor')
+        self.tutee = create_tutee('tutee')
+        self.client = APIClient()
+        self.client.force_authenticate(self.tutor.user)
+
+    def book(self, day, hour, tutor=None):
+        slot = Availability.objects.create(
+            tutor=tutor or self.tutor, date=date.today() + timedelta(days=day), start_time=time(hour), end_time=time(hour + 1)
+        )
+        return Booking.book_slot(slot, self.tutee)
+
+    def test_bulk_complete_only_touches_own_open_bookings(self):
+        mine = [self.book(1, 9), self.book(1, 10)]
+        done = self.book(1, 11)
+        done.mark_completed()
+        theirs = self.book(1, 9, tutor=create_tutor('other'))
+
+        ids = [booking.id for booking in (*mine, done, theirs)]
+        response = self.client.post('/api/mark-complete/', {'booking_ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['completed'], [booking.id for booking in mine])
+        self.assertEqual(response.data['skipped'], sorted([done.id, theirs.id]))
+        self.assertEqual(Booking.objects.filter(status='completed', completed_at__isnull=False).count(), 3)
+        self.assertEqual(Booking.objects.get(id=theirs.id).status, 'pending')
+
+        self.assertEqual(self.client.post('/api/mark-complete/', {'booking_ids': []}, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/api/mark-complete/', {'booking_ids': ['x']}, format='json').status_code, 400)
+
+    def test_sweeper_closes_past_bookings_in_one_update(self):
+        past = [self.book(-2, 9), self.book(-1, 9)]
+        upcoming = self.book(1, 9)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(sweep_past_bookings(), 2)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "api_booking"') for query in ctx.captured_queries), 1)
+        for booking in past:
+            booking.refresh_from_db()
+            self.assertEqual(booking.status, 'completed')
+            self.assertIsNotNone(booking.completed_at)
+        upcoming.refresh_from_db()
+        self.assertEqual(upcoming.status, 'pending')
+
+        expired = self.book(-3, 9)
+        out = io.StringIO()
+        call_command('complete_past_bookings', expire=True, stdout=out)
+        self.assertIn('Cancelled 1 past bookings', out.getvalue())
+        expired.refresh_from_db()
+        self.assertEqual((expired.status, expired.completed_at), ('cancelled', None))
+        self.assertEqual(expired.availability.status, 'Booked')
+
+    def test_loop_keeps_sweeping(self):
+        self.book(-1, 9)
+
+        class Stop(Exception):
+            pass
+
+        def sleep(seconds):
+            if sleeps:
+                raise Stop
+            sleeps.append(seconds)
+            self.book(-2, 9)  # Ends up in the next sweep
+
+        sleeps = []
+        out = io.StringIO()
+        with mock.patch('api.management.commands.complete_past_bookings.time.sleep', sleep), self.assertRaises(Stop):
+            call_command('complete_past_bookings', loop=True, interval=5, stdout=out)
+        self.assertEqual(sleeps, [5])
+        self.assertEqual(out.getvalue().splitlines(), [
+            'Completed 1 past bookings (1 total)',
+            'Completed 1 past bookings (2 total)',
+        ])
+        self.assertEqual(Booking.objects.filter(status='completed').count(), 2)
+
+
+class TutorStatsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.tutor = create_tutor('tutor')
+        self.tutees = [create_tutee('tutee0'), create_tutee('tutee1')]
+
+    def book(self, day, hour, tutee):
+        slot = Availability.objects.create(
+            tutor=self.tutor, date=date.today() + timedelta(days=day), start_time=time(hour), end_time=time(hour + 1)
+        )
+        return Booking.book_slot(slot, tutee)
+
+    def stats(self):
+        stats = TutorStats.objects.get(tutor=self.tutor)
+        actual = {name: getattr(stats, name) for name in TutorStats.COUNTERS}
+        self.assertEqual(actual, TutorStats.counted([self.tutor.id])[self.tutor.id])
+        return actual
+
+    def test_transitions_keep_stats_in_step(self):
+        first, second, third = (self.book(1, 9, self.tutees[0]), self.book(1, 10, self.tutees[0]),
+                                self.book(1, 11, self.tutees[1]))
+        past = self.book(-1, 9, self.tutees[1])
+        self.assertEqual(self.stats(), {'completed_sessions': 0, 'upcoming_sessions': 4, 'distinct_tutees': 2})
+
+        first.mark_completed()
+        complete_bookings(self.tutor, [second.id])
+        sweep_past_bookings()
+        self.assertEqual(self.stats(), {'completed_sessions': 3, 'upcoming_sessions': 1, 'distinct_tutees': 2})
+
+        client = APIClient()
+        client.force_authenticate(self.tutees[1].user)
+        self.assertEqual(client.delete(f'/api/cancel-booking/{third.id}/').status_code, 200)
+        self.assertEqual(self.stats(), {'completed_sessions': 3, 'upcoming_sessions': 0, 'distinct_tutees': 2})
+
+        # Deleting the account cascades to the tutee's remaining booking
+        self.tutees[1].user.delete()
+        self.assertEqual(self.stats(), {'completed_sessions': 2, 'upcoming_sessions': 0, 'distinct_tutees': 1})
+
+        client.force_authenticate(self.tutor.user)
+        with self.assertNumQueries(1):
+            response = client.get('/api/tutor/stats/')
+        self.assertEqual(response.data['stats'], {'completed_sessions': 2, 'upcoming_sessions': 0, 'distinct_tutees': 1})
+        self.assertEqual(client.get(f'/api/tutor/{self.tutor.id}/').data['tutor']['stats'], response.data['stats'])
+
+    def test_completing_a_stale_instance_counts_once(self):
+        booking = self.book(-1, 9, self.tutees[0])
+        stale = Booking.objects.get(id=booking.id)
+        sweep_past_bookings()
+        # Loaded as pending, but the sweeper completed it meanwhile
+        stale.mark_completed()
+        self.assertEqual(self.stats(), {'completed_sessions': 1, 'upcoming_sessions': 0, 'distinct_tutees': 1})
+
+    def test_account_deletion_recounts_each_tutor_once(self):
+        other = create_tutor('other')
+        client = APIClient()
+
+        def delete_account(tutee):
+            client.force_authenticate(tutee.user)
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(client.delete('/api/delete-account/').status_code, 200)
+            return len(ctx.captured_queries)
+
+        self.book(1, 9, self.tutees[0])
+        few = delete_account(self.tutees[0])
+
+        tutee = create_tutee('busy')
+        for hour in range(9, 15):
+            booking = self.book(3, hour, tutee)
+            if hour % 2:
+                booking.mark_completed()
+        Booking.book_slot(Availability.objects.create(
+            tutor=other, date=date.today() + timedelta(days=1), start_time=time(9), end_time=time(10)
+        ), tutee)
+        keeps = self.book(2, 9, self.tutees[1])
+        self.assertEqual(delete_account(tutee), few)
+
+        self.assertEqual(self.stats(), {'completed_sessions': 0, 'upcoming_sessions': 1, 'distinct_tutees': 1})
+        self.assertEqual(
+            TutorStats.objects.filter(tutor=other).values('upcoming_sessions', 'distinct_tutees').get(),
+            {'upcoming_sessions': 0, 'distinct_tutees': 0},
+        )
+        self.assertTrue(Booking.objects.filter(id=keeps.id).exists())
+
+    def test_rebuild_fixes_drift(self):
+        self.book(1, 9, self.tutees[0])
+        untouched = create_tutor('untouched')
+        # bulk_create skips the transitions, as a bulk import would
+        Booking.objects.bulk_create([Booking(
+            availability=Availability.objects.create(
+                tutor=untouched, date=date.today() + timedelta(days=1), start_time=time(9), end_time=time(10)
+            ), tutee=self.tutees[1],
+        )])
+        TutorStats.objects.filter(tutor=self.tutor).update(upcoming_sessions=7)
+
+        out = io.StringIO()
+        call_command('rebuild_tutor_stats', stdout=out)
+        self.assertIn('Fixed 1 drifted and 1 missing rows', out.getvalue())
+        self.assertEqual(self.stats()['upcoming_sessions'], 1)
+        self.assertEqual(TutorStats.objects.get(tutor=untouched).upcoming_sessions, 1)
+
+
+class CatalogCachingTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(create_tutee('tutee').user)
+
+    def test_revalidation_returns_304_with_caching_headers(self):
+        for url in ('/api/departments/', '/api/subjects/?department=Computer Science'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Cache-Control'], 'private, max-age=3600')
+
+                revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(revalidated.status_code, 304)
+                self.assertEqual(revalidated['ETag'], response['ETag'])
+                self.assertEqual(revalidated['Cache-Control'], 'private, max-age=3600')
+
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_anonymous_requests_are_rejected_even_with_a_matching_etag(self):
+        tag = self.client.get('/api/departments/')['ETag']
+        anonymous = APIClient()
+        self.assertEqual(anonymous.get('/api/departments/').status_code, 401)
+        self.assertEqual(anonymous.get('/api/departments/', HTTP_IF_NONE_MATCH=tag).status_code, 401)
+
+
+class ResponseCacheInvalidationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.tutor = create_tutor('tutor', rate='500')
+        self.client = APIClient()
+        self.client.force_authenticate(create_tutee('tutee').user)
+
+    def test_profile_is_rebuilt_once_the_write_commits(self):
+        url = f'/api/tutor/{self.tutor.id}/'
+        self.assertEqual(self.client.get(url).data['tutor']['rate'], '500')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tutor.rate = '800'
+            self.tutor.save()
+            # Not committed yet: a read still gets the old payload rather than caching this one
+            self.assertEqual(self.client.get(url).data['tutor']['rate'], '500')
+        self.assertEqual(self.client.get(url).data['tutor']['rate'], '800')
+
+    def test_availability_is_rebuilt_after_slot_and_booking_writes(self):
+        url = f'/api/tutor/{self.tutor.id}/availability/'
+        self.assertEqual(self.client.get(url).json()['count'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            slot = Availability.objects.create(
+                tutor=self.tutor, date=date.today() + timedelta(days=1), start_time=time(9), end_time=time(10)
+            )
+        self.assertEqual(self.client.get(url).json()['availabilities'][0]['status'], 'Available')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.book_slot(slot, create_tutee('other'))
+        self.assertEqual(self.client.get(url).json()['availabilities'][0]['status'], 'Booked')
+
+
+class PresenceTests(TestCase):
+
+    def setUp(self):
+        # Write out sightings buffered by earlier tests before their user ids are reused
+        presence.flush()
+        self.user = create_tutee('tutee').user
+        self.buffer = LastSeenBuffer(
+            flush_interval=timedelta(seconds=30), max_pending=2, granularity=timedelta(seconds=60)
+        )
+
+    def test_sightings_are_buffered_until_a_flush(self):
+        now = timezone.now()
+        with self.assertNumQueries(0):
+            self.buffer.touch(self.user, now)
+            # Finer than the granularity: not even buffered again
+            self.buffer.touch(self.user, now + timedelta(seconds=5))
+        self.assertEqual(self.buffer.last_seen(self.user), now)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_seen)
+
+        other = create_tutee('other').user
+        # The second pending user reaches max_pending, so this touch flushes both in one UPDATE
+        with self.assertNumQueries(1):
+            self.buffer.touch(other, now)
+        self.assertEqual(CustomUser.objects.filter(last_seen=now).count(), 2)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_failed_flush_keeps_the_buffer_and_the_response(self):
+        self.client.force_login(self.user)
+        # Recent sightings from earlier tests stay in the shared buffer; don't let one skip this touch
+        with mock.patch.object(presence, 'flush_interval', timedelta(0)), \
+                mock.patch.object(presence, 'granularity', timedelta(0)), \
+                mock.patch('django.db.models.query.QuerySet.update', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('api.presence', 'WARNING'):
+            response = self.client.get('/api/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_seen)
+
+        self.assertEqual(presence.flush(), 1)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_seen)
+
+
+class TutorSearchTests(TestCase):
+
+    def setUp(self):
+        self.data = create_tutor('ram', subject='COMP 202 Data Structures', department='Computer Science')
+        self.graphics = create_tutor('sita', subject='COMP 342 Computer Graphics', department='Computer Engineering')
+        # Named after the subject the others teach: a name match ranks below a subject match
+        self.named = create_tutor('dataram', subject='MATH 101 Calculus')
+        self.client = APIClient()
+        self.client.force_authenticate(create_tutee('tutee').user)
+
+    def search(self, query, **filters):
+        return list(ranked_tutor_ids(query, **filters))
+
+    def test_tokenize_joins_subject_codes(self):
+        self.assertEqual(tokenize('COMP 202: Data-Structures'), ['comp', '202', 'data', 'structures', 'comp202'])
+        self.assertEqual(tokenize('COMP 202', join_codes=False), ['comp', '202'])
+
+    def test_ranking_weighs_fields_and_requires_every_term(self):
+        self.assertEqual(self.search('data'), [self.data.id, self.named.id])
+        self.assertEqual(self.search('comp2'), [self.data.id])
+        self.assertEqual(self.search('comp structures'), [self.data.id])
+        self.assertEqual(self.search('graphics calculus'), [])
+        self.assertEqual(self.search('comp', department='Computer Engineering'), [self.graphics.id])
+        self.assertEqual(self.search('data', fields=['subject']), [self.data.id])
+
+    def test_saves_reindex_the_tutor(self):
+        self.graphics.subject = 'COMP 202 Data Structures'
+        self.graphics.save()
+        self.assertEqual(set(self.search('data', fields=['subject'])), {self.data.id, self.graphics.id})
+
+        user = self.named.user
+        user.first_name = 'Hari'
+        user.save()
+        self.assertEqual(self.search('dataram'), [])
+        self.assertEqual(self.search('hari'), [self.named.id])
+
+        response = self.client.get('/api/search-tutors/?query=graphics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['tutors'], [])
+
+
+class BulkAvailabilityTests(TestCase):
+
+    def setUp(self):
+        self.tutor = create_tutor('tutor')
+        self.client = APIClient()
+        self.client.force_authenticate(self.tutor.user)
+        today = date.today()
+        self.monday = today + timedelta(days=7 - today.weekday())
+
+    def post(self, body):
+        return self.client.post('/api/tutor/availability/bulk-add/', body, format='json')
+
+    def test_recurrence_expands_to_each_weekday_and_time(self):
+        response = self.post({'recurrence': {
+            'days': ['Monday', 'wednesday'],
+            'times': [{'start_time': '09:00', 'end_time': '10:00'}, {'start_time': '14:00', 'end_time': '15:00'}],
+            'start_date': self.monday.isoformat(), 'end_date': (self.monday + timedelta(days=13)).isoformat(),
+        }})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['count'], 8)
+        slots = Availability.objects.filter(tutor=self.tutor)
+        self.assertEqual({slot.date.weekday() for slot in slots}, {0, 2})
+        self.assertEqual({slot.start_time for slot in slots}, {time(9), time(14)})
+
+        response = self.post({'recurrence': {
+            'days': ['Funday'], 'times': [{'start_time': '09:00', 'end_time': '10:00'}],
+            'start_date': self.monday.isoformat(), 'end_date': self.monday.isoformat(),
+        }})
+        self.assertEqual(response.status_code, 400)
+
+    def test_overlaps_within_the_batch_and_with_existing_slots_are_skipped(self):
+        day = self.monday.isoformat()
+        Availability.objects.create(tutor=self.tutor, date=self.monday, start_time=time(14), end_time=time(15))
+        response = self.post({'slots': [
+            {'date': day, 'start_time': '09:00', 'end_time': '10:00'},
+            {'date': day, 'start_time': '09:30', 'end_time': '10:30'},
+            {'date': day, 'start_time': '10:00', 'end_time': '11:00'},
+            {'date': day, 'start_time': '14:30', 'end_time': '15:30'},
+            {'date': day, 'start_time': '12:00', 'end_time': '11:00'},
+            {'date': (date.today() - timedelta(days=1)).isoformat(), 'start_time': '09:00', 'end_time': '10:00'},
+        ]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [(slot['start_time'], slot['end_time']) for slot in response.data['availabilities']],
+            [('09:00', '10:00'), ('10:00', '11:00')],
+        )
+        self.assertEqual(sorted(skip['reason'] for skip in response.data['skipped']), [
+            'Cannot add availability for past dates',
+            'Overlaps an existing slot',
+            'Overlaps an existing slot',
+            'start_time must be before end_time',
+        ])
+        self.assertEqual(Availability.objects.filter(tutor=self.tutor).count(), 3)
+
+    def test_requests_over_the_size_limit_are_rejected(self):
+        day = self.monday.isoformat()
+        slots = [{'date': day, 'start_time': '09:00', 'end_time': '10:00'}] * 501
+        self.assertEqual(self.post({'slots': slots}).status_code, 400)
+        response = self.post({'recurrence': {
+            'days': ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
+            'times': [{'start_time': f'{hour:02}:00', 'end_time': f'{hour:02}:30'} for hour in range(8, 20)],
+            'start_date': day, 'end_date': (self.monday + timedelta(days=60)).isoformat(),
+        }})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most 500', response.data['error'])
+        self.assertFalse(Availability.objects.filter(tutor=self.tutor).exists())
+
+    def test_malformed_bodies_are_rejected_with_a_clear_message(self):
+        for body, error in [
+            ({'recurrence': [1]}, 'recurrence must be an object'),
+            ({'recurrence': {'days': ['Monday'], 'times': ['09:00'], 'start_date': 'x', 'end_date': 'y'}},
+             'days must be a list of day names and times a list of {"start_time", "end_time"} objects'),
+            ({'slots': {'date': '2030-01-01'}}, 'slots must be a list of {"date", "start_time", "end_time"} objects'),
+            ({'slots': [1]}, 'slots must be a list of {"date", "start_time", "end_time"} objects'),
+        ]:
+            response = self.post(body)
+            self.assertEqual((response.status_code, response.data['error']), (400, error), body)
+
+    def test_slot_inserted_after_the_check_is_a_conflict(self):
+        Availability.objects.create(tutor=self.tutor, date=self.monday, start_time=time(9), end_time=time(10))
+        # As if the slot had been written between the overlap check and the insert
+        with mock.patch('api.views.availability_views.IntervalIndex.from_intervals', return_value=IntervalIndex()):
+            response = self.post({'slots': [{'date': self.monday.isoformat(), 'start_time': '09:00', 'end_time': '10:00'}]})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['error'], 'This time slot overlaps an existing slot on this date')
+        self.assertEqual(Availability.objects.filter(tutor=self.tutor).count(), 1)
+
+class MySessionsTests(TestCase):
+
+    def setUp(self):
+        # Keep a due presence flush from adding a query to the counted request
+        presence.flush()
+        self.tutor = create_tutor('tutor', subject='Maths')
+        self.tutee = create_tutee('tutee')
+        other = create_tutee('other')
+
+        def book(tutee, day, hour):
+            slot = Availability.objects.create(
+                tutor=self.tutor, date=date.today() + timedelta(days=day), start_time=time(hour), end_time=time(hour + 1)
+            )
+            return Booking.book_slot(slot, tutee)
+
+        self.upcoming = [book(self.tutee, 2, 9), book(self.tutee, 1, 9)]
+        self.done = [book(self.tutee, -3, 9), book(self.tutee, -2, 9)]
+        for booking in self.done:
+            booking.mark_completed()
+        self.cancelled = book(self.tutee, -1, 9)
+        Booking.objects.filter(id=self.cancelled.id).update(status='cancelled')
+        self.others = book(other, 3, 9)
+
+    def get(self, user, query=''):
+        client = APIClient()
+        client.force_authenticate(user)
+        with self.assertNumQueries(1):
+            response = client.get(f'/api/my-sessions/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def ids(self, data, group):
+        return [session['id'] for session in data['sessions'][group]]
+
+    def test_tutee_sees_own_sessions_grouped_by_status(self):
+        data = self.get(self.tutee.user)
+        # Upcoming sessions soonest first, finished ones newest first
+        self.assertEqual(self.ids(data, 'pending'), [self.upcoming[1].id, self.upcoming[0].id])
+        self.assertEqual(self.ids(data, 'completed'), [self.done[1].id, self.done[0].id])
+        self.assertEqual(self.ids(data, 'cancelled'), [self.cancelled.id])
+        self.assertEqual((data['counts']['pending'], data['counts']['completed'], data['total']), (2, 2, 5))
+
+        session = data['sessions']['pending'][0]
+        self.assertEqual((session['tutor_id'], session['tutee_id']), (self.tutor.id, self.tutee.id))
+        self.assertEqual((session['subject'], session['status']), ('Maths', 'pending'))
+        self.assertIsNone(session['completed_at'])
+        self.assertIsNotNone(data['sessions']['completed'][0]['completed_at'])
+
+    def test_tutor_sees_every_tutees_sessions(self):
+        data = self.get(self.tutor.user)
+        self.assertEqual(self.ids(data, 'pending'), [self.upcoming[1].id, self.upcoming[0].id, self.others.id])
+        self.assertEqual(self.ids(data, 'completed'), [self.done[1].id, self.done[0].id])
+        self.assertEqual(self.ids(data, 'cancelled'), [self.cancelled.id])
+        self.assertEqual(data['total'], 6)
+
+    def test_status_filter(self):
+        data = self.get(self.tutee.user, '?status=completed,cancelled')
+        self.assertEqual(list(data['sessions']), ['completed', 'cancelled'])
+        self.assertEqual(data['total'], 3)
+
+        client = APIClient()
+        client.force_authenticate(self.tutee.user)
+        response = client.get('/api/my-sessions/?status=pending,done')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Invalid status: done')
 
-# Create your tests here.
@@ -40,6 +40,7 @@ urlpatterns = [
     # Availability Management (Date-based)
     path('tutor/availability/', views.get_tutor_availability, name='get_tutor_availability'),
     path('tutor/availability/add/', views.add_availability, name='add_availability'),
+    path('tutor/availability/bulk-add/', views.bulk_add_availability, name='bulk_add_availability'),
     path('tutor/availability/<int:availability_id>/update/', views.update_availability, name='update_availability'),
     path('tutor/availability/<int:availability_id>/delete/', views.delete_availability, name='delete_availability'),
     path('tutor/<int:tutor_id>/availability/', views.get_tutor_availability_by_id, name='get_tutor_availability_by_id'),
@@ -51,9 +52,15 @@ urlpatterns = [
     path('book-demo-session/', views.book_demo_session, name='book_demo_session'),
     path('cancel-booking/<int:booking_id>/', views.cancel_booking, name='cancel_booking'),
     path('mark-complete/<int:booking_id>/', views.mark_session_complete, name='mark_session_complete'),  
+    path('mark-complete/', views.mark_sessions_complete, name='mark_sessions_complete'),
+    path('my-sessions/', views.my_sessions, name='my_sessions'),
 
     #View Tutee 
      path('tutor/my-classes/', views.my_classes, name='my_classes'),
     path('tutor/my-tutees/', views.my_tutees, name='my_tutees'),
     path('tutor/completed-sessions/', views.my_completed_sessions, name='my_completed_sessions'),
+    path('tutor/stats/', views.my_stats, name='my_stats'),
+    
+    # Monitoring
+    path('metrics/', views.metrics, name='metrics'),
 ]
\ No newline at end of file
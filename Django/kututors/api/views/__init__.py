@@ -30,6 +30,7 @@ from .availability_views import (
     get_tutor_availability,
     get_tutor_availability_by_id,
     add_availability,
+    bulk_add_availability,
     update_availability,
     delete_availability,
 )
@@ -41,11 +42,18 @@ from .booking_views import (
     book_demo_session,
     cancel_booking,
     mark_session_complete,
+    mark_sessions_complete,
+    my_classes,
+    my_tutees,
+    my_completed_sessions,
+    my_stats,
+    my_sessions,
 )
 
 from .misc_views import (
     set_online_status,
     add_tutee_subjects,
+    metrics,
 )
 
 __all__ = [
@@ -77,6 +85,7 @@ __all__ = [
     'get_tutor_availability',
     'get_tutor_availability_by_id',
     'add_availability',
+    'bulk_add_availability',
     'update_availability',
     'delete_availability',
     
@@ -87,8 +96,15 @@ __all__ = [
     'book_demo_session',
     'cancel_booking',
     'mark_session_complete',
+    'mark_sessions_complete',
+    'my_classes',
+    'my_tutees',
+    'my_completed_sessions',
+    'my_stats',
+    'my_sessions',
     
     # Misc views
     'set_online_status',
     'add_tutee_subjects',
+    'metrics',
 ]
\ No newline at end of file
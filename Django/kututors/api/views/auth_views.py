@@ -4,12 +4,12 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate, get_user_model
-from django.core.mail import send_mail
-from django.contrib.auth.hashers import make_password
 import random
-import secrets
 
+from ..hashers import hash_password
 from ..models import TutorProfile, TuteeProfile, TemporarySignup
+from ..outbox import enqueue_email
+from ..ratelimit import rate_limited
 from ..serializers import SignupSerializer, LoginSerializer, UserSerializer, VerifyEmailSerializer
 
 User = get_user_model()
@@ -42,6 +42,7 @@ def signup(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@rate_limited('verify_email')
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def verify_email(request):
@@ -103,6 +104,7 @@ def verify_email(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@rate_limited('login')
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login(request):
@@ -114,19 +116,16 @@ def login(request):
         email = serializer.validated_data['email']
         password = serializer.validated_data['password']
         
-        # Find user by email
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            return Response({
-                'error': 'Invalid credentials'
-            }, status=status.HTTP_401_UNAUTHORIZED)
-        
-        # Authenticate with username (since Django uses username by default)
-        user = authenticate(username=user.username, password=password)
+        # One SELECT fetches the user together with their token. The password
+        # hash runs outside any transaction so it never holds the write lock.
+        user = authenticate(request, email=email, password=password)
+        if user:
+            try:
+                token = user.auth_token
+            except Token.DoesNotExist:
+                token, created = Token.objects.get_or_create(user=user)
         
         if user:
-            token, created = Token.objects.get_or_create(user=user)
             return Response({
                 'token': token.key,
                 'user': UserSerializer(user).data,
@@ -169,7 +168,7 @@ def forgot_password(request):
         return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        user = User.objects.get(email=email)
+        user = User.objects.get(normalized_email=User.normalize_email_address(email))
     except User.DoesNotExist:
         return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
     
@@ -184,22 +183,17 @@ def forgot_password(request):
     print(f"CODE: {code}")
     print("=" * 50)
     
-    # Try to send email
-    try:
-        send_mail(
-            subject="Password Reset Code - KU Tutors",
-            message=f"Hello {user.first_name},\n\nYour password reset code is: {code}\n\nThank you!",
-            from_email=None,
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
-        print("Email sent successfully!")
-    except Exception as e:
-        print(f"Email sending failed: {str(e)}")
+    # Queue the email; the outbox worker sends it
+    enqueue_email(
+        subject="Password Reset Code - KU Tutors",
+        message=f"Hello {user.first_name},\n\nYour password reset code is: {code}\n\nThank you!",
+        recipient_list=[user.email],
+    )
     
     return Response({'message': 'Verification code sent to your email'}, status=status.HTTP_200_OK)
 
 
+@rate_limited('reset_password')
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def reset_password(request):
@@ -214,16 +208,12 @@ def reset_password(request):
         return Response({'error': 'All fields are required'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        user = User.objects.get(email=email, verification_code=code)
-        
-        # Generate cryptographically secure random salt (22 characters)
-        salt = secrets.token_urlsafe(16)[:22]
-        
-        # Hash the new password with salt using make_password
-        hashed_password = make_password(new_password, salt=salt)
+        user = User.objects.get(
+            normalized_email=User.normalize_email_address(email), verification_code=code
+        )
         
-        # Set the hashed password
-        user.password = hashed_password
+        # Hash the new password with the configured hasher
+        user.password = hash_password(new_password)
         user.verification_code = None  # Clear the code
         user.save()
         
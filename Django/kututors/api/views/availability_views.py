@@ -2,9 +2,26 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from datetime import datetime, date
+from django.db import IntegrityError, transaction
+from datetime import datetime, date, timedelta
 
+from ..async_views import async_api_view, json_response
+from ..intervals import IntervalIndex
 from ..models import TutorProfile, Availability
+from ..response_cache import acached_for_tutor, bump_tutor_version_on_commit
+
+
+OVERLAP_ERROR = 'This time slot overlaps an existing slot on this date'
+
+
+def _lock_tutor_slots(tutor_id):
+    """
+    Serialize slot changes for the tutor until the transaction ends, so a slot
+    cannot be added between another request's overlap check and its insert.
+    SQLite already holds the write lock from BEGIN IMMEDIATE; elsewhere the
+    tutor's row lock does it.
+    """
+    TutorProfile.objects.select_for_update().filter(id=tutor_id).values_list('id', flat=True).get()
 
 
 @api_view(['GET'])
@@ -90,28 +107,27 @@ def get_tutor_availability(request):
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def get_tutor_availability_by_id(request, tutor_id):
-    """Get availability for a specific tutor by their ID"""
-    try:
+@async_api_view(['GET'])
+async def get_tutor_availability_by_id(request, tutor_id):
+    """
+    Get availability for a specific tutor by their ID
+    Served from the per-tutor response cache
+    """
+    today = date.today()
+    
+    async def build():
         # Get the tutor profile
-        try:
-            tutor_profile = TutorProfile.objects.get(id=tutor_id)
-        except TutorProfile.DoesNotExist:
-            return Response(
-                {'error': 'Tutor not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
+        if not await TutorProfile.objects.filter(id=tutor_id).aexists():
+            return None
         
         # Get all availability slots for this tutor
         availability_slots = Availability.objects.filter(
-            tutor=tutor_profile
-        ).filter(date__gte=date.today()).order_by('date', 'start_time')
+            tutor_id=tutor_id
+        ).filter(date__gte=today).order_by('date', 'start_time')
         
         # Serialize the availability data
         availability_data = []
-        for slot in availability_slots:
+        async for slot in availability_slots:
             try:
                 availability_data.append({
                     'id': slot.id,
@@ -127,15 +143,26 @@ def get_tutor_availability_by_id(request, tutor_id):
                 print(f"Error formatting slot {slot.id}: {e}")
                 continue
         
-        return Response({
+        return {
             'availabilities': availability_data,
             'count': len(availability_data)
-        })
+        }
+    
+    try:
+        # Slots from before today drop out at midnight, so today is part of the key
+        payload = await acached_for_tutor(tutor_id, f'availability:{today.isoformat()}', build)
+        if payload is None:
+            return json_response(
+                {'error': 'Tutor not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return json_response(payload)
     except Exception as e:
         import traceback
         print(f"Error in get_tutor_availability_by_id: {e}")
         print(traceback.format_exc())
-        return Response(
+        return json_response(
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
@@ -172,19 +199,25 @@ def add_availability(request):
             return Response({'error': 'Cannot add availability for past dates'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if slot already exists
-        if Availability.objects.filter(tutor=tutor, date=availability_date, start_time=start).exists():
-            return Response({'error': 'This time slot already exists for this date'}, 
+        if start >= end:
+            return Response({'error': 'start_time must be before end_time'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
-        # Create availability
-        availability = Availability.objects.create(
-            tutor=tutor,
-            date=availability_date,
-            start_time=start,
-            end_time=end,
-            status='Available'
-        )
+        with transaction.atomic():
+            _lock_tutor_slots(tutor.id)
+            
+            # Check if slot overlaps an existing one
+            if Availability.overlapping(tutor, availability_date, start, end).exists():
+                return Response({'error': OVERLAP_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Create availability
+            availability = Availability.objects.create(
+                tutor=tutor,
+                date=availability_date,
+                start_time=start,
+                end_time=end,
+                status='Available'
+            )
         
         return Response({
             'message': 'Availability added successfully',
@@ -199,6 +232,8 @@ def add_availability(request):
                 'status': availability.status,
             }
         }, status=status.HTTP_201_CREATED)
+    except IntegrityError:
+        return Response({'error': OVERLAP_ERROR}, status=status.HTTP_409_CONFLICT)
     except ValueError as e:
         return Response({'error': 'Invalid date/time format. Use YYYY-MM-DD for date and HH:MM for time'}, 
                        status=status.HTTP_400_BAD_REQUEST)
@@ -240,7 +275,19 @@ def update_availability(request, availability_id):
         if 'status' in request.data:
             availability.status = request.data['status']
         
-        availability.save()
+        if availability.start_time >= availability.end_time:
+            return Response({'error': 'start_time must be before end_time'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        with transaction.atomic():
+            _lock_tutor_slots(availability.tutor_id)
+            
+            if Availability.overlapping(
+                availability.tutor_id, availability.date, availability.start_time, availability.end_time
+            ).exclude(id=availability.id).exists():
+                return Response({'error': OVERLAP_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+            
+            availability.save()
         
         return Response({
             'message': 'Availability updated successfully',
@@ -258,6 +305,8 @@ def update_availability(request, availability_id):
     except Availability.DoesNotExist:
         return Response({'error': 'Availability slot not found'}, 
                        status=status.HTTP_404_NOT_FOUND)
+    except IntegrityError:
+        return Response({'error': OVERLAP_ERROR}, status=status.HTTP_409_CONFLICT)
     except ValueError as e:
         return Response({'error': 'Invalid date/time format. Use YYYY-MM-DD for date and HH:MM for time'},
                        status=status.HTTP_400_BAD_REQUEST)
@@ -285,4 +334,180 @@ def delete_availability(request, availability_id):
         return Response({'error': 'Availability slot not found'}, 
                        status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+MAX_BULK_SLOTS = 500
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+DATE_TIME_FORMAT_ERROR = 'Invalid date/time format. Use YYYY-MM-DD for date and HH:MM for time'
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(DATE_TIME_FORMAT_ERROR)
+
+
+def _parse_time(value):
+    try:
+        return datetime.strptime(value, '%H:%M').time()
+    except (TypeError, ValueError):
+        raise ValueError(DATE_TIME_FORMAT_ERROR)
+
+
+def _expand_recurrence(rule):
+    """
+    Expand a weekly recurrence rule into (date, start, end) tuples
+    Rule: {"days": ["Monday", ...], "times": [{"start_time": "14:00", "end_time": "15:00"}],
+           "start_date": "2026-01-15", "end_date": "2026-05-15"}
+    """
+    if not isinstance(rule, dict):
+        raise ValueError('recurrence must be an object')
+    days = rule.get('days') or []
+    times = rule.get('times') or []
+    if not days or not times or not rule.get('start_date') or not rule.get('end_date'):
+        raise ValueError('Recurrence needs days, times, start_date and end_date')
+    if not isinstance(days, list) or not isinstance(times, list) or not all(isinstance(t, dict) for t in times):
+        raise ValueError('days must be a list of day names and times a list of {"start_time", "end_time"} objects')
+    
+    weekdays = set()
+    for day in days:
+        if str(day).lower() not in WEEKDAYS:
+            raise ValueError(f'Unknown day: {day}')
+        weekdays.add(WEEKDAYS.index(str(day).lower()))
+    
+    start_date = _parse_date(rule['start_date'])
+    end_date = _parse_date(rule['end_date'])
+    ranges = [(_parse_time(t['start_time']), _parse_time(t['end_time'])) for t in times]
+    
+    slots = []
+    current = start_date
+    while current <= end_date:
+        if current.weekday() in weekdays:
+            slots.extend((current, start, end) for start, end in ranges)
+            if len(slots) > MAX_BULK_SLOTS:
+                raise ValueError(f'A request can create at most {MAX_BULK_SLOTS} slots')
+        current += timedelta(days=1)
+    return slots
+
+
+def _parse_slots(slots):
+    """Parse a list of {"date", "start_time", "end_time"} dicts into tuples"""
+    if not isinstance(slots, list) or not all(isinstance(slot, dict) for slot in slots):
+        raise ValueError('slots must be a list of {"date", "start_time", "end_time"} objects')
+    return [
+        (_parse_date(slot['date']), _parse_time(slot['start_time']), _parse_time(slot['end_time']))
+        for slot in slots
+    ]
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_add_availability(request):
+    """
+    Add many availability slots in one request
+    Body: {"slots": [{"date": "2026-01-15", "start_time": "14:00", "end_time": "15:00"}, ...]}
+      or: {"recurrence": {"days": ["Monday", "Wednesday"], "times": [{"start_time": "14:00", "end_time": "15:00"}],
+                          "start_date": "2026-01-15", "end_date": "2026-05-15"}}
+    Slots that are in the past, duplicated or overlapping are skipped and reported
+    """
+    if request.user.role != 'Tutor':
+        return Response({'error': 'Only tutors can add availability'}, 
+                       status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        tutor = request.user.tutor_profile
+        
+        try:
+            if 'recurrence' in request.data:
+                requested = _expand_recurrence(request.data['recurrence'])
+            elif 'slots' in request.data:
+                requested = _parse_slots(request.data['slots'])
+            else:
+                return Response({'error': 'Either slots or recurrence is required'}, 
+                              status=status.HTTP_400_BAD_REQUEST)
+        except (KeyError, TypeError):
+            return Response({'error': 'Each slot needs date, start_time and end_time'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not requested:
+            return Response({'error': 'No slots to add'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(requested) > MAX_BULK_SLOTS:
+            return Response({'error': f'A request can create at most {MAX_BULK_SLOTS} slots'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        # Check and insert under one lock, so concurrent adds cannot
+        # slip an overlapping slot in between
+        with transaction.atomic():
+            _lock_tutor_slots(tutor.id)
+            
+            # One query for every existing slot in the requested date window
+            first_date = min(slot[0] for slot in requested)
+            last_date = max(slot[0] for slot in requested)
+            taken = IntervalIndex.from_intervals(
+                Availability.objects.filter(
+                    tutor=tutor, date__gte=first_date, date__lte=last_date
+                ).values_list('date', 'start_time', 'end_time')
+            )
+            
+            today = date.today()
+            to_create = []
+            skipped = []
+            for slot_date, start, end in sorted(requested):
+                reason = None
+                if slot_date < today:
+                    reason = 'Cannot add availability for past dates'
+                elif start >= end:
+                    reason = 'start_time must be before end_time'
+                elif taken.overlaps(slot_date, start, end):
+                    reason = 'Overlaps an existing slot'
+            
+                if reason:
+                    skipped.append({
+                        'date': slot_date.strftime('%Y-%m-%d'),
+                        'start_time': start.strftime('%H:%M'),
+                        'end_time': end.strftime('%H:%M'),
+                        'reason': reason,
+                    })
+                    continue
+            
+                taken.add(slot_date, start, end)
+                to_create.append(Availability(
+                    tutor=tutor,
+                    date=slot_date,
+                    start_time=start,
+                    end_time=end,
+                    status='Available'
+                ))
+            
+            created = Availability.objects.bulk_create(to_create)
+        
+        # bulk_create sends no post_save signals
+        if created:
+            bump_tutor_version_on_commit(tutor.id)
+        
+        return Response({
+            'message': f'{len(created)} availability slots added',
+            'availabilities': [
+                {
+                    'id': a.id,
+                    'date': a.date.strftime('%Y-%m-%d'),
+                    'formatted_date': a.formatted_date(),
+                    'day_name': a.day_name(),
+                    'start_time': a.start_time.strftime('%H:%M'),
+                    'end_time': a.end_time.strftime('%H:%M'),
+                    'formatted_time': a.formatted_time(),
+                    'status': a.status,
+                }
+                for a in created
+            ],
+            'count': len(created),
+            'skipped': skipped,
+        }, status=status.HTTP_201_CREATED)
+    except IntegrityError:
+        return Response({'error': OVERLAP_ERROR}, status=status.HTTP_409_CONFLICT)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
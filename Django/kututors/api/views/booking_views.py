@@ -2,21 +2,77 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from datetime import date
+from django.db import transaction
+from datetime import date, datetime
 
-from ..models import Availability, Booking
+from ..async_views import async_api_view, json_response
+from ..completion import complete_bookings
+from ..models import Availability, Booking, SlotUnavailable, TuteeProfile, TutorStats
+from ..pagination import InvalidCursor, after_slot_cursor, encode_slot_cursor, parse_page_size
+from ..presence import is_online
+from ..serializers import tutor_stats_data
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def demo_sessions(request):
-    """Get available demo sessions for tutees"""
+@async_api_view(['GET'])
+async def demo_sessions(request):
+    """
+    Get available demo sessions for tutees, one page at a time
+    Query params:
+    - cursor: next_cursor from the previous page (optional)
+    - page_size: number of sessions per page, max 100 (optional)
+    - department: Filter by tutor department, matched like list_tutors (optional)
+    - subject: Filter by tutor subject (optional)
+    - from_date / to_date: Date range in YYYY-MM-DD (optional)
+    """
     try:
-        # Get all available slots that are not booked
+        cursor = request.GET.get('cursor', '').strip()
+        department = request.GET.get('department', '').strip()
+        subject = request.GET.get('subject', '').strip()
+        from_date = request.GET.get('from_date', '').strip()
+        to_date = request.GET.get('to_date', '').strip()
+        
+        try:
+            page_size = parse_page_size(request.GET.get('page_size'))
+        except ValueError as e:
+            return json_response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Never show slots in the past, even if from_date asks for them
+        start_date = date.today()
+        try:
+            if from_date:
+                start_date = max(start_date, datetime.strptime(from_date, '%Y-%m-%d').date())
+            end_date = datetime.strptime(to_date, '%Y-%m-%d').date() if to_date else None
+        except ValueError:
+            return json_response({'error': 'Invalid date format. Use YYYY-MM-DD'}, 
+                                 status=status.HTTP_400_BAD_REQUEST)
+        
+        # Get available slots that are not booked, filtered in the database
         available_slots = Availability.objects.filter(
             status='Available',
-            date__gte=date.today()
-        ).select_related('tutor__user').order_by('date', 'start_time')
+            date__gte=start_date
+        )
+        if end_date:
+            available_slots = available_slots.filter(date__lte=end_date)
+        if department:
+            available_slots = available_slots.filter(tutor__department__icontains=department)
+        if subject:
+            available_slots = available_slots.filter(tutor__subject__icontains=subject)
+        if cursor:
+            try:
+                available_slots = available_slots.filter(after_slot_cursor(cursor))
+            except InvalidCursor as e:
+                return json_response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Fetch one extra row to know whether another page exists
+        available_slots = [
+            slot async for slot in available_slots.select_related('tutor__user').only(
+                'id', 'date', 'start_time', 'end_time',
+                'tutor__id', 'tutor__subject',
+                'tutor__user__first_name', 'tutor__user__last_name',
+            ).order_by('date', 'start_time', 'id')[:page_size + 1]
+        ]
+        has_more = len(available_slots) > page_size
+        available_slots = available_slots[:page_size]
         
         demo_sessions = []
         for slot in available_slots:
@@ -33,20 +89,21 @@ def demo_sessions(request):
                 'end_time': slot.end_time.strftime('%H:%M'),
             })
         
-        return Response({
+        return json_response({
             'demo_sessions': demo_sessions,
-            'count': len(demo_sessions)
+            'count': len(demo_sessions),
+            'has_more': has_more,
+            'next_cursor': encode_slot_cursor(available_slots[-1]) if has_more else None,
         })
     except Exception as e:
-        return Response(
+        return json_response(
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def booked_classes(request):
+@async_api_view(['GET'])
+async def booked_classes(request):
     """Get booked classes for the logged-in user (works for both tutors and tutees)"""
     try:
         user = request.user
@@ -54,14 +111,14 @@ def booked_classes(request):
         if user.role == 'Tutee':
             # Get bookings made by this tutee
             bookings = Booking.objects.filter(
-                tutee=user.tutee_profile
+                tutee__user=user
             ).select_related(
                 'availability__tutor__user',
                 'tutee__user'
             ).order_by('-booked_at')
             
             booked_classes = []
-            for booking in bookings:
+            async for booking in bookings:
                 booked_classes.append({
                     'id': booking.id,
                     'tutor_name': f"{booking.tutor_profile.user.first_name} {booking.tutor_profile.user.last_name}".strip(),
@@ -73,7 +130,7 @@ def booked_classes(request):
                     'is_demo': booking.is_demo,
                 })
             
-            return Response({
+            return json_response({
                 'booked_classes': booked_classes,
                 'count': len(booked_classes)
             })
@@ -81,14 +138,14 @@ def booked_classes(request):
         elif user.role == 'Tutor':
             # Get bookings for this tutor's availability slots
             bookings = Booking.objects.filter(
-                availability__tutor=user.tutor_profile
+                availability__tutor__user=user
             ).select_related(
                 'availability__tutor__user',
                 'tutee__user'
             ).order_by('-booked_at')
             
             booked_classes = []
-            for booking in bookings:
+            async for booking in bookings:
                 booked_classes.append({
                     'id': booking.id,
                     'tutee_name': f"{booking.tutee.user.first_name} {booking.tutee.user.last_name}".strip(),
@@ -101,18 +158,18 @@ def booked_classes(request):
                     'is_demo': booking.is_demo,
                 })
             
-            return Response({
+            return json_response({
                 'booked_classes': booked_classes,
                 'count': len(booked_classes)
             })
         else:
-            return Response(
+            return json_response(
                 {'error': 'Invalid user role'},
                 status=status.HTTP_400_BAD_REQUEST
             )
             
     except Exception as e:
-        return Response(
+        return json_response(
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
@@ -215,20 +272,13 @@ def book_demo_session(request):
         
         # Get the availability slot
         try:
-            availability = Availability.objects.get(id=availability_id)
-        except Availability.DoesNotExist:
+            availability = Availability.objects.select_related('tutor__user').get(id=availability_id)
+        except (Availability.DoesNotExist, ValueError):
             return Response(
                 {'error': 'Availability slot not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Check if slot is available
-        if availability.status != 'Available':
-            return Response(
-                {'error': 'This time slot is no longer available'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
         # Check if slot is in the past
         if availability.date < date.today():
             return Response(
@@ -236,17 +286,14 @@ def book_demo_session(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Create the booking
-        booking = Booking.objects.create(
-            availability=availability,
-            tutee=request.user.tutee_profile,
-            is_demo=True,
-            status='pending'
-        )
-        
-        # Update availability status
-        availability.status = 'Booked'
-        availability.save()
+        # Claim the slot and create the booking in one transaction
+        try:
+            booking = Booking.book_slot(availability, request.user.tutee_profile)
+        except SlotUnavailable:
+            return Response(
+                {'error': 'This time slot is no longer available'},
+                status=status.HTTP_409_CONFLICT
+            )
         
         return Response({
             'message': 'Demo session booked successfully',
@@ -292,13 +339,14 @@ def cancel_booking(request, booking_id):
                     status=status.HTTP_403_FORBIDDEN
                 )
         
-        # Update availability status back to Available
-        availability = booking.availability
-        availability.status = 'Available'
-        availability.save()
-        
-        # Delete the booking
-        booking.delete()
+        with transaction.atomic():
+            # Update availability status back to Available
+            availability = booking.availability
+            availability.status = 'Available'
+            availability.save()
+            
+            # Delete the booking
+            booking.delete()
         
         return Response({
             'message': 'Booking cancelled successfully'
@@ -351,6 +399,58 @@ def mark_session_complete(request, booking_id):
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+MAX_BULK_COMPLETE = 100
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_sessions_complete(request):
+    """
+    Mark several sessions as completed at once (for tutors)
+    Body: {"booking_ids": [1, 2, 3]}
+    """
+    try:
+        if request.user.role != 'Tutor':
+            return Response(
+                {'error': 'Only tutors can mark sessions as complete'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        booking_ids = request.data.get('booking_ids')
+        if not isinstance(booking_ids, list) or not booking_ids:
+            return Response(
+                {'error': 'booking_ids must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(booking_ids) > MAX_BULK_COMPLETE:
+            return Response(
+                {'error': f'A request can complete at most {MAX_BULK_COMPLETE} sessions'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            booking_ids = {int(booking_id) for booking_id in booking_ids}
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'booking_ids must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # One UPDATE for all of them; other tutors' and already finished bookings are skipped
+        completed = complete_bookings(request.user.tutor_profile, booking_ids)
+        
+        return Response({
+            'message': f'{len(completed)} sessions marked as completed',
+            'completed': completed,
+            'skipped': sorted(booking_ids - set(completed)),
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
     
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -410,27 +510,23 @@ def my_tutees(request):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Get unique tutees who have bookings with this tutor
-        bookings = Booking.objects.filter(
-            availability__tutor=request.user.tutor_profile
-        ).select_related('tutee__user').distinct('tutee')
+        # Get unique tutees who have bookings with this tutor; DISTINCT on
+        # the whole row works on SQLite as well as PostgreSQL
+        tutees = TuteeProfile.objects.filter(
+            bookings__availability__tutor=request.user.tutor_profile
+        ).select_related('user').distinct().order_by('id')
         
         tutees_data = []
-        seen_tutee_ids = set()
-        
-        for booking in bookings:
-            tutee = booking.tutee
-            if tutee.id not in seen_tutee_ids:
-                seen_tutee_ids.add(tutee.id)
-                tutees_data.append({
-                    'id': tutee.id,
-                    'name': f"{tutee.user.first_name} {tutee.user.last_name}".strip(),
-                    'full_name': f"{tutee.user.first_name} {tutee.user.last_name}".strip(),
-                    'year': tutee.year if hasattr(tutee, 'year') else 'N/A',
-                    'semester': tutee.semester if hasattr(tutee, 'semester') else 'N/A',
-                    'profile_image': tutee.user.profile_image.url if tutee.user.profile_image else None,
-                    'is_online': tutee.user.is_online if hasattr(tutee.user, 'is_online') else False,
-                })
+        for tutee in tutees:
+            tutees_data.append({
+                'id': tutee.id,
+                'name': f"{tutee.user.first_name} {tutee.user.last_name}".strip(),
+                'full_name': f"{tutee.user.first_name} {tutee.user.last_name}".strip(),
+                'year': tutee.year,
+                'semester': tutee.semester,
+                'profile_image': tutee.profile_picture.url if tutee.profile_picture else None,
+                'is_online': is_online(tutee.user),
+            })
         
         return Response({
             'tutees': tutees_data,
@@ -487,4 +583,115 @@ def my_completed_sessions(request):
         return Response(
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def my_stats(request):
+    """Completed sessions, distinct tutees and upcoming bookings for the tutor's dashboard"""
+    try:
+        if request.user.role != 'Tutor':
+            return Response(
+                {'error': 'Only tutors can access this endpoint'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        # Kept up to date by booking transitions; no scan of the bookings
+        stats = TutorStats.objects.filter(tutor__user=request.user).first()
+        
+        return Response({'stats': tutor_stats_data(stats)})
+        
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+def _session_data(booking):
+    """Flatten a booking for the sessions screen, formatting its slot once"""
+    slot = booking.availability
+    tutor_user = slot.tutor.user
+    tutee_user = booking.tutee.user
+    formatted_time = slot.formatted_time()
+    tutee_name = f"{tutee_user.first_name} {tutee_user.last_name}".strip()
+    return {
+        'id': booking.id,
+        'tutor_id': slot.tutor.id,
+        'tutor_name': f"{tutor_user.first_name} {tutor_user.last_name}".strip(),
+        'tutee_id': booking.tutee.id,
+        'tutee_name': tutee_name,
+        'student_name': tutee_name,
+        'subject': slot.tutor.subject,
+        'date': slot.date.strftime('%Y-%m-%d'),
+        'time': formatted_time,
+        'scheduled_at': f"{slot.formatted_date()} at {formatted_time}",
+        'status': booking.status,
+        'is_demo': booking.is_demo,
+        'completed_at': booking.completed_at.strftime('%B %d, %Y') if booking.completed_at else None,
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def my_sessions(request):
+    """
+    Get all of the logged-in user's sessions grouped by status, in one query
+    (works for both tutors and tutees)
+    Query params: status (optional, comma separated, e.g. "pending,completed")
+    """
+    try:
+        user = request.user
+        valid_statuses = [choice[0] for choice in Booking.STATUS_CHOICES]
+        
+        statuses = [s.strip() for s in request.GET.get('status', '').split(',') if s.strip()]
+        if not statuses:
+            statuses = valid_statuses
+        invalid = [s for s in statuses if s not in valid_statuses]
+        if invalid:
+            return Response(
+                {'error': f"Invalid status: {', '.join(invalid)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if user.role == 'Tutee':
+            bookings = Booking.objects.filter(tutee__user=user)
+        elif user.role == 'Tutor':
+            bookings = Booking.objects.filter(availability__tutor__user=user)
+        else:
+            return Response(
+                {'error': 'Invalid user role'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        bookings = bookings.filter(status__in=statuses).select_related(
+            'availability__tutor__user',
+            'tutee__user'
+        ).only(
+            'id', 'status', 'is_demo', 'completed_at',
+            'availability__date', 'availability__start_time', 'availability__end_time',
+            'availability__tutor__id', 'availability__tutor__subject',
+            'availability__tutor__user__first_name', 'availability__tutor__user__last_name',
+            'tutee__id', 'tutee__user__first_name', 'tutee__user__last_name',
+        ).order_by('availability__date', 'availability__start_time')
+        
+        sessions = {s: [] for s in statuses}
+        for booking in bookings:
+            sessions[booking.status].append(_session_data(booking))
+        
+        # Finished sessions read best newest first
+        for finished in ('completed', 'cancelled'):
+            if finished in sessions:
+                sessions[finished].reverse()
+        
+        return Response({
+            'sessions': sessions,
+            'counts': {s: len(items) for s, items in sessions.items()},
+            'total': sum(len(items) for items in sessions.values()),
+        })
+        
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
@@ -1,9 +1,13 @@
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.conf import settings
+from django.http import HttpResponse
 from django.utils import timezone
 
+from ..metrics import route_metrics
+
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -55,4 +59,16 @@ def add_tutee_subjects(request):
             'semester': tutee.semester,
         }, status=status.HTTP_200_OK)
     except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def metrics(request):
+    """
+    Per-route request metrics in the Prometheus text format
+    Only served to the addresses in METRICS_ALLOWED_IPS
+    """
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1']):
+        return Response({'error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
+    return HttpResponse(route_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -3,6 +3,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
+from ..images import store_profile_image, thumbnail_urls
 from ..serializers import UserSerializer
 
 
@@ -130,18 +131,14 @@ def upload_profile_image(request):
     try:
         if user.role == 'Tutor':
             profile = user.tutor_profile
-            profile.profile_picture = image
-            profile.save()
-            image_url = profile.profile_picture.url if profile.profile_picture else None
         elif user.role == 'Tutee':
             profile = user.tutee_profile
-            profile.profile_picture = image
-            profile.save()
-            image_url = profile.profile_picture.url if profile.profile_picture else None
+        store_profile_image(profile, image)
         
         return Response({
             'message': 'Image uploaded successfully',
-            'image_url': image_url
+            'image_url': profile.profile_picture.url,
+            'thumbnails': thumbnail_urls(profile),
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
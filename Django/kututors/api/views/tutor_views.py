@@ -2,94 +2,108 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q
+from django.utils.cache import get_conditional_response
 
+from .. import catalog
+from ..async_views import async_api_view, json_response
 from ..models import TutorProfile
+from ..pagination import parse_page_size
+from ..presence import is_online_for
+from ..response_cache import cached_for_tutor
+from ..search import ranked_tutor_ids
 from ..serializers import TutorProfileSerializer
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def list_tutors(request):
+async def _paginated_tutors(request, tutor_filters, search_query=None, fields=None):
+    """
+    Serialize one page of tutors matching tutor_filters; page and page_size
+    come from the query string. With a search query the page is taken from
+    the ranked search results.
+    """
+    page_size = parse_page_size(request.GET.get('page_size'))
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        raise ValueError('page must be an integer')
+    
+    # Fetch one extra row to know whether another page exists
+    offset = (page - 1) * page_size
+    tutors = TutorProfile.objects.select_related('user', 'stats')
+    if search_query:
+        ranked = ranked_tutor_ids(search_query, fields, **tutor_filters)[offset:offset + page_size + 1]
+        tutor_ids = [tutor_id async for tutor_id in ranked]
+        found = await tutors.ain_bulk(tutor_ids[:page_size])
+        page_tutors = [found[tutor_id] for tutor_id in tutor_ids[:page_size] if tutor_id in found]
+        has_more = len(tutor_ids) > page_size
+    else:
+        page_tutors = [tutor async for tutor in tutors.filter(**tutor_filters).order_by('id')[offset:offset + page_size + 1]]
+        has_more = len(page_tutors) > page_size
+        page_tutors = page_tutors[:page_size]
+    
+    serializer = TutorProfileSerializer(page_tutors, many=True)
+    
+    return json_response({
+        'tutors': serializer.data,
+        'count': len(serializer.data),
+        'page': page,
+        'has_more': has_more,
+    }, status=status.HTTP_200_OK)
+
+
+@async_api_view(['GET'])
+async def list_tutors(request):
     """
     List all tutors with filtering support
     Query params: 
-    - search: Search in name, subject, department, subject code
+    - search: Search in name, subject (including codes like "COMP 2"), department and semester
     - department: Filter by department (Computer Science/Computer Engineering)
     - subject: Filter by subject name or code
+    - page, page_size: Pagination (optional)
     """
     try:
-        # Get all tutor profiles
-        tutors = TutorProfile.objects.select_related('user').filter(available=True)
+        # Only tutors accepting students
+        tutor_filters = {'available': True}
         
         # Get query parameters
-        search_query = request.GET.get('search', '').strip().lower()
+        search_query = request.GET.get('search', '').strip()
         department = request.GET.get('department', '').strip()
         subject_filter = request.GET.get('subject', '').strip().lower()
         
-        # Apply search filter
-        if search_query:
-            tutors = tutors.filter(
-                Q(user__first_name__icontains=search_query) |
-                Q(user__last_name__icontains=search_query) |
-                Q(subject__icontains=search_query) |
-                Q(subjectcode__icontains=search_query) |
-                Q(semester__icontains=search_query)
-            )
-        
         # Apply department filter
         if department:
-            tutors = tutors.filter(department__icontains=department)
+            tutor_filters['department__icontains'] = department
         
-        # Apply subject filter (search in both subject and subject code)
+        # Apply subject filter
         if subject_filter:
-            tutors = tutors.filter(
-                Q(subject__icontains=subject_filter) 
-            )
-        
-        # Serialize the data
-        serializer = TutorProfileSerializer(tutors, many=True)
+            tutor_filters['subject__icontains'] = subject_filter
         
-        return Response({
-            'tutors': serializer.data,
-            'count': len(serializer.data)
-        }, status=status.HTTP_200_OK)
+        # Search is ranked over the tutor search index
+        return await _paginated_tutors(request, tutor_filters, search_query)
         
     except Exception as e:
-        return Response({
+        return json_response({
             'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def search_tutors_by_subject(request):
+@async_api_view(['GET'])
+async def search_tutors_by_subject(request):
     """
     Search tutors by subject code or subject name
-    Query params: query (required)
+    Query params: query (required), page, page_size (optional)
     """
     query = request.GET.get('query', '').strip()
     
     if not query:
-        return Response({
+        return json_response({
             'error': 'Search query is required'
         }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        tutors = TutorProfile.objects.select_related('user').filter(
-            Q(subject__icontains=query) | Q(subjectcode__icontains=query),
-            available=True
-        )
-        
-        serializer = TutorProfileSerializer(tutors, many=True)
-        
-        return Response({
-            'tutors': serializer.data,
-            'count': len(serializer.data)
-        }, status=status.HTTP_200_OK)
+        return await _paginated_tutors(request, {'available': True}, query, fields=['subject'])
         
     except Exception as e:
-        return Response({
+        return json_response({
             'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
 
@@ -99,39 +113,61 @@ def search_tutors_by_subject(request):
 def get_tutor_profile(request, tutor_id):
     """
     Get detailed profile of a specific tutor by ID
-    """
+    Served from the per-tutor response cache; only is_online is recomputed
+    """
+    def build():
+        try:
+            tutor = TutorProfile.objects.select_related('user', 'stats').get(id=tutor_id)
+        except TutorProfile.DoesNotExist:
+            return None
+        return {
+            'tutor': TutorProfileSerializer(tutor).data,
+            'user_id': tutor.user.id,
+            'last_seen': tutor.user.last_seen,
+        }
+    
     try:
-        tutor = TutorProfile.objects.select_related('user').get(id=tutor_id)
-        serializer = TutorProfileSerializer(tutor)
+        cached = cached_for_tutor(tutor_id, 'profile', build)
+        if cached is None:
+            return Response({
+                'error': 'Tutor not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        tutor_data = dict(cached['tutor'])
+        tutor_data['is_online'] = is_online_for(cached['user_id'], cached['last_seen'])
         
         return Response({
-            'tutor': serializer.data
+            'tutor': tutor_data
         }, status=status.HTTP_200_OK)
         
-    except TutorProfile.DoesNotExist:
-        return Response({
-            'error': 'Tutor not found'
-        }, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({
             'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+# Catalog responses never change at runtime: clients may reuse them for an
+# hour and revalidate with If-None-Match. They require login, so only the
+# client's own cache may store them, never a shared one.
+CATALOG_CACHE_CONTROL = 'private, max-age=3600'
+
+
+def _catalog_response(request, payload, tag):
+    """200 with the payload, or 304 if the client already has this ETag; both carry the caching headers"""
+    response = Response(payload, status=status.HTTP_200_OK)
+    response['ETag'] = tag
+    response['Cache-Control'] = CATALOG_CACHE_CONTROL
+    # Runs after the authentication check, so anonymous requests get a 401 rather than a 304
+    return get_conditional_response(request, etag=tag, response=response)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_departments(request):
     """
     Get list of available departments
     """
-    departments = [
-        {'id': 1, 'name': 'Computer Science'},
-        {'id': 2, 'name': 'Computer Engineering'},
-    ]
-    
-    return Response({
-        'departments': departments
-    }, status=status.HTTP_200_OK)
+    return _catalog_response(request, catalog.DEPARTMENTS_PAYLOAD, catalog.DEPARTMENTS_ETAG)
 
 
 @api_view(['GET'])
@@ -143,106 +179,7 @@ def list_subjects(request):
     """
     department = request.GET.get('department', '').strip()
     
-    computer_science_subjects = {
-        'MATH 101': 'Calculus and Linear Algebra',
-        'PHYS 101': 'General Physics I',
-        'COMP 102': 'Computer Programming',
-        'ENGG 111': 'Elements of Engineering I',
-        'CHEM 101': 'General Chemistry',
-        'EDRG 101': 'Engineering Drawing I',
-        'MATH 104': 'Advanced Calculus',
-        'PHYS 102': 'General Physics II',
-        'COMP 116': 'Object-Oriented Programming',
-        'ENGG 112': 'Elements Of Engineering II',
-        'ENGT 105': 'Technical Communication',
-        'ENVE 101': 'Introduction to Environmental Engineering',
-        'EDRG 102': 'Engineering Drawing II',
-        'MATH 208': 'Statistics and Probability',
-        'MCSC 201': 'Discrete Mathematics/Structure',
-        'EEEG 202': 'Digital Logic',
-        'EEEG 211': 'Electronics Engineering I',
-        'COMP 202': 'Data Structures and Algorithms',
-        'MATH 207': 'Differential Equations and Complex Variables',
-        'MCSC 202': 'Numerical Methods',
-        'COMP 204': 'Communication and Networking',
-        'COMP 231': 'Microprocessor and Assembly Language',
-        'COMP 232': 'Database Management Systems',
-        'COMP 317': 'Computational Operations Research',
-        'MGTS 301': 'Engineering Economics',
-        'COMP 307': 'Operating Systems',
-        'COMP 315': 'Computer Architecture and Organization',
-        'COMP 316': 'Theory of Computation',
-        'COMP 342': 'Computer Graphics',
-        'COMP 343': 'Information System Ethics',
-        'COMP 302': 'System Analysis and Design',
-        'COMP 409': 'Compiler Design',
-        'COMP 314': 'Algorithms and Complexity',
-        'COMP 323': 'Graph Theory',
-        'COMP 341': 'Human Computer Interaction',
-        'MGTS 403': 'Engineering Management',
-        'COMP 401': 'Software Engineering',
-        'COMP 472': 'Artificial Intelligence',
-        'MGTS 402': 'Engineering Entrepreneurship',
-        'COMP 486': 'Software Dependability',
-    }
-    
-    computer_engineering_subjects = {
-        'MATH 101': 'Calculus and Linear Algebra',
-        'PHYS 101': 'General Physics I',
-        'COMP 102': 'Computer Programming',
-        'ENGG 111': 'Elements of Engineering I',
-        'CHEM 101': 'General Chemistry',
-        'EDRG 101': 'Engineering Drawing I',
-        'MATH 104': 'Advanced Calculus',
-        'PHYS 102': 'General Physics II',
-        'COMP 116': 'Object-Oriented Programming',
-        'ENGG 112': 'Elements Of Engineering II',
-        'ENGT 105': 'Technical Communication',
-        'ENVE 101': 'Introduction to Environmental Engineering',
-        'EDRG 102': 'Engineering Drawing II',
-        'MATH 208': 'Statistics and Probability',
-        'MCSC 201': 'Discrete Mathematics/Structure',
-        'EEEG 202': 'Digital Logic',
-        'EEEG 211': 'Electronics Engineering I',
-        'COMP 202': 'Data Structures and Algorithms',
-        'MATH 207': 'Differential Equations and Complex Variables',
-        'MCSC 202': 'Numerical Methods',
-        'COMP 204': 'Communication and Networking',
-        'COMP 231': 'Microprocessor and Assembly Language',
-        'COMP 232': 'Database Management Systems',
-        'MGTS 301': 'Engineering Economics',
-        'COMP 307': 'Operating Systems',
-        'COMP 315': 'Computer Architecture and Organization',
-        'COEG 304': 'Instrumentation and Control',
-        'COMP 310': 'Laboratory Work',
-        'COMP 301': 'Principles of Programming Languages',
-        'COMP 304': 'Operations Research',
-        'COMP 302': 'System Analysis and Design',
-        'COMP 342': 'Computer Graphics',
-        'COMP 314': 'Algorithms and Complexity',
-        'COMP 306': 'Embedded Systems',
-        'COMP 343': 'Information System Ethics',
-        'MGTS 403': 'Engineering Management',
-        'COMP 401': 'Software Engineering',
-        'COMP 472': 'Artificial Intelligence',
-        'COMP 409': 'Compiler Design',
-        'COMP 407': 'Digital Signal Processing',
-        'MGTS 402': 'Engineering Entrepreneurship',
-    }
-    
-    if department == 'Computer Science':
-        subjects = [{'code': k, 'name': v} for k, v in computer_science_subjects.items()]
-    elif department == 'Computer Engineering':
-        subjects = [{'code': k, 'name': v} for k, v in computer_engineering_subjects.items()]
-    else:
-        # Return all subjects from both departments
-        all_subjects = {**computer_science_subjects, **computer_engineering_subjects}
-        subjects = [{'code': k, 'name': v} for k, v in all_subjects.items()]
-    
-    return Response({
-        'subjects': subjects,
-        'count': len(subjects)
-    }, status=status.HTTP_200_OK)
+    return _catalog_response(request, catalog.subjects_payload(department), catalog.subjects_etag(department))
 
 
 @api_view(['GET'])
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,7 +48,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -62,6 +63,7 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware', 
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -70,6 +72,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.UpdateLastSeenMiddleware',
 ]
 ROOT_URLCONF = 'kututors.urls'
 
@@ -94,13 +97,71 @@ WSGI_APPLICATION = 'kututors.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# KUTUTORS_DB selects the database profile: 'sqlite' (default) for a single
+# host, 'postgresql' for production. `python manage.py benchmark_database`
+# runs the same concurrent write load against either.
+DB_PROFILE = os.environ.get('KUTUTORS_DB', 'sqlite')
+
+if DB_PROFILE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('KUTUTORS_DB_NAME', 'kututors'),
+            'USER': os.environ.get('KUTUTORS_DB_USER', 'kututors'),
+            'PASSWORD': os.environ.get('KUTUTORS_DB_PASSWORD', ''),
+            'HOST': os.environ.get('KUTUTORS_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('KUTUTORS_DB_PORT', '5432'),
+            # Keep connections open between requests, checking them first
+            'CONN_MAX_AGE': int(os.environ.get('KUTUTORS_DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            # Server-side cursors stream .iterator() results; they do not
+            # work behind PgBouncer in transaction pooling mode
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('KUTUTORS_DB_SERVER_CURSORS', '1') != '1',
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Take the write lock when a transaction starts, so writers
+                # wait in busy_timeout instead of failing when upgrading
+                # a read lock to a write lock
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # File-backed test database: the in-memory shared cache fails
+            # concurrent writers with "table is locked" instead of waiting
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+# Applied to every new SQLite connection by api.db. WAL lets readers run
+# alongside the single writer; synchronous=NORMAL is durable in WAL mode
+# except for the last transactions on power loss.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,  # ms a writer waits for the lock
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # KiB when negative
+    'foreign_keys': 'ON',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'kututors',
     }
 }
 
+# Cache alias holding per-tutor API responses (see api.response_cache)
+RESPONSE_CACHE_ALIAS = 'default'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -120,6 +181,26 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+# The first hasher hashes new passwords; the others still verify older
+# hashes, which are rehashed with the first one on the next login. To use
+# Argon2, install argon2-cffi and move api.hashers.TunedArgon2PasswordHasher
+# to the top. `python manage.py benchmark_hashers` shows logins/sec per core.
+
+PASSWORD_HASHERS = [
+    'api.hashers.TunedScryptPasswordHasher',
+    'api.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+PASSWORD_SCRYPT_PARALLELISM = 1  # Django's default is 5; see api.hashers
+PASSWORD_ARGON2_TIME_COST = 2
+PASSWORD_ARGON2_MEMORY_COST = 64 * 1024  # KiB
+PASSWORD_ARGON2_PARALLELISM = 1
+PASSWORD_HASHER_THREADS = None  # hashes run at once; defaults to the number of cores
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -138,6 +219,16 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files. Files under profile_images/ are named after their content
+# hash and never change, so they can be served with a year-long max-age and
+# Cache-Control: immutable.
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+PROFILE_THUMBNAIL_SIZES = (64, 128, 512)  # square WebP thumbnails, in pixels
+PROFILE_THUMBNAIL_QUALITY = 80
+PROFILE_IMAGE_THREADS = None  # thumbnails built at once; defaults to the number of cores
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -146,3 +237,88 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@kututors.com'
 AUTH_USER_MODEL = 'api.CustomUser'
+AUTHENTICATION_BACKENDS = [
+    'api.backends.EmailBackend',  # API login
+    'django.contrib.auth.backends.ModelBackend',  # admin login by username
+]
+
+# Presence: last_seen timestamps are buffered in memory and written in bulk
+PRESENCE_FLUSH_INTERVAL = 30  # seconds between bulk writes
+PRESENCE_MAX_PENDING = 500  # flush early once this many users are buffered
+PRESENCE_GRANULARITY = 60  # ignore updates newer than this many seconds
+
+# Token authentication: recently used tokens skip the token/user query
+TOKEN_CACHE_SIZE = 10000  # tokens kept per process
+TOKEN_CACHE_TTL = 60  # seconds a cached user may be stale in other processes
+
+# Outbox: emails are queued and sent by `python manage.py send_outbox --loop`
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BASE_DELAY = 30  # seconds, doubled after every failed attempt
+
+# Rate limits: (requests, seconds) per client IP and per email, checked
+# before any query or password hash. RATE_LIMIT_STORE is 'memory' (per
+# process) or 'cache' (shared through RATE_LIMIT_CACHE_ALIAS).
+RATE_LIMITS = {
+    'login': {'ip': (30, 60), 'email': (10, 60)},
+    'verify_email': {'ip': (30, 60), 'email': (5, 300)},
+    'reset_password': {'ip': (30, 60), 'email': (5, 300)},
+}
+RATE_LIMIT_STORE = 'memory'
+RATE_LIMIT_CACHE_ALIAS = 'default'
+RATE_LIMIT_MAX_KEYS = 100000  # keys tracked by the memory store
+
+# Request metrics, served in Prometheus format at /api/metrics/. The
+# allow-list is checked against REMOTE_ADDR, so it assumes clients connect
+# directly; behind a reverse proxy every request has the proxy's address
+# and the proxy itself must restrict /api/metrics/.
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+DEFAULT_QUERY_BUDGET = 10  # queries per request before a warning is logged
+# Per-route query budgets, by URL pattern and optionally by method. This is
+# the only table: RequestMetricsMiddleware logs requests over it, and
+# QueryBudgetTests fails when a route runs more. Authenticated routes
+# include QUERY_BUDGET_AUTH_OVERHEAD for the token lookup and a presence
+# flush, which the tests do not run.
+QUERY_BUDGET_AUTH_OVERHEAD = 2
+QUERY_BUDGETS = {
+    '/api/signup/': 11,  # 7, or 11 when a concurrent signup took the username and it retries once
+    '/api/verify-email/': 9,
+    '/api/login/': 6,  # 1, plus creating the token on a first login and a one-time rehash to the preferred hasher
+    '/api/logout/': 4,
+    '/api/profile/': 2,
+    '/api/update-profile/': {'GET': 3, 'PATCH': 13},
+    '/api/upload-image/': 8,
+    '/api/forgot-password/': 3,
+    '/api/reset-password/': 2,
+    '/api/delete-account/': 15,
+    '/api/list-tutors/': 4,
+    '/api/search-tutors/': 4,
+    '/api/tutor/<int:tutor_id>/': 3,
+    '/api/departments/': 2,
+    '/api/subjects/': 2,
+    '/api/tutor/availability/': 4,
+    '/api/tutor/availability/add/': 8,
+    '/api/tutor/availability/bulk-add/': 8,
+    '/api/tutor/availability/<int:availability_id>/update/': 9,
+    '/api/tutor/availability/<int:availability_id>/delete/': 6,
+    '/api/tutor/<int:tutor_id>/availability/': 4,
+    '/api/demo-sessions/': 3,
+    '/api/booked-classes/': 3,
+    '/api/completed-classes/': 4,
+    '/api/book-demo-session/': 10,
+    '/api/cancel-booking/<int:booking_id>/': 10,
+    '/api/mark-complete/<int:booking_id>/': 10,
+    '/api/mark-complete/': 8,
+    '/api/my-sessions/': 3,
+    '/api/tutor/my-classes/': 4,
+    '/api/tutor/my-tutees/': 4,
+    '/api/tutor/completed-sessions/': 4,
+    '/api/tutor/stats/': 3,
+    '/api/metrics/': 0,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {'api': {'handlers': ['console'], 'level': 'WARNING'}},
+}